@@ -0,0 +1,52 @@
+"""
+Precomputed per author statistics used to rank investors.
+There is one row per author and performance horizon ("1W" ... "5Y"); the
+count columns are the same on every row for an author so any of them can be
+sorted and filtered on in a single query.
+"""
+from .Base import Base
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String
+
+
+class AuthorStats(Base):
+    __tablename__ = "author_stats"
+
+    user_link: Mapped[str] = mapped_column(ForeignKey("users.user_link"), primary_key=True)
+    horizon: Mapped[str] = mapped_column(String(8), primary_key=True)
+    idea_count: Mapped[int] = mapped_column(Integer)
+    long_count: Mapped[int] = mapped_column(Integer)
+    short_count: Mapped[int] = mapped_column(Integer)
+    contest_wins: Mapped[int] = mapped_column(Integer)
+    first_post: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_post: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Ideas with a performance row and the sum of their performance values,
+    # used to detect authors that need a refresh
+    performance_count: Mapped[int] = mapped_column(Integer)
+    performance_checksum: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # Ideas with a value for this horizon
+    ideas_with_returns: Mapped[int] = mapped_column(Integer)
+    # Returns are direction adjusted (shorts profit when the price falls) and
+    # excess returns are relative to the median idea over the same horizon
+    hit_rate: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    mean_return: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    median_return: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    mean_excess_return: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    median_excess_return: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # The median idea return the excess returns were measured against
+    universe_median: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+
+    __table_args__ = (
+        Index("ix_author_stats_horizon_median_excess", "horizon", "median_excess_return"),
+    )
+
+    def __repr__(self) -> str:
+        return (f"AuthorStats(user_link={self.user_link!r}, "
+            f"horizon={self.horizon!r}, "
+            f"idea_count={self.idea_count!r}, "
+            f"hit_rate={self.hit_rate!r}, "
+            f"median_excess_return={self.median_excess_return!r})")
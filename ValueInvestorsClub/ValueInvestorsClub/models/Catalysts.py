@@ -2,13 +2,8 @@
 The catalyst model is used to store the catalysts for a given idea.
 It just has the id and the catalyst text.
 """
-try:
-    from ValueInvestorsClub.models.Base import Base
-    from ValueInvestorsClub.models.Idea import Idea
-except ImportError:
-    # This is a bit of an ugly mess but it enables the spider to work and the ipynb to work up a few dirs.
-    from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
-    from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from .Base import Base
+from .Idea import Idea
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy import String
@@ -0,0 +1,25 @@
+"""
+The version of each data set, bumped by every writer in the transaction
+that changes it. "all" counts the changes to any of them.
+"""
+from .Base import Base
+from datetime import datetime
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+from sqlalchemy import DateTime, Integer, String
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer)
+    changed_at: Mapped[datetime] = mapped_column(DateTime)
+    # The writer of the latest change, e.g. the spider or a job
+    source: Mapped[str] = mapped_column(String(64))
+
+    def __repr__(self) -> str:
+        return (f"DataVersion(name={self.name!r}, "
+            f"version={self.version!r}, "
+            f"changed_at={self.changed_at!r}, "
+            f"source={self.source!r})")
@@ -1,24 +1,98 @@
 """
-The description model is used to store the catalysts for a given idea.
-It just has the id and the catalyst text.
+The description model is used to store the description text for a given idea.
+
+The text is either stored as is in `description`, or, once the
+compress_descriptions job has run, zstd compressed in `description_compressed`
+with a plain text `preview` of the first few hundred characters. Descriptions
+no longer than the preview stay uncompressed. Use full_text() or iter_text()
+to read the text either way.
+
+The compressed storage columns are deferred and only read for rows whose
+description is NULL, so a database that never ran the job (and doesn't have
+the columns) keeps working.
 """
-try:
-    from ValueInvestorsClub.models.Base import Base
-    from ValueInvestorsClub.models.Idea import Idea
-except ImportError:
-    # This is a bit of an ugly mess but it enables the spider to work and the ipynb to work up a few dirs.
-    from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
-    from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
-from sqlalchemy.orm import Mapped
+from .Base import Base
+from .Idea import Idea
+from . import compression
+from .DescriptionDictionary import DescriptionDictionary
+from typing import Iterator, Optional, Tuple
+from sqlalchemy.orm import Mapped, Session, object_session
 from sqlalchemy.orm import mapped_column
-from sqlalchemy import String
+from sqlalchemy import LargeBinary, String
 from sqlalchemy import ForeignKey
 
 class Description(Base):
     __tablename__ = "descriptions"
 
     idea_id: Mapped[str] = mapped_column(ForeignKey(Idea.id), primary_key=True)
-    description: Mapped[str] = mapped_column(String(128000))
+    # NULL only when the text is stored compressed
+    description: Mapped[Optional[str]] = mapped_column(String(128000), nullable=True)
+    description_compressed: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    dictionary_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey(DescriptionDictionary.id), nullable=True, deferred=True, deferred_group="compressed"
+    )
+    preview: Mapped[Optional[str]] = mapped_column(
+        String(1024), nullable=True, deferred=True, deferred_group="compressed"
+    )
+
+    @property
+    def is_compressed(self) -> bool:
+        return self.description is None
+
+    def _load_dictionary(self):
+        session = object_session(self)
+        dictionary_id = self.dictionary_id
+
+        def load_dictionary() -> bytes:
+            if session is None:
+                raise LookupError("Description is detached, can't load its dictionary")
+            return load_dictionary_bytes(session, dictionary_id)
+
+        return load_dictionary
+
+    def full_text(self) -> str:
+        """The whole description, decompressing it if needed."""
+        if self.description is not None:
+            return self.description
+        if self.description_compressed is None:
+            return ""
+        data = self.description_compressed
+        return compression.decompress_text(data, compression.get_decompressor(data, self._load_dictionary()))
+
+    def iter_text(self, chunk_size: int = compression.STREAM_CHUNK_SIZE) -> Iterator[str]:
+        """
+        The description in chunks, decompressing incrementally if needed.
+        Everything needed from the database is loaded before this returns, so
+        the iterator can be consumed after the session is closed.
+        """
+        if self.description is not None or self.description_compressed is None:
+            text = self.description or ""
+            return (text[start:start + chunk_size] for start in range(0, len(text), chunk_size))
+        data = self.description_compressed
+        decompressor = compression.stream_decompressor(data, self._load_dictionary())
+        return compression.iter_decompressed_text(data, decompressor, chunk_size)
+
+    def preview_text(self) -> Tuple[str, bool]:
+        """
+        A short plain text preview and whether it was cut short. Compressed
+        descriptions are always longer than their stored preview, so the
+        compressed text isn't read for them.
+        """
+        if self.description is None and self.preview is not None:
+            return self.preview, True
+        text = self.full_text()
+        preview = compression.make_preview(text)
+        return preview, preview != text
 
     def __repr__(self) -> str:
-        return f"Description(idea_id={self.idea_id!r}, description={self.description!r})"
\ No newline at end of file
+        if self.is_compressed:
+            return f"Description(idea_id={self.idea_id!r}, compressed=True)"
+        return f"Description(idea_id={self.idea_id!r}, description={self.description!r})"
+
+
+def load_dictionary_bytes(session: Session, dictionary_id: Optional[int]) -> bytes:
+    """The stored zstd dictionary with dictionary_id."""
+    dictionary = session.get(DescriptionDictionary, dictionary_id) if dictionary_id is not None else None
+    if dictionary is None:
+        raise LookupError(f"Description dictionary {dictionary_id} doesn't exist")
+    return dictionary.dictionary
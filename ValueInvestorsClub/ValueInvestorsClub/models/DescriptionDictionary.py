@@ -0,0 +1,23 @@
+"""
+A zstd dictionary trained on a sample of descriptions.
+Compressed descriptions reference the dictionary they were compressed with,
+and a dictionary is never changed once stored.
+"""
+from .Base import Base
+from datetime import datetime
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+from sqlalchemy import DateTime, Integer, LargeBinary
+
+
+class DescriptionDictionary(Base):
+    __tablename__ = "description_dictionaries"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    dictionary: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+    def __repr__(self) -> str:
+        return (f"DescriptionDictionary(id={self.id!r}, "
+            f"size={len(self.dictionary)!r}, "
+            f"created_at={self.created_at!r})")
@@ -1,13 +1,9 @@
 from sqlalchemy import ForeignKey
-from sqlalchemy import DateTime, Boolean, String
+from sqlalchemy import DateTime, Boolean, String, Index, text
 from sqlalchemy.orm import Mapped, relationship
 from sqlalchemy.orm import mapped_column
 
-try:
-    from ValueInvestorsClub.models.Base import Base
-except ImportError:
-    # This is a bit of an ugly mess but it enables the spider to work and the ipynb to work up a few dirs.
-    from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
+from .Base import Base
 
 class Idea(Base):
     __tablename__ = "ideas"
@@ -19,6 +15,17 @@ class Idea(Base):
     date: Mapped[DateTime] = mapped_column(DateTime)
     is_short : Mapped[bool] = mapped_column(Boolean)
     is_contest_winner : Mapped[bool] = mapped_column(Boolean)
+
+    # Serve a company's or an author's ideas in date order without a sort.
+    # Links are unique (see models/links.py); rows without one are exempt.
+    __table_args__ = (
+        Index("ix_ideas_company_id_date", "company_id", "date"),
+        Index("ix_ideas_user_id_date", "user_id", "date"),
+        Index(
+            "uq_ideas_link", "link", unique=True,
+            postgresql_where=text("link <> ''"), sqlite_where=text("link <> ''"),
+        ),
+    )
     
     # Relationships
     company = relationship("Company", backref="ideas")
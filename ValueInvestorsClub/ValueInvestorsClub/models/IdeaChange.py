@@ -0,0 +1,31 @@
+"""
+Append-only log of the ideas each data version touched, one row per idea.
+A row without an idea id means every idea may have changed, e.g. after a
+bulk load. Rows are never updated, so their ids order them by commit.
+"""
+from .Base import Base
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+from sqlalchemy import BigInteger, DateTime, Integer, String
+
+
+class IdeaChange(Base):
+    __tablename__ = "idea_changes"
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # The "all" version the change was committed with, and its data set
+    version: Mapped[int] = mapped_column(Integer)
+    data_set: Mapped[str] = mapped_column(String(32))
+    # No foreign key: deleted ideas are logged too
+    idea_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    source: Mapped[str] = mapped_column(String(64))
+    changed_at: Mapped[datetime] = mapped_column(DateTime)
+
+    def __repr__(self) -> str:
+        return (f"IdeaChange(id={self.id!r}, "
+            f"version={self.version!r}, "
+            f"data_set={self.data_set!r}, "
+            f"idea_id={self.idea_id!r}, "
+            f"source={self.source!r})")
@@ -1,11 +1,7 @@
 """
 A sql alchemy table for storing pricing information
 """
-try:
-    from ValueInvestorsClub.models.Base import Base
-except ImportError:
-    # This is a bit of an ugly mess but it enables the spider to work and the ipynb to work up a few dirs.
-    from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
+from .Base import Base
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy import Float
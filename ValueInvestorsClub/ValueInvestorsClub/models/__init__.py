@@ -0,0 +1,31 @@
+"""
+SQLAlchemy models shared by the scraper and the API.
+
+Scrapy imports this package as ValueInvestorsClub.models and the API as
+ValueInvestorsClub.ValueInvestorsClub.models; the modules import each other
+relatively, so both work. Submodules are imported on first use
+(`models.Idea`, `from models import Idea`), not with the package.
+Relationships refer to other models by name, so call load_models() before
+the first query when only some were imported.
+"""
+import importlib
+from types import ModuleType
+
+MODEL_MODULES = (
+    "Base", "Idea", "Company", "Description", "DescriptionDictionary", "User", "Catalysts", "Performance",
+    "AuthorStats", "DataVersion", "IdeaChange",
+)
+
+__all__ = [*MODEL_MODULES, "compression", "links", "versions", "load_models"]
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def load_models():
+    """Import every mapped model."""
+    for name in MODEL_MODULES:
+        importlib.import_module(f".{name}", __name__)
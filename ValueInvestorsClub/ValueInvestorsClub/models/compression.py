@@ -0,0 +1,114 @@
+"""
+zstd compression for description text.
+
+Descriptions can optionally be stored compressed, usually with a dictionary
+trained on a sample of descriptions so that short texts compress well too.
+Dictionaries are immutable once stored, so they are cached for the life of
+the process by the zstd dictionary id recorded in every frame. zstd
+decompressors aren't safe to share between threads, so each thread gets its
+own for one-shot decompression, and every stream gets a new one. Needs the
+optional zstandard package.
+"""
+import codecs
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+
+# Characters kept in plain text as a preview of a compressed description
+PREVIEW_CHARS = int(os.getenv("DESCRIPTION_PREVIEW_CHARS", "600"))
+COMPRESSION_LEVEL = int(os.getenv("DESCRIPTION_COMPRESSION_LEVEL", "19"))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_dictionaries: Dict[int, object] = {}
+_local = threading.local()
+
+
+def _zstd():
+    try:
+        import zstandard  # type: ignore  # Optional dependency
+    except ImportError:
+        raise RuntimeError("Compressed descriptions need the zstandard package: pip install zstandard")
+    return zstandard
+
+
+def make_preview(text: str, length: int = PREVIEW_CHARS) -> str:
+    """The start of text, cut at a word boundary when it's longer than length."""
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    space = cut.rfind(" ")
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def train_dictionary(samples: List[str], size: int = 112 * 1024) -> bytes:
+    """Train a zstd dictionary of about size bytes on sample descriptions."""
+    zstandard = _zstd()
+    return zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples]).as_bytes()
+
+
+def compress_text(text: str, dictionary: Optional[bytes] = None, level: int = COMPRESSION_LEVEL) -> bytes:
+    zstandard = _zstd()
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+    return zstandard.ZstdCompressor(level=level, dict_data=dict_data).compress(text.encode("utf-8"))
+
+
+def _dictionary(zstandard, dict_id: int, load_dictionary=None):
+    """The dictionary with zstd id dict_id, loaded with load_dictionary() the first time."""
+    if not dict_id:
+        return None
+    dict_data = _dictionaries.get(dict_id)
+    if dict_data is None:
+        if load_dictionary is None:
+            raise LookupError(f"zstd dictionary {dict_id} is not loaded")
+        dict_data = zstandard.ZstdCompressionDict(load_dictionary())
+        if dict_data.dict_id() != dict_id:
+            raise LookupError(f"Stored dictionary doesn't match zstd dictionary {dict_id}")
+        _dictionaries[dict_id] = dict_data
+    return dict_data
+
+
+def get_decompressor(data: bytes, load_dictionary=None):
+    """
+    This thread's decompressor for compressed data, for decompress_text().
+    Frames record the id of the dictionary they need, and load_dictionary()
+    is called for its bytes the first time that dictionary is seen.
+    """
+    zstandard = _zstd()
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+    cache = getattr(_local, "decompressors", None)
+    if cache is None:
+        cache = _local.decompressors = {}
+    decompressor = cache.get(dict_id)
+    if decompressor is None:
+        dict_data = _dictionary(zstandard, dict_id, load_dictionary)
+        decompressor = cache[dict_id] = zstandard.ZstdDecompressor(dict_data=dict_data)
+    return decompressor
+
+
+def stream_decompressor(data: bytes, load_dictionary=None):
+    """
+    A new decompressor for iter_decompressed_text(). A stream is read over
+    many calls, possibly on different threads, so it can't share this
+    thread's decompressor with other decompressions.
+    """
+    zstandard = _zstd()
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+    return zstandard.ZstdDecompressor(dict_data=_dictionary(zstandard, dict_id, load_dictionary))
+
+
+def decompress_text(data: bytes, decompressor) -> str:
+    return decompressor.decompress(data).decode("utf-8")
+
+
+def iter_decompressed_text(data: bytes, decompressor, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Decompress data incrementally, yielding text a chunk at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in decompressor.read_to_iter(data, read_size=chunk_size, write_size=chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
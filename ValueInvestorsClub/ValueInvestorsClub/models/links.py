@@ -0,0 +1,39 @@
+"""
+Idea links and the ids derived from them.
+
+Every VIC idea has a numeric id at the end of its link, e.g.
+https://valueinvestorsclub.com/idea/InPost/5698302853. Ideas are keyed by it,
+so scraping an idea again finds the row it already has instead of adding a
+copy. Links are stored normalized, as the same idea is linked with and
+without www., over http and https and with query strings.
+"""
+import re
+import uuid
+from typing import Optional
+from urllib.parse import urlsplit
+
+IDEA_ID_RE = re.compile(r"/idea/(?:[^/]*/)?(\d+)/?$")
+
+
+def normalize_link(link: Optional[str]) -> str:
+    """https://valueinvestorsclub.com/<path> for any form of an idea link, "" for none."""
+    if not link or not link.strip():
+        return ""
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower().removeprefix("www.") or "valueinvestorsclub.com"
+    path = parts.path.rstrip("/")
+    return f"https://{host}{path}"
+
+
+def idea_id_from_link(link: Optional[str]) -> Optional[str]:
+    """
+    The idea's numeric VIC id, or, for a link without one, a UUID derived from
+    the normalized link. None when there is no link.
+    """
+    normalized = normalize_link(link)
+    if not normalized:
+        return None
+    match = IDEA_ID_RE.search(urlsplit(normalized).path)
+    if match:
+        return match.group(1)
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, normalized))
@@ -0,0 +1,71 @@
+"""
+Data versions and the change log.
+
+Every writer calls record_change() in the transaction that changes the data,
+as its last statement, so the new version and the changed idea ids commit
+with it or not at all. The writer locks the "all" row first, then the data
+set's row, and holds both until it commits. Changes are therefore committed
+in the order of their log ids, and a reader that has seen every change up to
+an id never misses one committed later with a smaller id. Versions are
+bumped with an upsert, so two writers creating a data set's row at once
+don't collide either.
+
+Data sets: "ideas" (ideas with their descriptions and catalysts, written by
+the spider and the id and dedupe jobs) and "performance" (price based
+returns). Bulk loads replace both.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, cast
+
+from sqlalchemy import Table, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .DataVersion import DataVersion
+from .IdeaChange import IdeaChange
+
+ALL = "all"
+IDEAS = "ideas"
+PERFORMANCE = "performance"
+
+
+def _bump(connection, name: str, source: str, now: datetime) -> int:
+    versions = cast(Table, DataVersion.__table__)
+    bind = connection.get_bind() if isinstance(connection, Session) else connection
+    dialect = postgresql if bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(versions).values(name=name, version=1, changed_at=now, source=source)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": versions.c.version + 1, "changed_at": now, "source": source},
+    ))
+    return connection.execute(select(versions.c.version).where(versions.c.name == name)).scalar_one()
+
+
+def record_change(connection, data_set: str, source: str, idea_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Bump the version of data_set and log the ideas it touched, None for all
+    of them, in the transaction of connection (a Connection or Session).
+    Returns the new "all" version.
+    """
+    now = datetime.now()
+    version = _bump(connection, ALL, source, now)
+    _bump(connection, data_set, source, now)
+    ids = [None] if idea_ids is None else sorted(set(idea_ids))
+    if ids:
+        connection.execute(insert(cast(Table, IdeaChange.__table__)), [
+            {"version": version, "data_set": data_set, "idea_id": idea_id, "source": source, "changed_at": now}
+            for idea_id in ids
+        ])
+    return version
+
+
+def ensure_schema(engine):
+    """Create the versions table and change log in a database that predates them."""
+    for model in (DataVersion, IdeaChange):
+        cast(Table, model.__table__).create(engine, checkfirst=True)
+
+
+def current_versions(connection) -> Dict[str, Any]:
+    """Every data set's (name, version, changed_at, source) row, "all" included, by name."""
+    versions = cast(Table, DataVersion.__table__)
+    return {row.name: row for row in connection.execute(select(versions))}
@@ -8,10 +8,17 @@
 
 # This pipeline will dump the associated data into a postgres sql database.
 
+# Ideas are keyed by the VIC id in their link, so crawling an idea again
+# updates its row instead of adding a copy. Every item bumps the ideas data
+# version and logs its idea id in the same transaction.
+
 from ValueInvestorsClub.models import Base, Idea, Company, Description, User, Catalysts
+from ValueInvestorsClub.models.links import idea_id_from_link, normalize_link
+from ValueInvestorsClub.models.versions import IDEAS, record_change
+from scrapy.exceptions import DropItem
 from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-import uuid
 from datetime import datetime
 
 class SqlPipeline:
@@ -25,55 +32,53 @@ class SqlPipeline:
         pass
 
     def process_item(self, item, spider):
-        # Make a idea, catalyst, company, description and user object
-        # Then add them to the database
+        # Upsert the user, company, idea, description and catalysts in one transaction
+        idea_id = idea_id_from_link(item['link'])
+        if idea_id is None:
+            raise DropItem('Idea without a link')
+        est_index = item['date'].index('EST')
+        new_date = datetime.strptime(item['date'][0:est_index+3], "%B %d, %Y - %I:%M%p %Z")
+
         with Session(self.engine) as session:
             print('Processing item')
-            # check if the user already exists
-            user = session.query(User.User).filter(User.User.user_link == item['userLink']).first()
-            if user is None:
-                user = User.User(
-                    username=item['username'],
-                    user_link=item['userLink']
-                )
-
-            # check if the company exists
-            company = session.query(Company.Company).filter(Company.Company.ticker == item['ticker']).first()
-            if company is None:
-                company = Company.Company(
-                    ticker=item['ticker'],
-                    company_name=item['companyName']
-                )
-            est_index = item['date'].index('EST')
-
-            new_date = datetime.strptime(item['date'][0:est_index+3], "%B %d, %Y - %I:%M%p %Z")
+            session.execute(
+                insert(User.User)
+                .values(username=item['username'], user_link=item['userLink'])
+                .on_conflict_do_nothing(index_elements=['user_link'])
+            )
+            session.execute(
+                insert(Company.Company)
+                .values(ticker=item['ticker'], company_name=item['companyName'])
+                .on_conflict_do_nothing(index_elements=['ticker'])
+            )
 
-            idea = Idea.Idea(
-                id=str(uuid.uuid4()),
-                link=item['link'],
-                company_id=company.ticker,
-                user_id=user.user_link,
+            idea = insert(Idea.Idea).values(
+                id=idea_id,
+                link=normalize_link(item['link']),
+                company_id=item['ticker'],
+                user_id=item['userLink'],
                 date=new_date,
                 is_short=item['isShort'],
                 is_contest_winner=item['isContestWinner'],
             )
+            session.execute(idea.on_conflict_do_update(
+                index_elements=['id'],
+                set_={column: idea.excluded[column] for column in
+                      ('link', 'company_id', 'user_id', 'date', 'is_short', 'is_contest_winner')},
+            ))
 
-            description = Description.Description(
-                idea_id=idea.id,
-                description=item['description']
-            )
-            catalysts = Catalysts.Catalysts(
-                idea_id=idea.id,
-                catalysts=item['catalysts']
-            )
-
-            session.add(user)
-            session.add(company)
-            session.commit()
-            session.add(idea)
-            session.commit()
-            session.add(description)
-            session.add(catalysts)
+            description = insert(Description.Description).values(idea_id=idea_id, description=item['description'])
+            # The new text is stored plain; a compressed copy and preview would be of the old one
+            session.execute(description.on_conflict_do_update(
+                index_elements=['idea_id'],
+                set_={'description': description.excluded.description, 'description_compressed': None,
+                      'dictionary_id': None, 'preview': None},
+            ))
+            catalysts = insert(Catalysts.Catalysts).values(idea_id=idea_id, catalysts=item['catalysts'])
+            session.execute(catalysts.on_conflict_do_update(
+                index_elements=['idea_id'], set_={'catalysts': catalysts.excluded.catalysts},
+            ))
+            record_change(session, IDEAS, spider.name, [idea_id])
             session.commit()
 
 
@@ -1,9 +1,10 @@
 """
 The following inserts all scraped links into a postgres sql database. 
-Unfortunately, this creates some duplicates.
-To view those we make a query that selects duplicate ideas where the user, ticker and date are all the same.
+Early crawls created some duplicates: ideas where the user, ticker and date are all the same.
+To list and merge them run:
 
-select * from ideas full outer join companies full outer join where date in (select date from ideas group by id having count(*) > 1);
+python -m api.jobs.dedupe_ideas --dry-run
+python -m api.jobs.dedupe_ideas
 """
 
 
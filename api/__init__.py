@@ -1,7 +1,17 @@
 """
 ValueInvestorsClub API package.
 Provides a REST API for accessing Value Investors Club data.
+
+The app is imported on first use of `api.app`, so jobs and benchmarks under
+api/ don't load every route.
 """
-from api.main import app
+from typing import Any
+
+__all__ = ["app"]
+
 
-__all__ = ["app"]
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    if name == "app":
+        from api.main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,17 @@
+"""
+Backtesting package for the ValueInvestorsClub API.
+Simulates portfolios that trade ideas as they are published.
+"""
+from api.backtest.strategy import Strategy
+from api.backtest.engine import BacktestData, BacktestResult, simulate
+from api.backtest.grid import expand_grid, load_ideas, run_grid
+
+__all__ = [
+    "Strategy",
+    "BacktestData",
+    "BacktestResult",
+    "simulate",
+    "expand_grid",
+    "load_ideas",
+    "run_grid",
+]
@@ -0,0 +1,194 @@
+"""
+Vectorized portfolio simulation over ideas.
+
+Prices for every matched ticker are aligned on one trading calendar as a
+(days x series) matrix of daily returns. A strategy is then simulated without
+a per-day Python loop: entries and exits are scattered into a difference array,
+a cumulative sum turns that into open positions per day, and the portfolio
+return is the row-wise dot product of weights and asset returns.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from api.backtest.strategy import Strategy
+from api.pricing.store import PriceSeries, PriceStore
+
+TRADING_DAYS_PER_YEAR = 252
+
+IDEA_COLUMNS = ["id", "company_id", "user_id", "date", "is_short", "is_contest_winner"]
+
+
+@dataclass
+class BacktestResult:
+    strategy: Strategy
+    trades: int = 0
+    start: Optional[np.datetime64] = None
+    end: Optional[np.datetime64] = None
+    total_return: float = 0.0
+    cagr: float = 0.0
+    max_drawdown: float = 0.0
+    volatility: float = 0.0
+    sharpe: float = 0.0
+    # Average fraction of the book traded per year
+    turnover: float = 0.0
+    # Fraction of days with at least one open position
+    exposure: float = 0.0
+    equity: np.ndarray = field(default_factory=lambda: np.ones(0), repr=False)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "trades": self.trades,
+            "total_return": self.total_return,
+            "cagr": self.cagr,
+            "max_drawdown": self.max_drawdown,
+            "volatility": self.volatility,
+            "sharpe": self.sharpe,
+            "turnover": self.turnover,
+            "exposure": self.exposure,
+        }
+
+
+class BacktestData:
+    """
+    Ideas plus aligned daily returns for every price series they map to.
+
+    `ideas` is a DataFrame with the Idea columns plus `series` (column in the
+    returns matrix, -1 when unmatched) and `day` (index in `calendar` of the
+    first trading day after the idea was posted, len(calendar) if none).
+    """
+
+    def __init__(self, ideas, calendar: np.ndarray, returns: np.ndarray):
+        self.ideas = ideas
+        self.calendar = calendar
+        self.returns = returns
+
+    @classmethod
+    def from_series(cls, ideas, series: List[PriceSeries], series_index: np.ndarray) -> "BacktestData":
+        """
+        Build from an ideas DataFrame, the price series they use and, for every
+        idea, the position of its series in `series` (-1 when unmatched).
+        """
+        ideas = ideas.reset_index(drop=True).copy()
+        if series:
+            calendar = np.unique(np.concatenate([s.dates for s in series]))
+        else:
+            calendar = np.array([], dtype="datetime64[D]")
+
+        closes = np.full((len(calendar), len(series)), np.nan)
+        for col, s in enumerate(series):
+            closes[np.searchsorted(calendar, s.dates), col] = s.closes
+
+        # Forward fill so a day without a print (holiday, halt, delisting)
+        # shows up as a zero return instead of a gap
+        rows = np.where(np.isnan(closes), 0, np.arange(len(calendar))[:, None])
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        closes = closes[rows, np.arange(len(series))]
+
+        returns = np.zeros_like(closes)
+        if len(calendar) > 1:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                returns[1:] = closes[1:] / closes[:-1] - 1
+        returns[~np.isfinite(returns)] = 0.0
+
+        posted = ideas["date"].to_numpy().astype("datetime64[D]")
+        ideas["series"] = np.asarray(series_index, dtype=np.int64)
+        ideas["day"] = np.searchsorted(calendar, posted, side="right")
+        return cls(ideas, calendar, returns)
+
+    @classmethod
+    def from_store(cls, store: PriceStore, ideas) -> "BacktestData":
+        """Resolve every idea's ticker through the store and load its prices."""
+        keys: Dict[str, int] = {}
+        series: List[PriceSeries] = []
+        index = np.full(len(ideas), -1, dtype=np.int64)
+        rows = zip(ideas["id"], ideas["company_id"], ideas["date"])
+        resolutions = store.index.resolve_many(rows)
+        for i, idea_id in enumerate(ideas["id"]):
+            ref = resolutions[idea_id].series
+            if ref is None:
+                continue
+            if ref.path not in keys:
+                keys[ref.path] = len(series)
+                series.append(store.load(ref))
+            index[i] = keys[ref.path]
+        return cls.from_series(ideas, series, index)
+
+    def select(self, strategy: Strategy) -> np.ndarray:
+        """Boolean mask of the ideas a strategy trades."""
+        ideas = self.ideas
+        mask = (ideas["series"].to_numpy() >= 0)
+        if strategy.is_short is not None:
+            mask &= ideas["is_short"].to_numpy(dtype=bool) == strategy.is_short
+        if strategy.is_contest_winner is not None:
+            mask &= ideas["is_contest_winner"].to_numpy(dtype=bool) == strategy.is_contest_winner
+        if strategy.user_ids is not None:
+            mask &= ideas["user_id"].isin(strategy.user_ids).to_numpy()
+        if strategy.company_ids is not None:
+            mask &= ideas["company_id"].isin(strategy.company_ids).to_numpy()
+        posted = ideas["date"].to_numpy().astype("datetime64[D]")
+        if strategy.start_date is not None:
+            mask &= posted >= np.datetime64(strategy.start_date, "D")
+        if strategy.end_date is not None:
+            mask &= posted <= np.datetime64(strategy.end_date, "D")
+        return mask
+
+
+def simulate(data: BacktestData, strategy: Strategy) -> BacktestResult:
+    """Simulate one strategy and compute its performance metrics."""
+    result = BacktestResult(strategy=strategy)
+    selected = data.ideas[data.select(strategy)]
+    n_days = len(data.calendar)
+
+    # Enter at the close of `entry` and earn returns on entry+1 .. exit
+    entry = selected["day"].to_numpy() + strategy.entry_delay - 1
+    keep = entry < n_days - 1
+    entry = entry[keep]
+    if len(entry) == 0:
+        return result
+    exit_ = np.minimum(entry + strategy.holding_period, n_days - 1)
+    used, cols = np.unique(selected["series"].to_numpy()[keep], return_inverse=True)
+    if strategy.follow_direction:
+        direction = np.where(selected["is_short"].to_numpy(dtype=bool)[keep], -1.0, 1.0)
+    else:
+        direction = np.ones(len(entry))
+
+    # Only simulate the window and the series the strategy actually touches
+    first, last = entry.min(), exit_.max()
+    span = last - first + 1
+    entry, exit_ = entry - first, exit_ - first
+    returns = data.returns[first:last + 1][:, used]
+
+    net = np.zeros((span + 1, len(used)))
+    gross = np.zeros((span + 1, len(used)))
+    np.add.at(net, (entry + 1, cols), direction)
+    np.add.at(net, (exit_ + 1, cols), -direction)
+    np.add.at(gross, (entry + 1, cols), 1.0)
+    np.add.at(gross, (exit_ + 1, cols), -1.0)
+    net = np.cumsum(net, axis=0)[:span]
+    open_positions = np.cumsum(gross, axis=0)[:span].sum(axis=1)
+
+    if strategy.sizing == "equal":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weights = np.where(open_positions[:, None] > 0, net / open_positions[:, None], 0.0)
+    else:
+        weights = net * strategy.position_size
+
+    daily = (weights * returns).sum(axis=1)
+    equity = np.cumprod(1.0 + daily)
+
+    years = max(span - 1, 1) / TRADING_DAYS_PER_YEAR
+    result.trades = len(entry)
+    result.start = data.calendar[first]
+    result.end = data.calendar[last]
+    result.equity = equity
+    result.total_return = float(equity[-1] - 1.0)
+    result.cagr = float(equity[-1] ** (1.0 / years) - 1.0) if equity[-1] > 0 else -1.0
+    result.max_drawdown = float((equity / np.maximum.accumulate(equity) - 1.0).min())
+    result.volatility = float(daily.std() * np.sqrt(TRADING_DAYS_PER_YEAR))
+    result.sharpe = float(daily.mean() / daily.std() * np.sqrt(TRADING_DAYS_PER_YEAR)) if daily.std() > 0 else 0.0
+    traded = np.abs(np.diff(weights, axis=0, prepend=0.0, append=0.0)).sum()
+    result.turnover = float(traded / 2.0 / years)
+    result.exposure = float((open_positions > 0).mean())
+    return result
@@ -0,0 +1,138 @@
+"""
+Parameter grid search over strategies, run in parallel across processes.
+
+Usage:
+    python -m api.backtest.grid grid.json --out results.csv
+
+where grid.json looks like:
+    {
+        "base": {"is_short": false, "sizing": "equal"},
+        "grid": {
+            "entry_delay": [1, 2, 5],
+            "holding_period": [5, 10, 21, 63, 126, 252],
+            "is_contest_winner": [null, true]
+        }
+    }
+"""
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from api.backtest.engine import IDEA_COLUMNS, BacktestData, simulate
+from api.backtest.strategy import Strategy
+
+# Set in each worker process by _init_worker so the price matrix is only
+# shipped once per worker rather than once per task
+_worker_data: Optional[BacktestData] = None
+
+
+def expand_grid(base: Strategy, grid: Dict[str, Sequence[Any]]) -> Iterator[Strategy]:
+    """Yield one strategy per combination of the grid values."""
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        label = ",".join(f"{k}={v}" for k, v in params.items())
+        yield base.with_params(name=label or base.name, **params)
+
+
+def _init_worker(data: BacktestData) -> None:
+    global _worker_data
+    _worker_data = data
+
+
+def _run_chunk(strategies: List[Strategy]) -> List[Dict[str, Any]]:
+    assert _worker_data is not None
+    return [_row(simulate(_worker_data, s)) for s in strategies]
+
+
+def _row(result) -> Dict[str, Any]:
+    row = result.strategy.to_dict()
+    row.update(result.metrics())
+    return row
+
+
+def run_grid(
+    data: BacktestData,
+    strategies: Sequence[Strategy],
+    processes: Optional[int] = None,
+    chunk_size: int = 64,
+):
+    """
+    Simulate every strategy and return a DataFrame of parameters and metrics,
+    best CAGR first. processes=1 runs in the current process.
+    """
+    import pandas as pd  # type: ignore  # Missing stubs for pandas
+
+    strategies = list(strategies)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(strategies) <= chunk_size:
+        rows = [_row(simulate(data, s)) for s in strategies]
+    else:
+        chunks = [strategies[i:i + chunk_size] for i in range(0, len(strategies), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(data,)) as pool:
+            rows = [row for chunk in pool.map(_run_chunk, chunks) for row in chunk]
+
+    frame = pd.DataFrame(rows)
+    if not frame.empty:
+        frame = frame.sort_values("cagr", ascending=False, ignore_index=True)
+    return frame
+
+
+def load_ideas(session):
+    """Load the idea columns the backtester filters on into a DataFrame."""
+    import pandas as pd  # type: ignore  # Missing stubs for pandas
+    from sqlalchemy import select
+    from api.models import Idea
+
+    statement = select(*(getattr(Idea, c) for c in IDEA_COLUMNS)).where(Idea.date.isnot(None))
+    rows = session.execute(statement).all()
+    frame = pd.DataFrame(rows, columns=IDEA_COLUMNS)
+    frame["is_short"] = frame["is_short"].fillna(False).astype(bool)
+    frame["is_contest_winner"] = frame["is_contest_winner"].fillna(False).astype(bool)
+    return frame
+
+
+def main() -> int:
+    """Run a strategy grid from a json config against the database and price files."""
+    import argparse
+    from sqlalchemy.orm import Session
+    from api.database import engine
+    from api.pricing import get_price_store
+
+    parser = argparse.ArgumentParser(description="Backtest a grid of idea following strategies")
+    parser.add_argument("config", help="json file with 'base' strategy fields and a 'grid' of values")
+    parser.add_argument("--out", help="Write all results to this csv file")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--top", type=int, default=20, help="Number of strategies to print")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+
+    store = get_price_store()
+    if store is None:
+        print("Set PRICE_DATA_DIR or PRICE_INDEX_PATH to a stooq download first")
+        return 1
+
+    with Session(engine) as session:
+        ideas = load_ideas(session)
+    data = BacktestData.from_store(store, ideas)
+    matched = int((data.ideas["series"] >= 0).sum())
+    print(f"Loaded {len(ideas)} ideas, {matched} with prices, {data.returns.shape[1]} series")
+
+    strategies = list(expand_grid(Strategy(**config.get("base", {})), config.get("grid", {})))
+    print(f"Running {len(strategies)} strategies")
+    results = run_grid(data, strategies, processes=args.processes)
+
+    columns = ["name", "trades", "cagr", "max_drawdown", "sharpe", "turnover", "exposure"]
+    print(results[columns].head(args.top).to_string(index=False))
+    if args.out:
+        results.to_csv(args.out, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Strategy definitions for backtesting ideas.
+
+A strategy picks a subset of ideas by their fields, enters each one a number
+of trading days after it was posted and holds it for a fixed number of
+trading days.
+"""
+from dataclasses import asdict, dataclass, replace
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+SIZING_MODES = ("equal", "fixed")
+
+
+@dataclass(frozen=True)
+class Strategy:
+    name: str = "strategy"
+
+    # Filters on Idea fields, None means "don't filter"
+    is_short: Optional[bool] = False
+    is_contest_winner: Optional[bool] = None
+    user_ids: Optional[Tuple[str, ...]] = None
+    company_ids: Optional[Tuple[str, ...]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+    # Trading days after posting before entering. 1 buys at the close of the
+    # first trading day after the idea was published.
+    entry_delay: int = 1
+    # Trading days each position is held
+    holding_period: int = 5
+
+    # "equal" splits capital evenly across open positions every day,
+    # "fixed" allocates position_size of capital to every open position.
+    sizing: str = "equal"
+    position_size: float = 0.05
+
+    # Short ideas are sold short. When False every selected idea is bought.
+    follow_direction: bool = True
+
+    def __post_init__(self):
+        if self.entry_delay < 1:
+            raise ValueError("entry_delay must be at least 1 trading day")
+        if self.holding_period < 1:
+            raise ValueError("holding_period must be at least 1 trading day")
+        if self.sizing not in SIZING_MODES:
+            raise ValueError(f"sizing must be one of {SIZING_MODES}")
+        # Lists from json configs are normalized so strategies stay hashable
+        for name in ("user_ids", "company_ids"):
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, tuple):
+                object.__setattr__(self, name, tuple(value))
+        for name in ("start_date", "end_date"):
+            value = getattr(self, name)
+            if isinstance(value, str):
+                object.__setattr__(self, name, date.fromisoformat(value))
+
+    def with_params(self, **params: Any) -> "Strategy":
+        return replace(self, **params)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the API, run against a synthetic SQLite database.
+"""
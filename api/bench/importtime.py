@@ -0,0 +1,121 @@
+"""
+Import time benchmark for API cold starts.
+
+Imports a module (api.main by default) in fresh interpreters under
+`python -X importtime` and reports the median time per module, slowest
+first. Results can be saved as JSON and compared with an earlier run, which
+also lists modules that are imported now and weren't before: a new eager
+import of a heavy dependency shows up there even when timings are noisy.
+
+Usage:
+    python -m api.bench.importtime --output before.json
+    python -m api.bench.importtime --compare before.json --max-regression 20
+    python -m api.bench.importtime --module api.jobs.bulk_load --runs 10
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) per line of -X importtime output."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            # The header line
+            continue
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_once(module: str) -> Dict[str, int]:
+    """Cumulative import time of every module imported by importing module, in µs."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return {name: cumulative for name, _, cumulative in parse_importtime(result.stderr)}
+
+
+def measure(module: str = "api.main", runs: int = 5) -> Dict[str, Any]:
+    """Median import times over runs fresh interpreters."""
+    samples = [import_once(module) for _ in range(runs)]
+    names = set().union(*samples)
+    modules = {
+        name: statistics.median(sample.get(name, 0) for sample in samples) / 1000 for name in names
+    }
+    return {
+        "module": module,
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "total_ms": modules.get(module, 0.0),
+        "modules": dict(sorted(modules.items(), key=lambda item: -item[1])),
+    }
+
+
+def format_table(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None, top: int = 25) -> str:
+    before = baseline["modules"] if baseline is not None else {}
+    header = f"{'module':<50} {'ms':>8}"
+    if baseline is not None:
+        header += f" {'Δ ms':>8}"
+    lines = [header, "-" * len(header)]
+    for name, ms in list(report["modules"].items())[:top]:
+        line = f"{name:<50} {ms:>8.1f}"
+        if baseline is not None:
+            line += f" {ms - before[name]:>+8.1f}" if name in before else f" {'new':>8}"
+        lines.append(line)
+    lines.append(f"{report['module'] + ' total':<50} {report['total_ms']:>8.1f}")
+    if baseline is not None:
+        added = sorted(set(report["modules"]) - set(before))
+        if added:
+            lines.append(f"Imported now but not in the baseline: {', '.join(added)}")
+    return "\n".join(lines)
+
+
+def regression(report: Dict[str, Any], baseline: Dict[str, Any]) -> float:
+    """How much slower the import is than the baseline, in percent."""
+    if not baseline["total_ms"]:
+        return 0.0
+    return (report["total_ms"] / baseline["total_ms"] - 1) * 100
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import time benchmark for API cold starts")
+    parser.add_argument("--module", default="api.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to take the median of")
+    parser.add_argument("--top", type=int, default=25, help="Slowest modules to list")
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float,
+                        help="Fail when the import is this many percent slower than --compare")
+    args = parser.parse_args()
+
+    report = measure(args.module, args.runs)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    print(format_table(report, baseline, args.top))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    if baseline is not None and args.max_regression is not None:
+        slower = regression(report, baseline)
+        if slower > args.max_regression:
+            print(f"Import is {slower:.0f}% slower than the baseline (limit {args.max_regression:.0f}%)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
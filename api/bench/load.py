@@ -0,0 +1,324 @@
+"""
+Load benchmark for the API.
+
+Workers send a weighted mix of requests for a fixed time and the benchmark
+reports throughput and latency percentiles per scenario:
+
+- list: the first page of ideas
+- deep_page: a page far into the ideas list
+- filter: ideas filtered on direction, contest wins and a date range
+- sort_performance: ideas sorted by one year performance
+- detail: an idea with its description, catalysts and performance
+- search: companies and authors by name
+
+Ids, tickers and author names for the requests are sampled from the API
+itself, so it runs against any database, e.g. one seeded with
+python -m api.bench.data. Results can be saved as JSON and compared with an
+earlier run.
+
+Usage:
+    python -m api.bench.load --url http://localhost:8000 --duration 30 --workers 8 --output run.json
+    python -m api.bench.load --url http://localhost:8000 --compare run.json
+    python -m api.bench.load --in-process --ideas 5000
+"""
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MIX = {
+    "list": 20,
+    "deep_page": 10,
+    "filter": 15,
+    "sort_performance": 15,
+    "detail": 30,
+    "search": 10,
+}
+
+PAGE_SIZE = 50
+
+
+class Sample:
+    """Ids, tickers and names to build requests from, read from the API."""
+
+    def __init__(self, client):
+        ideas = client.get("/ideas/", params={"limit": 1000}).json()
+        users = client.get("/users/", params={"limit": 1000}).json()
+        if not ideas:
+            raise RuntimeError("The API has no ideas to benchmark, seed the database first")
+        self.idea_ids = [idea["id"] for idea in ideas]
+        self.tickers = sorted({idea["company_id"] for idea in ideas})
+        self.usernames = [user["username"] for user in users if user.get("username")]
+        dates = [datetime.fromisoformat(idea["date"]).date() for idea in ideas]
+        self.first_date = min(dates)
+        self.last_date = max(dates)
+
+
+def scenarios(sample: Sample, deep_offset: int) -> Dict[str, Callable[[random.Random], Tuple[str, Dict[str, Any]]]]:
+    """Request builders per scenario: a path and query parameters from a random generator."""
+
+    def list_page(rng):
+        return "/ideas/", {"limit": PAGE_SIZE}
+
+    def deep_page(rng):
+        return "/ideas/", {"skip": rng.randrange(deep_offset // 2, deep_offset), "limit": PAGE_SIZE}
+
+    def filtered(rng):
+        days = max((sample.last_date - sample.first_date).days, 1)
+        start = sample.first_date + timedelta(days=rng.randrange(days))
+        params: Dict[str, Any] = {
+            "is_short": rng.choice(["true", "false"]),
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=3 * 365)).isoformat(),
+            "limit": PAGE_SIZE,
+        }
+        if rng.random() < 0.3:
+            params["is_contest_winner"] = "true"
+        return "/ideas/", params
+
+    def sort_performance(rng):
+        return "/ideas/", {
+            "sort_by": "performance",
+            "performance_period": "one_year_perf",
+            "sort_order": rng.choice(["asc", "desc"]),
+            "limit": PAGE_SIZE,
+        }
+
+    def detail(rng):
+        return f"/ideas/{rng.choice(sample.idea_ids)}", {}
+
+    def search(rng):
+        if sample.usernames and rng.random() < 0.5:
+            return "/users/", {"search": rng.choice(sample.usernames)[:3]}
+        return "/companies/", {"search": rng.choice(sample.tickers)[:3]}
+
+    return {
+        "list": list_page,
+        "deep_page": deep_page,
+        "filter": filtered,
+        "sort_performance": sort_performance,
+        "detail": detail,
+        "search": search,
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles, in milliseconds, of one scenario."""
+    values = sorted(latency * 1000 for latency in latencies)
+
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, 3)
+
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else None,
+        "mean_ms": rounded(sum(values) / len(values)) if values else None,
+        "p50_ms": rounded(percentile(values, 0.50)),
+        "p90_ms": rounded(percentile(values, 0.90)),
+        "p95_ms": rounded(percentile(values, 0.95)),
+        "p99_ms": rounded(percentile(values, 0.99)),
+        "max_ms": rounded(values[-1]) if values else None,
+    }
+
+
+def run(
+    client_factory: Callable[[], Any],
+    duration: Optional[float] = 10.0,
+    requests: Optional[int] = None,
+    workers: int = 4,
+    mix: Optional[Dict[str, int]] = None,
+    deep_offset: int = 10000,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Send the mix from workers threads, each with a client from client_factory
+    (anything with an httpx-style get), until duration seconds have passed or
+    requests requests were sent.
+    """
+    mix = mix or MIX
+    sample = Sample(client_factory())
+    builders = scenarios(sample, deep_offset)
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+
+    results: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    lock = threading.Lock()
+    sent = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    def take() -> bool:
+        nonlocal sent
+        with lock:
+            if requests is not None and sent >= requests:
+                return False
+            sent += 1
+        return deadline is None or time.perf_counter() < deadline
+
+    def work(worker: int):
+        rng = random.Random(seed * 1000 + worker)
+        client = client_factory()
+        while take():
+            name = rng.choices(names, weights)[0]
+            path, params = builders[name](rng)
+            request_started = time.perf_counter()
+            try:
+                ok = client.get(path, params=params).status_code < 400
+            except Exception:
+                ok = False
+            latency = time.perf_counter() - request_started
+            with lock:
+                if ok:
+                    results[name].append(latency)
+                else:
+                    errors[name] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(work, range(workers)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(elapsed, 3),
+        "workers": workers,
+        "mix": {name: mix[name] for name in names},
+        "deep_offset": deep_offset,
+        "scenarios": {name: summarize(results[name], errors[name], elapsed) for name in names},
+        "total": summarize([v for name in names for v in results[name]], sum(errors.values()), elapsed),
+    }
+
+
+def format_table(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    def cell(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:,.1f}"
+
+    def change(name: str, key: str, value: Optional[float]) -> str:
+        if baseline is None:
+            return ""
+        before = (baseline["scenarios"].get(name) if name != "total" else baseline["total"]) or {}
+        if not value or not before.get(key):
+            return f" {'':>7}"
+        return f" {(value / before[key] - 1) * 100:>+6.0f}%"
+
+    header = f"{'scenario':<17} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    if baseline is not None:
+        header += f" {'req/s Δ':>7} {'p50 Δ':>7} {'p99 Δ':>7}"
+    lines = [header, "-" * len(header)]
+    rows = list(report["scenarios"].items()) + [("total", report["total"])]
+    for name, row in rows:
+        line = (
+            f"{name:<17} {row['requests']:>8} {row['errors']:>6} {cell(row['throughput_rps']):>8} "
+            f"{cell(row['p50_ms']):>8} {cell(row['p90_ms']):>8} {cell(row['p99_ms']):>8} {cell(row['max_ms']):>8}"
+        )
+        line += change(name, "throughput_rps", row["throughput_rps"])
+        line += change(name, "p50_ms", row["p50_ms"])
+        line += change(name, "p99_ms", row["p99_ms"])
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _in_process_client_factory(ideas: int, directory: str) -> Callable[[], Any]:
+    """Clients of the app itself on a seeded SQLite file, so workers get connections of their own."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+
+    from api.bench.data import seed
+    from api.database import get_db, get_read_db
+    from api.jobs.author_stats import refresh_author_stats
+    from api.main import app
+    from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
+
+    engine = create_engine(f"sqlite:///{directory}/bench.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, ideas=ideas, companies=max(1, ideas // 5), users=max(1, ideas // 8))
+        refresh_author_stats(session, full=True)
+    SessionLocal = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    return lambda: TestClient(app)
+
+
+def main() -> int:
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Load benchmark for the API")
+    parser.add_argument("--url", default="http://localhost:8000", help="API to benchmark")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Benchmark the app in this process on a seeded SQLite database instead")
+    parser.add_argument("--ideas", type=int, default=5000, help="Ideas to seed with --in-process")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--deep-offset", type=int, default=10000, help="Deepest skip of the deep_page scenario")
+    parser.add_argument("--mix", help="Scenario weights, e.g. list=1,detail=3 (default: the built-in mix)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    mix = None
+    if args.mix:
+        mix = {name: int(weight) for name, _, weight in (part.partition("=") for part in args.mix.split(","))}
+        unknown = set(mix) - set(MIX)
+        if unknown:
+            parser.error(f"Unknown scenarios {', '.join(sorted(unknown))}, choose from {', '.join(MIX)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.in_process:
+            client_factory = _in_process_client_factory(args.ideas, directory)
+            target = f"in-process ({args.ideas} ideas)"
+        else:
+            import httpx
+            client_factory = lambda: httpx.Client(base_url=args.url, timeout=30)  # noqa: E731
+            target = args.url
+        report = run(
+            client_factory,
+            duration=None if args.requests else args.duration,
+            requests=args.requests,
+            workers=args.workers,
+            mix=mix,
+            deep_offset=args.deep_offset,
+            seed=args.seed,
+        )
+    report["target"] = target
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(format_table(report, baseline))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Python overhead of the ideas listing query per request.
+
+Runs a mix of listing requests (different filter shapes, each with changing
+values) straight against the session, three ways:
+
+- "query, no cache": a new ORM Query per request, as get_ideas used to build
+  it, on an engine without a compiled cache, so every request is compiled;
+- "query": the same with SQLAlchemy's compiled cache, which still has to
+  build the query and compute its cache key every time;
+- "cached select": api/idea_query.py, one select() per filter shape with the
+  values as bound parameters.
+
+Pages are small and the database is in memory, so the time per request is
+mostly Python: building, compiling and executing the statement and loading
+the rows. The report has the time spent building the statement alone, the
+time per request and the requests per second one process could serve at that
+cost.
+
+Usage:
+    python -m api.bench.query_overhead
+    python -m api.bench.query_overhead --requests 5000 --limit 50
+"""
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from api.bench.data import memory_session, seed
+from api.filters import IdeaFilters, apply_idea_filters
+from api.idea_query import ideas_statement
+from api.models import Idea, Performance
+from api.performance import PERFORMANCE_PERIODS, performance_column
+
+
+def legacy_query(db: Session, filters: IdeaFilters, sort_by: str, sort_order: str, skip: int, limit: int):
+    """The listing query as get_ideas built it before api/idea_query.py."""
+    query = db.query(Idea)
+    joined = filters.needs_performance or sort_by == "performance"
+    if joined:
+        query = query.outerjoin(Performance, Idea.id == Performance.idea_id)
+    query = apply_idea_filters(query, filters, performance_joined=joined)
+    column = performance_column(filters.performance_period) if sort_by == "performance" else Idea.date
+    query = query.order_by(column.asc() if sort_order.lower() == "asc" else column.desc())
+    return query.offset(skip).limit(limit)
+
+
+def cached_select(db: Session, filters: IdeaFilters, sort_by: str, sort_order: str, skip: int, limit: int):
+    statement, params = ideas_statement(filters, sort_by, sort_order, skip, limit)
+    return lambda: db.scalars(statement, params).all()
+
+
+def rebuilt_query(*args):
+    return legacy_query(*args).all
+
+
+# Each builds a request's statement and returns a function that runs it
+STRATEGIES: Dict[str, Callable[..., Any]] = {
+    "query, no cache": rebuilt_query,
+    "query": rebuilt_query,
+    "cached select": cached_select,
+}
+
+
+def listing_requests(count: int, limit: int = 20, companies: int = 200, users: int = 300) -> List[Dict[str, Any]]:
+    """A mix of listing requests over the tickers and authors seed() creates."""
+    requests = []
+    for i in range(count):
+        period = PERFORMANCE_PERIODS[i % len(PERFORMANCE_PERIODS)].key
+        shapes: List[Dict[str, Any]] = [
+            {},
+            {"filters": IdeaFilters(is_short=i % 2 == 0)},
+            {"filters": IdeaFilters(company_id=f"C{i % companies:04d} US")},
+            {"filters": IdeaFilters(user_id=f"https://valueinvestorsclub.com/users/author{i % users}")},
+            {"filters": IdeaFilters(has_performance=True, performance_period=period), "sort_by": "performance"},
+            {"filters": IdeaFilters(min_performance=-0.5 + i % 10 / 10, performance_period=period)},
+            {"filters": IdeaFilters(start_date=date(2000 + i % 5, 1, 1)), "sort_order": "asc"},
+        ]
+        request: Dict[str, Any] = {
+            "filters": IdeaFilters(), "sort_by": "date", "sort_order": "desc", "skip": i % 5 * limit, "limit": limit,
+        }
+        request.update(shapes[i % len(shapes)])
+        requests.append(request)
+    return requests
+
+
+def _args(db: Session, request: Dict[str, Any]) -> tuple:
+    return db, request["filters"], request["sort_by"], request["sort_order"], request["skip"], request["limit"]
+
+
+def measure(session: Session, strategy: str, requests: List[Dict[str, Any]], repeat: int = 3) -> Dict[str, Any]:
+    """Fastest of repeat passes over requests, per request."""
+    db = session
+    if strategy == "query, no cache":
+        db = Session(session.get_bind().execution_options(compiled_cache=None))
+    build = STRATEGIES[strategy]
+    build_s = request_s = float("inf")
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            runs = [build(*_args(db, request)) for request in requests]
+            built = time.perf_counter()
+            for run in runs:
+                run()
+            build_s = min(build_s, built - start)
+            request_s = min(request_s, time.perf_counter() - start)
+    finally:
+        if db is not session:
+            db.close()
+    return {
+        "strategy": strategy,
+        "build_us": build_s / len(requests) * 1e6,
+        "request_us": request_s / len(requests) * 1e6,
+        "requests_per_s": len(requests) / request_s,
+    }
+
+
+def run(session: Session, requests: int = 2000, limit: int = 20, repeat: int = 3) -> List[Dict[str, Any]]:
+    mix = listing_requests(requests, limit)
+    # Warm every cache up before timing
+    for strategy in STRATEGIES:
+        measure(session, strategy, mix, repeat=1)
+    return [measure(session, strategy, mix, repeat) for strategy in STRATEGIES]
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    header = f"{'strategy':<16} {'build µs':>10} {'request µs':>11} {'requests/s':>11}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['strategy']:<16} {row['build_us']:>10.1f} {row['request_us']:>11.1f} "
+            f"{row['requests_per_s']:>11,.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the Python overhead of the ideas listing query")
+    parser.add_argument("--ideas", type=int, default=2000, help="Synthetic ideas to seed")
+    parser.add_argument("--requests", type=int, default=2000, help="Listing requests per pass")
+    parser.add_argument("--limit", type=int, default=20, help="Ideas per page")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per strategy, the fastest is reported")
+    args = parser.parse_args()
+
+    session = memory_session()
+    seed(session, ideas=args.ideas, description_words=20)
+    print(format_table(run(session, args.requests, args.limit, args.repeat)))
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
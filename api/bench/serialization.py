@@ -0,0 +1,129 @@
+"""
+Response size and JSON serialization time per endpoint.
+
+For each endpoint the benchmark requests the uncompressed body from the app,
+reports its size raw, gzip and brotli compressed at the configured levels,
+and times rendering the same response four ways: jsonable_encoder +
+json.dumps (what FastAPI releases without the Pydantic fast path do by
+default), jsonable_encoder + orjson (FastJSONResponse on those releases),
+dump_python + orjson (FastJSONResponse fed by Pydantic directly) and
+Pydantic's dump_json (the fast path of newer releases).
+
+Usage:
+    python -m api.bench.serialization
+    python -m api.bench.serialization --ideas 5000 --repeat 20
+"""
+import gzip
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from api import responses
+from api.bench.data import memory_session, seed
+from api.database import get_db, get_read_db
+from api.schemas import CompanyTimelineResponse, IdeaDetailResponse, IdeaResponse, LeaderboardResponse
+
+
+def endpoints(session: Session) -> List[Dict[str, Any]]:
+    from api.models import Idea
+
+    idea = session.query(Idea).order_by(Idea.id).first()
+    assert idea is not None, "No ideas to benchmark, seed the database first"
+    return [
+        {"name": "ideas list (1000)", "path": "/ideas/?limit=1000", "type": List[IdeaResponse]},
+        {"name": "idea detail", "path": f"/ideas/{idea.id}", "type": IdeaDetailResponse},
+        {"name": "company timeline", "path": f"/companies/{idea.company_id}/ideas", "type": CompanyTimelineResponse},
+        {"name": "leaderboard (100)", "path": "/users/leaderboard?limit=100&min_ideas=1", "type": LeaderboardResponse},
+    ]
+
+
+def best_time(fn: Callable[[], Any], repeat: int) -> float:
+    """Fastest of repeat runs of fn, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure(client: TestClient, endpoint: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    response = client.get(endpoint["path"], headers={"Accept-Encoding": "identity"})
+    response.raise_for_status()
+    body = response.content
+    adapter = TypeAdapter(endpoint["type"])
+    value = adapter.validate_json(body)
+
+    row: Dict[str, Any] = {
+        "endpoint": endpoint["name"],
+        "raw": len(body),
+        "gzip": len(gzip.compress(body, compresslevel=responses.GZIP_LEVEL)),
+        "br": len(responses.brotli.compress(body, quality=responses.BROTLI_QUALITY)) if responses.brotli else None,
+        "json_ms": best_time(lambda: json.dumps(jsonable_encoder(value)).encode(), repeat),
+        "orjson_ms": None,
+        "dump_orjson_ms": None,
+        "dump_json_ms": best_time(lambda: adapter.dump_json(value), repeat),
+        "request_ms": best_time(lambda: client.get(endpoint["path"]), repeat),
+    }
+    if responses.orjson is not None:
+        row["orjson_ms"] = best_time(lambda: responses.orjson.dumps(jsonable_encoder(value)), repeat)
+        row["dump_orjson_ms"] = best_time(lambda: responses.orjson.dumps(adapter.dump_python(value, mode="json")), repeat)
+    return row
+
+
+def run(session: Session, repeat: int = 10) -> List[Dict[str, Any]]:
+    from api.main import app
+
+    def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    try:
+        with TestClient(app) as client:
+            return [measure(client, endpoint, repeat) for endpoint in endpoints(session)]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    def cell(value: Optional[float], digits: int = 0) -> str:
+        return "-" if value is None else f"{value:,.{digits}f}"
+
+    header = f"{'endpoint':<20} {'raw B':>10} {'gzip B':>9} {'br B':>9} {'json ms':>8} {'orjson ms':>10} {'dump+orjson ms':>15} {'dump_json ms':>13} {'request ms':>11}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['endpoint']:<20} {cell(row['raw']):>10} {cell(row['gzip']):>9} {cell(row['br']):>9} "
+            f"{cell(row['json_ms'], 2):>8} {cell(row['orjson_ms'], 2):>10} {cell(row['dump_orjson_ms'], 2):>15} "
+            f"{cell(row['dump_json_ms'], 2):>13} {cell(row['request_ms'], 2):>11}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    import argparse
+    from api.jobs.author_stats import refresh_author_stats
+
+    parser = argparse.ArgumentParser(description="Measure response sizes and JSON serialization time per endpoint")
+    parser.add_argument("--ideas", type=int, default=2000, help="Synthetic ideas to seed")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement, the fastest is reported")
+    args = parser.parse_args()
+
+    session = memory_session()
+    seed(session, ideas=args.ideas)
+    refresh_author_stats(session, full=True)
+    print(f"FastAPI dump_json fast path: {responses.pydantic_fast_path()}, "
+          f"orjson: {responses.orjson is not None}, brotli: {responses.brotli is not None}")
+    print(format_table(run(session, args.repeat)))
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
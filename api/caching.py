@@ -0,0 +1,48 @@
+"""
+HTTP caching helpers for read-only endpoints.
+
+The data only changes when the scraper or pricing jobs run, so responses can
+be cached by browsers and proxies for a while and revalidated cheaply with an
+ETag afterwards: a matching If-None-Match gets an empty 304 instead of the
+body.
+"""
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+# Seconds clients and shared caches may reuse a response without revalidating
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", "300"))
+
+
+def compute_etag(body: bytes) -> str:
+    """Weak ETag for a serialized response body."""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x" and W/"x"
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def cacheable(request: Request, response: Response, payload: BaseModel, max_age: Optional[int] = None):
+    """
+    Return payload as JSON with Cache-Control and ETag headers, or a 304 Not
+    Modified when the client already has this version. The body hashed for
+    the ETag is the one sent, so the payload is only serialized once.
+    """
+    max_age = CACHE_MAX_AGE if max_age is None else max_age
+    body = payload.model_dump_json().encode()
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
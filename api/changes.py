@@ -0,0 +1,90 @@
+"""
+Change feed for consumers of the data.
+
+Writers bump the data versions and log the ideas they touched (see
+models/versions.py). GET /changes?since=<change id> returns the log after a
+change id with the current versions, so caches, the frontend and analytics
+jobs can refresh the ideas that changed instead of polling full lists. A
+change without an idea id means everything may have changed.
+
+With `Accept: text/event-stream` the endpoint streams the changes as
+Server-Sent Events instead, each with its change id as the event id, so a
+browser's EventSource resumes where it left off (Last-Event-ID) when it
+reconnects. The stream polls the log every CHANGES_POLL_INTERVAL seconds in
+a session of its own, sends a comment every CHANGES_HEARTBEAT seconds to keep
+proxies from timing the connection out, and ends after
+CHANGES_STREAM_TIMEOUT seconds so workers can be recycled; clients then
+reconnect.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from api.models import IdeaChange
+from api.schemas import ChangeResponse, ChangesResponse
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import ALL, current_versions
+
+CHANGES_POLL_INTERVAL = float(os.getenv("CHANGES_POLL_INTERVAL", "2"))
+CHANGES_HEARTBEAT = float(os.getenv("CHANGES_HEARTBEAT", "15"))
+CHANGES_STREAM_TIMEOUT = float(os.getenv("CHANGES_STREAM_TIMEOUT", "300"))
+
+
+def read_changes(db: Session, since: int, limit: int) -> List[ChangeResponse]:
+    """Up to limit changes after the change id since, oldest first."""
+    rows = db.scalars(select(IdeaChange).where(IdeaChange.id > since).order_by(IdeaChange.id).limit(limit))
+    return [ChangeResponse.model_validate(row) for row in rows]
+
+
+def changes_since(db: Session, since: int, limit: int) -> ChangesResponse:
+    """A page of the change log with the current data versions."""
+    changes = read_changes(db, since, limit + 1)
+    versions = {name: row.version for name, row in current_versions(db).items()}
+    page = changes[:limit]
+    return ChangesResponse(
+        version=versions.pop(ALL, 0),
+        versions=versions,
+        changes=page,
+        next_since=page[-1].id if page else since,
+        has_more=len(changes) > limit,
+    )
+
+
+def sse_event(change: ChangeResponse) -> str:
+    return f"id: {change.id}\nevent: change\ndata: {change.model_dump_json()}\n\n"
+
+
+def _read_batch(bind, since: int, limit: int) -> List[ChangeResponse]:
+    with Session(bind=bind) as session:
+        return read_changes(session, since, limit)
+
+
+async def stream_changes(bind, since: int, limit: int) -> AsyncIterator[str]:
+    """Changes after since as Server-Sent Events, polled until CHANGES_STREAM_TIMEOUT."""
+    # How long EventSource waits before reconnecting
+    yield f"retry: {int(CHANGES_POLL_INTERVAL * 1000)}\n\n"
+    started = last_sent = time.monotonic()
+    while True:
+        # The body is sent after the request's own session may have been
+        # closed, so every poll has a session of its own on the same engine
+        batch = await run_in_threadpool(_read_batch, bind, since, limit)
+        for change in batch:
+            yield sse_event(change)
+            since = change.id
+        if batch:
+            last_sent = time.monotonic()
+            if len(batch) == limit:
+                # More are waiting
+                continue
+        if time.monotonic() - started >= CHANGES_STREAM_TIMEOUT:
+            yield f"event: timeout\ndata: {json.dumps({'next_since': since})}\n\n"
+            return
+        if time.monotonic() - last_sent >= CHANGES_HEARTBEAT:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(CHANGES_POLL_INTERVAL)
@@ -0,0 +1,153 @@
+"""
+Result totals for the ideas list.
+
+A COUNT(*) next to every page would read as many rows as the page query
+again, and for broad filters all of them. count_ideas() avoids most of that:
+
+- Exact counts are cached per filter signature for COUNT_CACHE_TTL seconds,
+  so paging through a result set or returning to a filter costs nothing.
+- On Postgres the planner's row estimate is read first (an EXPLAIN, which
+  doesn't touch the table). Above EXACT_COUNT_LIMIT rows the estimate is
+  returned as is: "about 250,000 results" needs no exact figure and would
+  cost the most to count.
+- Anything else is counted exactly, and cached.
+
+Cached counts, and the facets cached the same way (api/facets.py), are
+dropped as soon as the "all" data version moves past the one they were
+computed at (see models/versions.py), which is checked at most every
+DATA_VERSION_CHECK_INTERVAL seconds. A replica further behind than one
+already seen reports an older version, which is ignored.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from api.filters import IdeaFilters, apply_idea_filters
+from api.idea_index import data_version
+from api.models import Idea
+
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "300"))
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", "1024"))
+EXACT_COUNT_LIMIT = int(os.getenv("EXACT_COUNT_LIMIT", "100000"))
+DATA_VERSION_CHECK_INTERVAL = float(os.getenv("DATA_VERSION_CHECK_INTERVAL", "5"))
+
+
+@dataclass(frozen=True)
+class Total:
+    count: int
+    exact: bool
+
+
+class ResultCache:
+    """Least recently used results per filter signature, each kept for ttl seconds."""
+
+    def __init__(self, size: int = COUNT_CACHE_SIZE, ttl: float = COUNT_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._results: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def get(self, key: tuple) -> Any:
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, result: Any):
+        with self._lock:
+            self._results[key] = (time.monotonic(), result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+# Every ResultCache, to clear when the data changes
+_caches: List[ResultCache] = []
+_cache = ResultCache()
+_version_lock = threading.Lock()
+_seen_version = 0
+_version_checked_at = -math.inf
+
+
+def clear_count_cache():
+    global _seen_version, _version_checked_at
+    _cache.clear()
+    _seen_version = 0
+    _version_checked_at = -math.inf
+
+
+def check_data_version(db: Session):
+    """Clear every result cache if the data changed since they were filled."""
+    global _seen_version, _version_checked_at
+    if time.monotonic() - _version_checked_at < DATA_VERSION_CHECK_INTERVAL:
+        return
+    # One request checks while the others keep using the caches
+    if not _version_lock.acquire(blocking=False):
+        return
+    try:
+        version = data_version(db)
+        if version > _seen_version:
+            for cache in _caches:
+                cache.clear()
+            _seen_version = version
+    except SQLAlchemyError as e:
+        # A database without data versions yet, results expire after their ttl
+        print(f"Error checking the data version: {e}")
+        db.rollback()
+    finally:
+        _version_checked_at = time.monotonic()
+        _version_lock.release()
+
+
+def remember_count(filters: IdeaFilters, count: int):
+    """Cache an exact count of the filters that was computed elsewhere."""
+    _cache.put(filters.signature(), count)
+
+
+def _filtered_ids(filters: IdeaFilters):
+    return apply_idea_filters(select(Idea.id), filters)
+
+
+def planner_estimate(db: Session, filters: IdeaFilters) -> Optional[int]:
+    """Rows Postgres expects the filters to select, or None on other databases."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = _filtered_ids(filters).compile(dialect=bind.dialect)
+    plan: Any = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_ideas(db: Session, filters: IdeaFilters) -> Total:
+    """Number of ideas matching filters, exact or a planner estimate."""
+    check_data_version(db)
+    key = filters.signature()
+    cached = _cache.get(key)
+    if cached is not None:
+        return Total(cached, exact=True)
+
+    estimate = planner_estimate(db, filters)
+    if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+        return Total(estimate, exact=False)
+
+    count = db.scalar(select(func.count()).select_from(_filtered_ids(filters).subquery())) or 0
+    _cache.put(key, count)
+    return Total(count, exact=True)
@@ -2,6 +2,16 @@
 Database package for the ValueInvestorsClub API.
 Provides database connection and session management.
 """
-from api.database.connection import get_db, engine
+from typing import Any
 
-__all__ = ["get_db", "engine"]
\ No newline at end of file
+from api.database.connection import get_db, get_engine
+from api.database.replicas import get_read_db
+
+__all__ = ["get_db", "get_read_db", "get_engine", "engine"]
+
+
+def __getattr__(name: str) -> Any:
+    # The engine is created on first use, see connection.py
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,155 @@
+"""
+Read replica routing.
+
+With DATABASE_REPLICA_URLS set, read-only routes get their session from
+get_read_db instead of get_db, on one of the replicas in turn. Only
+replicas that passed their last check are used:
+
+- each replica is checked at most every REPLICA_CHECK_INTERVAL seconds, by
+  the first request that finds its check outdated: it must answer, and on
+  Postgres be streaming changes from the primary and be at most
+  REPLICA_MAX_LAG seconds behind it in replaying them;
+- a replica that fails a check, or a request's connection attempt, is
+  skipped until a later check passes, and the request tries the next one;
+- without a usable replica, reads go to the primary.
+
+Writers (the scraper pipeline, pricing and other jobs, health checks of the
+primary) always use the primary through get_db or the engine.
+"""
+import itertools
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from api.database.connection import DATABASE_REPLICA_URLS, get_engine
+
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "30"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+
+# Seconds since the last replayed change, or 0 when everything received has
+# been replayed (an idle primary sends nothing to replay). NULL when the
+# replica isn't streaming from the primary: everything received is replayed
+# then, but nothing new arrives, so how far behind it is can't be told.
+# Seeing the receiver's status takes pg_read_all_stats (or pg_monitor).
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def replica_lag(connection: Connection) -> Optional[float]:
+    """How far behind the primary the replica is, in seconds, or None if it isn't replicating."""
+    if connection.dialect.name != "postgresql":
+        # Stand-ins for tests and development have no replication
+        connection.execute(text("SELECT 1"))
+        return 0.0
+    lag = connection.execute(text(LAG_SQL)).scalar()
+    return None if lag is None else float(lag)
+
+
+@dataclass
+class Replica:
+    url: str
+    healthy: bool = False
+    lag: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: float = -math.inf
+
+    @property
+    def usable(self) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= REPLICA_MAX_LAG
+
+
+class ReplicaSet:
+    """Replicas of the primary and the state of their last checks."""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def check(self, replica: Replica):
+        try:
+            with get_engine(replica.url).connect() as connection:
+                replica.lag = replica_lag(connection)
+            replica.healthy, replica.error = True, None
+            if replica.lag is None:
+                replica.error = "NotStreaming"
+                print(f"Read replica unavailable: {replica.error}")
+        except SQLAlchemyError as e:
+            self.mark_failed(replica, e)
+        replica.checked_at = time.monotonic()
+
+    def mark_failed(self, replica: Replica, error: Exception):
+        replica.healthy, replica.error = False, type(error).__name__
+        print(f"Read replica unavailable: {replica.error}")
+
+    def refresh(self):
+        """Check the replicas whose last check is outdated, unless another request is at it."""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            for replica in self.replicas:
+                if time.monotonic() - replica.checked_at >= REPLICA_CHECK_INTERVAL:
+                    self.check(replica)
+        finally:
+            self._lock.release()
+
+    def candidates(self) -> Iterator[Replica]:
+        """Usable replicas, starting with the next one's turn."""
+        self.refresh()
+        usable = [replica for replica in self.replicas if replica.usable]
+        if not usable:
+            return iter(())
+        start = next(self._turn) % len(usable)
+        return iter(usable[start:] + usable[:start])
+
+
+_replicas: Optional[ReplicaSet] = None
+
+
+def replica_set() -> ReplicaSet:
+    global _replicas
+    if _replicas is None:
+        _replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+    return _replicas
+
+
+def read_session() -> Session:
+    """A session on a usable replica, or on the primary."""
+    replicas = replica_set()
+    for replica in replicas.candidates():
+        db = Session(get_engine(replica.url))
+        try:
+            # Fail over now rather than in the middle of the route
+            db.connection()
+            return db
+        except SQLAlchemyError as e:
+            db.close()
+            replicas.mark_failed(replica, e)
+    return Session(get_engine())
+
+
+# Dependency for read-only routes
+def get_read_db():
+    """
+    Yields a session on a read replica, or the primary without one.
+    The session is closed after use.
+    """
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
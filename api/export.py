@@ -0,0 +1,139 @@
+"""
+Bulk export of ideas as NDJSON, CSV or Parquet.
+
+Rows are read through a server-side cursor in batches of EXPORT_BATCH_SIZE and
+encoded one batch at a time, so memory use stays flat regardless of how many
+ideas (and how much description text) are exported.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Iterator, List, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.filters import IdeaFilters, apply_idea_filters
+from api.models import Catalysts, Company, Description, Idea, Performance, User
+from ValueInvestorsClub.ValueInvestorsClub.models.Description import load_dictionary_bytes
+from api.performance import PERFORMANCE_PERIODS
+from ValueInvestorsClub.ValueInvestorsClub.models import compression
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_columns(include_text: bool = False) -> list:
+    """Columns of an export row, optionally with the catalysts and description text."""
+    columns = [
+        Idea.id, Idea.link, Idea.company_id, Company.company_name, Idea.user_id, User.username,
+        Idea.date, Idea.is_short, Idea.is_contest_winner,
+        Performance.nextDayOpen, Performance.nextDayClose,
+        *[getattr(Performance, p.column) for p in PERFORMANCE_PERIODS],
+    ]
+    if include_text:
+        columns += [Catalysts.catalysts, Description.description]
+    return columns
+
+
+def export_names(include_text: bool = False) -> List[str]:
+    """Field names of an export row, in column order."""
+    return [column.key for column in export_columns(include_text)]
+
+
+def export_statement(filters: IdeaFilters, include_text: bool = False):
+    """A select() of export rows matching filters, oldest idea first."""
+    statement = (
+        select(*export_columns(include_text))
+        .outerjoin(Company, Company.ticker == Idea.company_id)
+        .outerjoin(User, User.user_link == Idea.user_id)
+        .outerjoin(Performance, Performance.idea_id == Idea.id)
+    )
+    if include_text:
+        statement = (
+            statement
+            # Compressed descriptions are NULL here and filled in by export_batches
+            .outerjoin(Catalysts, Catalysts.idea_id == Idea.id)
+            .outerjoin(Description, Description.idea_id == Idea.id)
+        )
+    statement = apply_idea_filters(statement, filters, performance_joined=True)
+    return statement.order_by(Idea.date, Idea.id)
+
+
+def stream_batches(db: Session, statement, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence[Any]]:
+    """Execute statement with a server-side cursor and yield lists of rows."""
+    result = db.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _inflate_descriptions(db: Session, batches: Iterator[Sequence[Any]]) -> Iterator[List[tuple]]:
+    """
+    Fill in the text of compressed descriptions, which are NULL in the export
+    row. The compressed columns are only queried for batches that have any,
+    so databases without compressed storage never touch them.
+    """
+    for rows in batches:
+        missing = [row[0] for row in rows if row[-1] is None]
+        texts = {}
+        if missing:
+            for idea_id, compressed, dictionary_id in db.execute(
+                select(Description.idea_id, Description.description_compressed, Description.dictionary_id)
+                .where(Description.idea_id.in_(missing))
+            ):
+                if compressed is None:
+                    continue
+                decompressor = compression.get_decompressor(
+                    compressed, lambda dictionary_id=dictionary_id: load_dictionary_bytes(db, dictionary_id)
+                )
+                texts[idea_id] = compression.decompress_text(compressed, decompressor)
+        yield [tuple(row[:-1]) + (texts.get(row[0], row[-1]),) for row in rows]
+
+
+def export_batches(
+    db: Session, filters: IdeaFilters, include_text: bool = False, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Sequence[Any]]:
+    """Batches of export rows in export_names() order."""
+    batches = stream_batches(db, export_statement(filters, include_text), batch_size)
+    return _inflate_descriptions(db, batches) if include_text else batches
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def iter_ndjson(batches: Iterator[Sequence[Any]], names: List[str]) -> Iterator[str]:
+    """Encode row batches as newline delimited JSON, one chunk per batch."""
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_json_default) + "\n"
+            for row in rows
+        )
+
+
+def iter_csv(batches: Iterator[Sequence[Any]], names: List[str]) -> Iterator[str]:
+    """Encode row batches as CSV with a header row, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for rows in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
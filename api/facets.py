@@ -0,0 +1,120 @@
+"""
+Facet counts for the ideas browser.
+
+ideas_facets() counts the ideas matching a filter set per year, direction,
+contest win and performance availability, plus the companies and authors
+with the most of them. It's a single statement: the filtered ideas are a
+CTE read once, and each facet is a GROUP BY over it, combined with UNION ALL.
+Counts include the facet's own filter, so with is_short=true the long count
+is 0. Results are cached per filter signature like totals (api/counts.py),
+and cleared with them when the data changes, and their total is handed to
+the totals cache too. With the in-process idea
+index enabled (api/idea_index.py) the counts come from it instead.
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy import Integer, String, case, cast, extract, func, literal, not_, null, select, union_all
+from sqlalchemy.orm import Session
+
+from api.counts import ResultCache, check_data_version, remember_count
+from api.filters import IdeaFilters, apply_idea_filters, without_performance
+from api.idea_index import current_index
+from api.models import Company, Idea, Performance, User
+from api.schemas import FacetValue, IdeaFacetsResponse, YearFacet
+
+_cache = ResultCache()
+
+
+def clear_facets_cache():
+    _cache.clear()
+
+
+def _flag(condition):
+    return case((condition, "true"), else_="false")
+
+
+def facets_statement(filters: IdeaFilters, top: int):
+    """The UNION ALL of facet counts: rows of facet, value, label and count."""
+    rows = apply_idea_filters(
+        select(
+            Idea.date,
+            Idea.is_short,
+            Idea.is_contest_winner,
+            Idea.company_id,
+            Idea.user_id,
+            # The complement of the has_performance=false filter
+            not_(without_performance()).label("has_performance"),
+        ).outerjoin(Performance, Idea.id == Performance.idea_id),
+        filters,
+        performance_joined=True,
+    ).cte("filtered_ideas")
+    count = func.count().label("count")
+
+    def grouped(name: str, value) -> Any:
+        return select(
+            literal(name).label("facet"), cast(value, String).label("value"), cast(null(), String).label("label"), count
+        ).group_by(value)
+
+    def top_values(name: str, column, table, key, label_column) -> Any:
+        ranked = (
+            select(column.label("value"), count)
+            .group_by(column)
+            .order_by(func.count().desc(), column)
+            .limit(top)
+            .subquery()
+        )
+        return (
+            select(
+                literal(name).label("facet"), ranked.c.value, cast(label_column, String).label("label"), ranked.c.count
+            ).outerjoin(table, key == ranked.c.value)
+        )
+
+    return union_all(
+        grouped("year", cast(extract("year", rows.c.date), Integer)),
+        grouped("is_short", _flag(rows.c.is_short)),
+        grouped("is_contest_winner", _flag(rows.c.is_contest_winner)),
+        grouped("has_performance", _flag(rows.c.has_performance)),
+        top_values("company", rows.c.company_id, Company, Company.ticker, Company.company_name),
+        top_values("user", rows.c.user_id, User, User.user_link, User.username),
+    )
+
+
+def build_facets(rows) -> IdeaFacetsResponse:
+    """IdeaFacetsResponse from rows of facets_statement()."""
+    flags: Dict[str, Dict[str, int]] = {"is_short": {}, "is_contest_winner": {}, "has_performance": {}}
+    years: List[YearFacet] = []
+    top: Dict[str, List[FacetValue]] = {"company": [], "user": []}
+    for facet, value, label, count in rows:
+        if facet == "year":
+            years.append(YearFacet(year=int(value), count=count))
+        elif facet in flags:
+            flags[facet][value] = count
+        else:
+            top[facet].append(FacetValue(value=value, label=label, count=count))
+    return IdeaFacetsResponse(
+        total=sum(flags["is_short"].values()),
+        years=sorted(years, key=lambda y: y.year),
+        long_count=flags["is_short"].get("false", 0),
+        short_count=flags["is_short"].get("true", 0),
+        contest_winner_count=flags["is_contest_winner"].get("true", 0),
+        with_performance_count=flags["has_performance"].get("true", 0),
+        without_performance_count=flags["has_performance"].get("false", 0),
+        top_companies=sorted(top["company"], key=lambda f: (-f.count, f.value)),
+        top_users=sorted(top["user"], key=lambda f: (-f.count, f.value)),
+    )
+
+
+def ideas_facets(db: Session, filters: IdeaFilters, top: int = 10) -> IdeaFacetsResponse:
+    """Facet counts of the ideas matching filters."""
+    index = current_index(db)
+    if index is not None:
+        return index.facets(filters, top)
+    check_data_version(db)
+    key = (filters.signature(), top)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    facets = build_facets(db.execute(facets_statement(filters, top)).all())
+    _cache.put(key, facets)
+    remember_count(filters, facets.total)
+    return facets
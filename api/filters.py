@@ -0,0 +1,124 @@
+"""
+Idea filters shared by the listing and export endpoints.
+
+IdeaFilters is used as a FastAPI dependency so every endpoint accepts the same
+query parameters, and apply_idea_filters turns them into WHERE clauses on any
+query that selects from ideas. IdeaFilters can also be built directly, e.g.
+by command line jobs.
+"""
+from datetime import date
+from typing import Annotated, Optional
+
+from fastapi import Query
+from sqlalchemy import and_, func, or_
+
+from api.models import Idea, Performance
+from api.performance import DEFAULT_PERFORMANCE_PERIOD, performance_column, performance_columns
+
+
+class IdeaFilters:
+    """Query parameters for filtering ideas."""
+
+    def __init__(
+        self,
+        company_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        is_short: Optional[bool] = None,
+        is_contest_winner: Optional[bool] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        has_performance: Optional[bool] = None,
+        min_performance: Optional[float] = None,
+        max_performance: Optional[float] = None,
+        performance_period: Annotated[
+            str, Query(description="Which performance period to filter/sort by")
+        ] = DEFAULT_PERFORMANCE_PERIOD,
+    ):
+        # An empty query value (?company_id=) doesn't filter
+        self.company_id = company_id or None
+        self.user_id = user_id or None
+        self.is_short = is_short
+        self.is_contest_winner = is_contest_winner
+        self.start_date = start_date
+        self.end_date = end_date
+        self.has_performance = has_performance
+        self.min_performance = min_performance
+        self.max_performance = max_performance
+        self.performance_period = performance_period
+
+    @property
+    def needs_performance(self) -> bool:
+        """Whether the filters reference the performance table."""
+        return (
+            self.has_performance is not None or
+            self.min_performance is not None or
+            self.max_performance is not None
+        )
+
+    def signature(self) -> tuple:
+        """Hashable key of the rows the filters select, e.g. for caching counts."""
+        bounded = self.min_performance is not None or self.max_performance is not None
+        period = self.performance_period if bounded else None
+        return (
+            self.company_id, self.user_id, self.is_short, self.is_contest_winner, self.start_date,
+            self.end_date, self.has_performance, self.min_performance, self.max_performance, period,
+        )
+
+
+def without_performance():
+    """
+    Outer joined ideas without performance: no performance row, or one whose
+    horizon returns are all NULL. The has_performance facet counts the same.
+    """
+    return or_(
+        Performance.idea_id.is_(None),
+        and_(
+            # For filtering out ideas without any performance data where all metrics are null
+            *[column.is_(None) for column in performance_columns()]
+        )
+    )
+
+
+def apply_idea_filters(query, filters: IdeaFilters, performance_joined: bool = False):
+    """
+    Apply filters to a Query or select() over ideas. Performance is outer
+    joined when a filter needs it, unless the caller has joined it already.
+    The filter values may be bind parameters, see api/idea_query.py.
+    """
+    if filters.needs_performance and not performance_joined:
+        query = query.outerjoin(Performance, Idea.id == Performance.idea_id)
+
+    conditions = []
+    if filters.company_id is not None:
+        conditions.append(Idea.company_id == filters.company_id)
+    if filters.user_id is not None:
+        conditions.append(Idea.user_id == filters.user_id)
+    if filters.is_short is not None:
+        conditions.append(Idea.is_short == filters.is_short)
+    if filters.is_contest_winner is not None:
+        conditions.append(Idea.is_contest_winner == filters.is_contest_winner)
+    if filters.start_date is not None:
+        conditions.append(func.date(Idea.date) >= filters.start_date)
+    if filters.end_date is not None:
+        conditions.append(func.date(Idea.date) <= filters.end_date)
+
+    if filters.has_performance is not None:
+        if filters.has_performance:
+            conditions.append(Performance.idea_id.isnot(None))
+        else:
+            conditions.append(without_performance())
+
+    perf_column = performance_column(filters.performance_period)
+    if filters.min_performance is not None:
+        conditions.append(perf_column >= filters.min_performance)
+    if filters.max_performance is not None:
+        conditions.append(perf_column <= filters.max_performance)
+
+    # Ensure required fields are not NULL
+    conditions.extend([
+        Idea.id.isnot(None),
+        Idea.company_id.isnot(None),
+        Idea.user_id.isnot(None),
+        Idea.date.isnot(None),
+    ])
+    return query.where(*conditions)
@@ -0,0 +1,132 @@
+"""
+Readiness checks for load balancers.
+
+A readiness check runs SELECT 1 against the database, reads the data version
+and looks at the connection pool. The result is cached for
+HEALTH_CHECK_INTERVAL seconds and only one check runs at a time, so frequent
+probes from several load balancers cost at most one query per interval.
+
+A process reports itself not ready, before requests start timing out, when:
+- the database is unreachable, or slower than HEALTH_MAX_DB_LATENCY to answer
+  SELECT 1;
+- every pooled connection, overflow included, is checked out;
+- checkouts since the previous check waited more than HEALTH_MAX_POOL_WAIT
+  seconds on average.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from api.metrics import POOL_WAIT_SECONDS
+from api.schemas import PoolStatusResponse, ReadinessResponse
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import ALL, current_versions
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "2"))
+HEALTH_MAX_DB_LATENCY = float(os.getenv("HEALTH_MAX_DB_LATENCY", "0.25"))
+HEALTH_MAX_POOL_WAIT = float(os.getenv("HEALTH_MAX_POOL_WAIT", "0.1"))
+
+_lock = threading.Lock()
+_cached: Optional[Tuple[float, ReadinessResponse]] = None
+# POOL_WAIT_SECONDS count and sum at the previous check
+_last_waits: Tuple[int, float] = (0, 0.0)
+
+
+def pool_status(engine: Engine) -> PoolStatusResponse:
+    """Pool usage, and the checkouts and waits since the previous call."""
+    global _last_waits
+    pool = engine.pool
+
+    def count(name: str) -> Optional[int]:
+        method = getattr(pool, name, None)
+        return method() if method is not None else None
+
+    waits = (POOL_WAIT_SECONDS.count(), POOL_WAIT_SECONDS.sum())
+    checkouts = waits[0] - _last_waits[0]
+    waited = waits[1] - _last_waits[1]
+    _last_waits = waits
+    return PoolStatusResponse(
+        size=count("size"),
+        checked_out=count("checkedout"),
+        overflow=count("overflow"),
+        max_overflow=getattr(pool, "_max_overflow", None),
+        checkouts=checkouts,
+        average_wait_seconds=waited / checkouts if checkouts else None,
+    )
+
+
+def _exhausted(pool: PoolStatusResponse) -> bool:
+    if pool.size is None or pool.checked_out is None or pool.max_overflow is None or pool.max_overflow < 0:
+        return False
+    return pool.checked_out >= pool.size + pool.max_overflow
+
+
+def run_readiness_check(engine: Engine) -> ReadinessResponse:
+    """Check the database and pool now, without the cache."""
+    now = datetime.now()
+    reasons: List[str] = []
+    pool = pool_status(engine)
+    latency = None
+    data_version = None
+    data_age = None
+
+    if _exhausted(pool):
+        # Querying would just queue behind the requests holding connections
+        reasons.append(f"connection pool exhausted ({pool.checked_out} checked out)")
+    else:
+        try:
+            with engine.connect() as connection:
+                started = time.perf_counter()
+                connection.execute(text("SELECT 1"))
+                latency = time.perf_counter() - started
+                try:
+                    version: Any = current_versions(connection).get(ALL)
+                except SQLAlchemyError:
+                    # A database no writer has stamped since the versions table was added
+                    version = None
+        except Exception as e:
+            reasons.append(f"database unreachable: {e.__class__.__name__}")
+        else:
+            if latency > HEALTH_MAX_DB_LATENCY:
+                reasons.append(f"database slow: SELECT 1 took {latency:.3f}s")
+            if version is not None:
+                data_version = str(version.version)
+                data_age = (now - version.changed_at).total_seconds()
+    if pool.average_wait_seconds is not None and pool.average_wait_seconds > HEALTH_MAX_POOL_WAIT:
+        reasons.append(f"connection pool waits average {pool.average_wait_seconds:.3f}s")
+
+    return ReadinessResponse(
+        ready=not reasons,
+        reasons=reasons,
+        checked_at=now,
+        database_latency_seconds=latency,
+        pool=pool,
+        data_version=data_version,
+        data_age_seconds=data_age,
+    )
+
+
+def check_readiness(engine: Engine, max_age: Optional[float] = None) -> ReadinessResponse:
+    """The latest readiness check, run again when it's older than max_age seconds."""
+    global _cached
+    max_age = HEALTH_CHECK_INTERVAL if max_age is None else max_age
+    cached = _cached
+    if cached is not None and time.monotonic() - cached[0] < max_age:
+        return cached[1]
+    with _lock:
+        # Another request may have run the check while this one waited
+        if _cached is not None and time.monotonic() - _cached[0] < max_age:
+            return _cached[1]
+        report = run_readiness_check(engine)
+        _cached = (time.monotonic(), report)
+        return report
+
+
+def clear_readiness_cache():
+    global _cached
+    _cached = None
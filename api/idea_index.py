@@ -0,0 +1,267 @@
+"""
+Optional in-process index of the ideas table.
+
+The idea metadata is small (about 14k rows), yet every listing pays for ORM,
+SQL and planning round trips for simple boolean, date and owner filters.
+With IDEA_INDEX=1 each process loads the key columns of every idea into
+NumPy arrays instead: a bitmap (boolean array) per flag value, an inverted
+index of row numbers per company and per author, day numbers for date
+ranges and the performance columns with their sort orders. Filtering,
+sorting by date or performance, pagination, totals and facets are then
+answered from memory in well under a millisecond per 10k rows.
+
+The index is built on first use and rebuilt once the data version moves
+past the one it was built at (see models/versions.py), which is checked at
+most every IDEA_INDEX_CHECK_INTERVAL seconds. A replica further behind
+reports an older version, which is ignored. Requests keep using the
+previous index while a rebuild runs. Anything the index can't answer, or any failure to
+build it, falls back to the database; a failed check or build is retried
+after IDEA_INDEX_CHECK_INTERVAL too.
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.filters import IdeaFilters
+from api.models import Company, Idea, Performance, User
+from api.performance import PERFORMANCE_PERIODS, performance_period
+from api.schemas import FacetValue, IdeaFacetsResponse, YearFacet
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import ALL, current_versions
+
+IDEA_INDEX = os.getenv("IDEA_INDEX", "0") == "1"
+IDEA_INDEX_CHECK_INTERVAL = float(os.getenv("IDEA_INDEX_CHECK_INTERVAL", "30"))
+
+_PERIOD_COLUMNS = {p.key: i for i, p in enumerate(PERFORMANCE_PERIODS)}
+
+
+def data_version(db: Session) -> int:
+    """The "all" data version, bumped by every write to ideas or performance."""
+    version = current_versions(db).get(ALL)
+    return version.version if version is not None else 0
+
+
+class _Postings:
+    """Row numbers per distinct value of a column, in row order."""
+
+    def __init__(self, values: np.ndarray):
+        self.keys, codes = np.unique(values, return_inverse=True)
+        self.codes = codes.astype(np.int32)
+        self.rows = np.argsort(self.codes, kind="stable").astype(np.int32)
+        self.offsets = np.searchsorted(self.codes[self.rows], np.arange(len(self.keys) + 1))
+        self._lookup = {key: code for code, key in enumerate(self.keys.tolist())}
+
+    def rows_of(self, key: str) -> np.ndarray:
+        code = self._lookup.get(key)
+        if code is None:
+            return np.empty(0, dtype=np.int32)
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+
+class IdeaIndex:
+    """Key columns of every idea, with bitmaps and sort orders to filter and page them."""
+
+    def __init__(self, rows: Sequence[Any], company_names: Dict[str, str], usernames: Dict[str, str],
+                 nulls_smallest: bool, version: Any = None):
+        self.version = version
+        self.size = len(rows)
+        self.ids = np.array([r.id for r in rows], dtype=object)
+        self.links = np.array([r.link or "" for r in rows], dtype=object)
+        self.dates = np.array([r.date for r in rows], dtype="datetime64[us]")
+        self.days = self.dates.astype("datetime64[D]")
+        self.years = self.dates.astype("datetime64[Y]").astype(np.int32) + 1970
+        self.is_short = np.array([bool(r.is_short) for r in rows], dtype=bool)
+        self.is_contest_winner = np.array([bool(r.is_contest_winner) for r in rows], dtype=bool)
+        self.has_performance = np.array([r.performance_id is not None for r in rows], dtype=bool)
+        self.performance = np.array(
+            [[np.nan if v is None else v for v in r[-len(PERFORMANCE_PERIODS):]] for r in rows],
+            dtype=np.float64,
+        ).reshape(self.size, len(PERFORMANCE_PERIODS))
+        self.without_performance = ~self.has_performance | np.isnan(self.performance).all(axis=1)
+        self.companies = _Postings(np.array([r.company_id for r in rows], dtype=object))
+        self.users = _Postings(np.array([r.user_id for r in rows], dtype=object))
+        self.company_names = company_names
+        self.usernames = usernames
+        # SQLite sorts NULL below every value, Postgres above
+        self.nulls_smallest = nulls_smallest
+        self.by_date = np.argsort(self.dates, kind="stable")
+        self._by_performance: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def build(cls, db: Session, version: Any = None) -> "IdeaIndex":
+        columns = [getattr(Performance, p.column) for p in PERFORMANCE_PERIODS]
+        rows = db.execute(
+            select(
+                Idea.id, Idea.link, Idea.company_id, Idea.user_id, Idea.date, Idea.is_short,
+                Idea.is_contest_winner, Performance.idea_id.label("performance_id"), *columns,
+            )
+            .outerjoin(Performance, Idea.id == Performance.idea_id)
+            # The same rows apply_idea_filters() always requires
+            .where(
+                Idea.id.isnot(None), Idea.company_id.isnot(None), Idea.user_id.isnot(None), Idea.date.isnot(None)
+            )
+        ).all()
+        company_names = dict(db.execute(select(Company.ticker, Company.company_name)).all())
+        usernames = dict(db.execute(select(User.user_link, User.username)).all())
+        nulls_smallest = db.get_bind().dialect.name != "postgresql"
+        return cls(rows, company_names, usernames, nulls_smallest, version)
+
+    def match(self, filters: IdeaFilters) -> np.ndarray:
+        """Bitmap of the rows matching filters, as apply_idea_filters() selects them."""
+        if filters.company_id or filters.user_id:
+            mask = np.zeros(self.size, dtype=bool)
+            if filters.company_id and filters.user_id:
+                rows = np.intersect1d(
+                    self.companies.rows_of(filters.company_id), self.users.rows_of(filters.user_id)
+                )
+            elif filters.company_id:
+                rows = self.companies.rows_of(filters.company_id)
+            elif filters.user_id:
+                rows = self.users.rows_of(filters.user_id)
+            mask[rows] = True
+        else:
+            mask = np.ones(self.size, dtype=bool)
+
+        if filters.is_short is not None:
+            mask &= self.is_short if filters.is_short else ~self.is_short
+        if filters.is_contest_winner is not None:
+            mask &= self.is_contest_winner if filters.is_contest_winner else ~self.is_contest_winner
+        if filters.start_date:
+            mask &= self.days >= np.datetime64(filters.start_date, "D")
+        if filters.end_date:
+            mask &= self.days <= np.datetime64(filters.end_date, "D")
+        if filters.has_performance is not None:
+            mask &= self.has_performance if filters.has_performance else self.without_performance
+        if filters.min_performance is not None or filters.max_performance is not None:
+            values = self.performance[:, _PERIOD_COLUMNS[performance_period(filters.performance_period).key]]
+            # NaN compares false, like NULL in SQL
+            with np.errstate(invalid="ignore"):
+                if filters.min_performance is not None:
+                    mask &= values >= filters.min_performance
+                if filters.max_performance is not None:
+                    mask &= values <= filters.max_performance
+        return mask
+
+    def _performance_order(self, column: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows with a value, ascending, and rows without one."""
+        order = self._by_performance.get(column)
+        if order is None:
+            values = self.performance[:, column]
+            ascending = np.argsort(values, kind="stable")
+            valid = ~np.isnan(values[ascending])
+            order = (ascending[valid], ascending[~valid])
+            self._by_performance[column] = order
+        return order
+
+    def ordered(self, mask: np.ndarray, sort_by: str, sort_order: str, performance_key: str) -> np.ndarray:
+        """Matching row numbers in the order get_ideas() sorts them."""
+        descending = sort_order.lower() != "asc"
+        if sort_by == "performance":
+            valued, missing = self._performance_order(_PERIOD_COLUMNS[performance_period(performance_key).key])
+            if descending:
+                valued = valued[::-1]
+            nulls_first = self.nulls_smallest != descending
+            order = np.concatenate([missing, valued] if nulls_first else [valued, missing])
+        else:
+            order = self.by_date[::-1] if descending else self.by_date
+        return order[mask[order]]
+
+    def page(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """IdeaResponse fields of rows."""
+        dates: List[datetime] = self.dates[rows].tolist()
+        return [
+            {
+                "id": self.ids[row],
+                "link": self.links[row],
+                "company_id": self.companies.keys[self.companies.codes[row]],
+                "user_id": self.users.keys[self.users.codes[row]],
+                "date": date,
+                "is_short": bool(self.is_short[row]),
+                "is_contest_winner": bool(self.is_contest_winner[row]),
+            }
+            for row, date in zip(rows.tolist(), dates)
+        ]
+
+    def search(self, filters: IdeaFilters, sort_by: str, sort_order: str, skip: int,
+               limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """A page of matching ideas and the number of matches."""
+        mask = self.match(filters)
+        order = self.ordered(mask, sort_by, sort_order, filters.performance_period)
+        return self.page(order[skip:skip + limit]), len(order)
+
+    def facets(self, filters: IdeaFilters, top: int = 10) -> IdeaFacetsResponse:
+        """The same counts as api.facets.ideas_facets()."""
+        mask = self.match(filters)
+        total = int(mask.sum())
+        years = np.bincount(self.years[mask] - 1970) if total else np.empty(0, dtype=np.int64)
+        # The complement of the has_performance=false filter
+        performance = int((mask & ~self.without_performance).sum())
+
+        def top_values(postings: _Postings, labels: Dict[str, str]) -> List[FacetValue]:
+            counts = np.bincount(postings.codes[mask], minlength=len(postings.keys))
+            # Most ideas first, then by value; codes are in value order
+            best = np.lexsort((np.arange(len(counts)), -counts))[:top]
+            return [
+                FacetValue(value=postings.keys[code], label=labels.get(postings.keys[code]), count=int(counts[code]))
+                for code in best.tolist() if counts[code]
+            ]
+
+        short = int((mask & self.is_short).sum())
+        return IdeaFacetsResponse(
+            total=total,
+            years=[YearFacet(year=1970 + i, count=int(c)) for i, c in enumerate(years.tolist()) if c],
+            long_count=total - short,
+            short_count=short,
+            contest_winner_count=int((mask & self.is_contest_winner).sum()),
+            with_performance_count=performance,
+            without_performance_count=total - performance,
+            top_companies=top_values(self.companies, self.company_names),
+            top_users=top_values(self.users, self.usernames),
+        )
+
+
+_lock = threading.Lock()
+_index: Optional[IdeaIndex] = None
+_checked_at = -math.inf
+
+
+def current_index(db: Session) -> Optional[IdeaIndex]:
+    """
+    The index, rebuilt first if the data changed, or None when it's disabled
+    or couldn't be built and the database should be queried instead.
+    """
+    global _index, _checked_at
+    if not IDEA_INDEX:
+        return None
+    if time.monotonic() - _checked_at < IDEA_INDEX_CHECK_INTERVAL:
+        return _index
+    # One request checks and rebuilds while the others keep using the old index
+    if not _lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if time.monotonic() - _checked_at < IDEA_INDEX_CHECK_INTERVAL:
+            return _index
+        version = data_version(db)
+        if _index is None or version > _index.version:
+            _index = IdeaIndex.build(db, version)
+    except Exception as e:
+        print(f"Error building idea index: {e}")
+        # Leave the session usable for the database fallback
+        db.rollback()
+    finally:
+        # Failures are retried after the interval too, not on every request
+        _checked_at = time.monotonic()
+        _lock.release()
+    return _index
+
+
+def clear_idea_index():
+    global _index, _checked_at
+    _index = None
+    _checked_at = -math.inf
@@ -0,0 +1,92 @@
+"""
+The statement behind GET /ideas/.
+
+The listing takes about twenty optional parameters. Building an ORM query
+from them on every request costs more Python time than running it for a
+page of ideas, and SQLAlchemy then has to compute the new statement's cache
+key before it finds it compiled. Instead, ideas_statement() builds one
+select() per filter shape: which filters are set (not their values), the
+performance period where it matters and the sort. The values, offset and
+limit are bound parameters, so each shape's statement is built once per
+process, kept in a bounded LRU cache of IDEAS_QUERY_CACHE_SIZE shapes, and
+compiled once per engine.
+
+Under psycopg 3 (postgresql+psycopg:// URLs) Postgres also prepares the
+statements a connection runs repeatedly, so it skips parsing and planning
+them too, see DB_PREPARE_THRESHOLD in api/database/connection.py.
+"""
+import os
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Boolean, Date, Float, Integer, String, bindparam, select
+from sqlalchemy.sql import Select
+from sqlalchemy.types import TypeEngine
+
+from api.filters import IdeaFilters, apply_idea_filters
+from api.models import Idea, Performance
+from api.performance import performance_column, performance_period
+
+IDEAS_QUERY_CACHE_SIZE = int(os.getenv("IDEAS_QUERY_CACHE_SIZE", "256"))
+
+# Filters whose values are bound parameters, with their types
+PARAMETERS: Dict[str, TypeEngine] = {
+    "company_id": String(),
+    "user_id": String(),
+    "is_short": Boolean(),
+    "is_contest_winner": Boolean(),
+    "start_date": Date(),
+    "end_date": Date(),
+    "min_performance": Float(),
+    "max_performance": Float(),
+}
+
+
+class IdeaQueryShape(NamedTuple):
+    # Names of the PARAMETERS that are set
+    filters: Tuple[str, ...]
+    has_performance: Optional[bool]
+    # Only set when a performance column is filtered or sorted on
+    period: Optional[str]
+    by_performance: bool
+    descending: bool
+
+
+def query_shape(filters: IdeaFilters, sort_by: str, sort_order: str) -> Tuple[IdeaQueryShape, Dict[str, Any]]:
+    """The shape of a listing request and the values of its parameters."""
+    params = {name: getattr(filters, name) for name in PARAMETERS if getattr(filters, name) is not None}
+    by_performance = sort_by == "performance"
+    bounded = "min_performance" in params or "max_performance" in params
+    period = performance_period(filters.performance_period).key if bounded or by_performance else None
+    shape = IdeaQueryShape(
+        tuple(params), filters.has_performance, period, by_performance, sort_order.lower() != "asc"
+    )
+    return shape, params
+
+
+@lru_cache(maxsize=IDEAS_QUERY_CACHE_SIZE)
+def shape_statement(shape: IdeaQueryShape) -> Select:
+    """A page of ideas of the given shape, with skip and limit parameters."""
+    template = IdeaFilters(has_performance=shape.has_performance)
+    if shape.period is not None:
+        template.performance_period = shape.period
+    for name in shape.filters:
+        setattr(template, name, bindparam(name, type_=PARAMETERS[name]))
+
+    statement = select(Idea)
+    joined = template.needs_performance or shape.by_performance
+    if joined:
+        statement = statement.outerjoin(Performance, Idea.id == Performance.idea_id)
+    statement = apply_idea_filters(statement, template, performance_joined=joined)
+
+    column = performance_column(template.performance_period) if shape.by_performance else Idea.date
+    statement = statement.order_by(column.desc() if shape.descending else column.asc())
+    return statement.offset(bindparam("skip", type_=Integer())).limit(bindparam("limit", type_=Integer()))
+
+
+def ideas_statement(
+    filters: IdeaFilters, sort_by: str, sort_order: str, skip: int, limit: int
+) -> Tuple[Select, Dict[str, Any]]:
+    """The cached statement for a listing request and the parameters to execute it with."""
+    shape, params = query_shape(filters, sort_by, sort_order)
+    return shape_statement(shape), {**params, "skip": skip, "limit": limit}
@@ -0,0 +1,4 @@
+"""
+Batch jobs for the ValueInvestorsClub API.
+Each module can be run with `python -m api.jobs.<name>`.
+"""
@@ -0,0 +1,254 @@
+"""
+Maintains the author_stats table behind the users leaderboard.
+
+Statistics are computed with vectorized pandas over one query per refresh.
+An incremental refresh only recomputes authors whose idea count, performance
+row count or sum of performance values differ from what was stored last time,
+which a single grouped query finds, so it is cheap to run after every crawl
+or pricing load. Excess returns are only comparable between authors measured
+against the same universe medians, so every author is recomputed whenever the
+medians move.
+
+Usage:
+    python -m api.jobs.author_stats          # incremental
+    python -m api.jobs.author_stats --full   # recompute every author
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional, Set, cast
+
+from sqlalchemy import Table, delete, func, insert, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from api.models import AuthorStats, Idea, Performance
+from api.performance import PERFORMANCE_PERIODS
+
+# Stored and recomputed sums of floats are compared with this tolerance
+TOLERANCE = 1e-6
+
+
+def _performance_sum(columns):
+    """Sum of every non-null performance value, to spot prices rewritten in place."""
+    total = func.coalesce(columns[0], 0.0)
+    for column in columns[1:]:
+        total = total + func.coalesce(column, 0.0)
+    return func.coalesce(func.sum(total), 0.0)
+
+
+def stale_authors(session: Session) -> Set[str]:
+    """
+    Authors whose stored counts or performance checksum no longer match the
+    ideas and performance tables, including authors that have never been
+    computed.
+    """
+    live = (
+        select(
+            Idea.user_id.label("user_link"),
+            func.count(Idea.id).label("idea_count"),
+            func.count(Performance.idea_id).label("performance_count"),
+            _performance_sum([getattr(Performance, p.column) for p in PERFORMANCE_PERIODS]).label("checksum"),
+        )
+        .outerjoin(Performance, Performance.idea_id == Idea.id)
+        .where(Idea.user_id.isnot(None))
+        .group_by(Idea.user_id)
+        .subquery()
+    )
+    stored = (
+        select(
+            AuthorStats.user_link, AuthorStats.idea_count, AuthorStats.performance_count,
+            AuthorStats.performance_checksum,
+        )
+        .where(AuthorStats.horizon == PERFORMANCE_PERIODS[0].label)
+        .subquery()
+    )
+    changed = (
+        select(live.c.user_link)
+        .outerjoin(stored, stored.c.user_link == live.c.user_link)
+        .where(
+            stored.c.user_link.is_(None)
+            | (stored.c.idea_count != live.c.idea_count)
+            | (stored.c.performance_count != live.c.performance_count)
+            | (func.abs(stored.c.performance_checksum - live.c.checksum) > TOLERANCE)
+        )
+    )
+    # Authors whose ideas were all removed
+    orphaned = (
+        select(stored.c.user_link)
+        .outerjoin(live, live.c.user_link == stored.c.user_link)
+        .where(live.c.user_link.is_(None))
+    )
+    return set(session.scalars(changed)) | set(session.scalars(orphaned))
+
+
+def _load_frame(session: Session, user_links: Optional[Iterable[str]] = None):
+    import pandas as pd  # type: ignore  # Missing stubs for pandas
+
+    columns = [getattr(Performance, p.column).label(p.label) for p in PERFORMANCE_PERIODS]
+    statement = (
+        select(
+            Idea.user_id, Idea.date, Idea.is_short, Idea.is_contest_winner,
+            Performance.idea_id.label("performance_id"), *columns,
+        )
+        .outerjoin(Performance, Performance.idea_id == Idea.id)
+        .where(Idea.user_id.isnot(None))
+    )
+    if user_links is not None:
+        statement = statement.where(Idea.user_id.in_(list(user_links)))
+    labels = ["user_id", "date", "is_short", "is_contest_winner", "performance_id"] + [p.label for p in PERFORMANCE_PERIODS]
+    frame = pd.DataFrame(session.execute(statement).all(), columns=labels)
+    frame["date"] = pd.to_datetime(frame["date"])
+    frame["is_short"] = frame["is_short"].fillna(False).astype(bool)
+    frame["is_contest_winner"] = frame["is_contest_winner"].fillna(False).astype(bool)
+    return frame
+
+
+def adjusted_returns(frame):
+    """
+    Direction adjusted simple returns per horizon: a long earns price/base - 1
+    and a short earns 1 - price/base.
+    """
+    import numpy as np
+
+    labels = [p.label for p in PERFORMANCE_PERIODS]
+    ratios = frame[labels].astype(float)
+    sign = np.where(frame["is_short"].to_numpy(), -1.0, 1.0)
+    return (ratios - 1.0).mul(sign, axis=0)
+
+
+def universe_medians(frame):
+    """Median direction adjusted return per horizon over every idea in frame."""
+    return adjusted_returns(frame.dropna(subset=["performance_id"])).median()
+
+
+def medians_changed(session: Session, medians) -> bool:
+    """Whether any stored row was computed against different universe medians."""
+    import pandas as pd  # type: ignore  # Missing stubs for pandas
+
+    for horizon, median in session.execute(
+        select(AuthorStats.horizon, AuthorStats.universe_median).distinct()
+    ):
+        current = medians.get(horizon)
+        if median is None or current is None or pd.isna(current):
+            if not (median is None and (current is None or pd.isna(current))):
+                return True
+        elif abs(median - current) > TOLERANCE:
+            return True
+    return False
+
+
+def compute_author_stats(frame, medians, now: Optional[datetime] = None) -> List[dict]:
+    """Turn an ideas + performance frame into author_stats rows."""
+    import pandas as pd  # type: ignore  # Missing stubs for pandas
+
+    if frame.empty:
+        return []
+    now = now or datetime.now()
+    labels = [p.label for p in PERFORMANCE_PERIODS]
+    frame = frame.assign(checksum=frame[labels].astype(float).sum(axis=1))
+    counts = frame.groupby("user_id").agg(
+        idea_count=("is_short", "size"),
+        short_count=("is_short", "sum"),
+        contest_wins=("is_contest_winner", "sum"),
+        performance_count=("performance_id", "count"),
+        first_post=("date", "min"),
+        last_post=("date", "max"),
+        performance_checksum=("checksum", "sum"),
+    )
+    counts["long_count"] = counts["idea_count"] - counts["short_count"]
+
+    returns = adjusted_returns(frame)
+    returns["user_id"] = frame["user_id"]
+    long = returns.melt(id_vars="user_id", var_name="horizon", value_name="ret").dropna(subset=["ret"])
+    long["excess"] = long["ret"] - long["horizon"].map(medians)
+    long["hit"] = (long["ret"] > 0).astype(float)
+    grouped = long.groupby(["user_id", "horizon"]).agg(
+        ideas_with_returns=("ret", "size"),
+        hit_rate=("hit", "mean"),
+        mean_return=("ret", "mean"),
+        median_return=("ret", "median"),
+        mean_excess_return=("excess", "mean"),
+        median_excess_return=("excess", "median"),
+    )
+
+    # Every author gets a row for every horizon, even without any returns
+    index = pd.MultiIndex.from_product(
+        [counts.index, [p.label for p in PERFORMANCE_PERIODS]], names=["user_id", "horizon"]
+    )
+    stats = grouped.reindex(index).join(counts).reset_index()
+    stats["ideas_with_returns"] = stats["ideas_with_returns"].fillna(0)
+    stats["universe_median"] = stats["horizon"].map(medians)
+
+    int_columns = ["idea_count", "long_count", "short_count", "contest_wins", "performance_count", "ideas_with_returns"]
+    date_columns = ["first_post", "last_post"]
+    float_columns = [
+        "hit_rate", "mean_return", "median_return", "mean_excess_return", "median_excess_return",
+        "universe_median", "performance_checksum",
+    ]
+    rows = []
+    for record in stats.to_dict("records"):
+        row = {"user_link": record["user_id"], "horizon": record["horizon"], "updated_at": now}
+        row.update({c: int(record[c]) for c in int_columns})
+        row.update({c: (None if pd.isna(record[c]) else float(record[c])) for c in float_columns})
+        row.update({c: (None if pd.isna(record[c]) else record[c].to_pydatetime()) for c in date_columns})
+        rows.append(row)
+    return rows
+
+
+def refresh_author_stats(session: Session, full: bool = False) -> int:
+    """
+    Recompute author_stats for stale authors, or every author with full=True
+    or when the universe medians moved since the stored rows were computed.
+    Runs in one transaction and returns the number of authors refreshed.
+    """
+    users = None if full else stale_authors(session)
+    if users is not None and not users:
+        # Nothing changed, so neither did the medians
+        return 0
+
+    frame = _load_frame(session)
+    medians = universe_medians(frame)
+    if users is not None and medians_changed(session, medians):
+        users = None
+    if users is not None:
+        frame = frame[frame["user_id"].isin(users)]
+    rows = compute_author_stats(frame, medians)
+
+    if users is None:
+        session.execute(delete(AuthorStats))
+    else:
+        session.execute(delete(AuthorStats).where(AuthorStats.user_link.in_(list(users))))
+    if rows:
+        session.execute(insert(AuthorStats), rows)
+    session.commit()
+    return len({row["user_link"] for row in rows}) if users is None else len(users)
+
+
+def ensure_schema(engine: Engine):
+    """Create author_stats, recreating it when it predates a column (it's all derived data)."""
+    table = cast(Table, AuthorStats.__table__)
+    if inspect(engine).has_table(AuthorStats.__tablename__):
+        existing = {column["name"] for column in inspect(engine).get_columns(AuthorStats.__tablename__)}
+        if existing >= {column.name for column in table.columns}:
+            return
+        table.drop(engine)
+    table.create(engine)
+
+
+def main() -> int:
+    import argparse
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Refresh the author_stats leaderboard table")
+    parser.add_argument("--full", action="store_true", help="Recompute every author, not just stale ones")
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    with Session(engine) as session:
+        refreshed = refresh_author_stats(session, full=args.full)
+    print(f"Refreshed stats for {refreshed} authors")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
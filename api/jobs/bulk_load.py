@@ -0,0 +1,524 @@
+"""
+Bulk load a pg_dump of the ideas database, or a Parquet export, into Postgres.
+
+Replaying the published VIC_IDEAS.sql with psql inserts rows one at a time
+into tables whose indexes already exist. This loader instead:
+
+1. splits the input into one COPY text file per table (constant memory),
+2. re-keys the ideas by the VIC id in their link, dropping duplicates
+   (see migrate_idea_ids),
+3. creates the tables with no keys, constraints or indexes,
+4. COPYs every table in parallel,
+5. adds primary keys, builds indexes and then adds foreign keys,
+6. bumps the data versions of the loaded data sets, and
+7. runs ANALYZE so the planner has statistics from the first query.
+
+Both plain pg_dump formats are understood: COPY blocks (the default) and
+INSERT statements (--inserts / --column-inserts). A directory written by
+`python -m api.jobs.export_parquet --include-text` can be loaded too.
+
+Usage:
+    python -m api.jobs.bulk_load VIC_IDEAS.sql
+    python -m api.jobs.bulk_load out/ideas --replace --jobs 8
+    python -m api.jobs.bulk_load VIC_IDEAS.sql --skip-existing   # no-op once loaded
+"""
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import MetaData, UniqueConstraint, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import AddConstraint, CreateIndex, Table
+
+from api.jobs.migrate_idea_ids import CHILD_MODELS, IdeaMerge, plan_idea_ids
+from api.models import Base
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import IDEAS, PERFORMANCE, record_change
+
+# Memory each index build may use, per connection
+MAINTENANCE_WORK_MEM = os.getenv("BULK_LOAD_MAINTENANCE_WORK_MEM", "256MB")
+
+COPY_RE = re.compile(r"^COPY\s+(?P<table>\S+)\s*\((?P<columns>[^)]*)\)\s+FROM\s+stdin;", re.IGNORECASE)
+INSERT_RE = re.compile(
+    r"^INSERT\s+INTO\s+(?P<table>[^\s(]+)\s*(?:\((?P<columns>[^)]*)\))?\s*VALUES\s*", re.IGNORECASE
+)
+CREATE_TABLE_RE = re.compile(r"^CREATE\s+TABLE\s+(?P<table>[^\s(]+)\s*\(", re.IGNORECASE)
+
+
+class DumpParseError(ValueError):
+    """Raised when the input can't be read as a plain pg_dump."""
+
+
+@dataclass
+class TableData:
+    """Rows for one table, spooled to a file in COPY text format."""
+    name: str
+    columns: List[str]
+    path: str
+    rows: int = 0
+
+
+def _unquote(identifier: str) -> str:
+    """public.ideas -> ideas, "nextDayOpen" -> nextDayOpen"""
+    name = identifier.strip().split(".")[-1]
+    return name[1:-1].replace('""', '"') if name.startswith('"') else name
+
+
+def _column_list(text: str) -> List[str]:
+    return [_unquote(column) for column in text.split(",") if column.strip()]
+
+
+def copy_escape(value: Any) -> str:
+    """Encode a Python value as a field of COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def parse_values(text: str) -> Iterator[List[Optional[str]]]:
+    """
+    Parse the tuples of an INSERT ... VALUES list, e.g.
+    "('a', NULL, 1.5), ('it''s', true, -2);" -> ["a", None, "1.5"], ["it's", "true", "-2"].
+    Casts like '2020-01-01'::date are dropped.
+    """
+    i, n = 0, len(text)
+    while i < n:
+        while i < n and text[i] in " \t\r\n,":
+            i += 1
+        if i >= n or text[i] == ";":
+            return
+        if text[i] != "(":
+            raise DumpParseError(f"Expected '(' in VALUES at {text[i:i + 30]!r}")
+        i += 1
+        row: List[Optional[str]] = []
+        while True:
+            while text[i] in " \t\r\n":
+                i += 1
+            if text[i] == "'":
+                # Quoted literal with '' as the escaped quote
+                chunks = []
+                i += 1
+                while True:
+                    end = text.index("'", i)
+                    chunks.append(text[i:end])
+                    if end + 1 < n and text[end + 1] == "'":
+                        chunks.append("'")
+                        i = end + 2
+                    else:
+                        i = end + 1
+                        break
+                value: Optional[str] = "".join(chunks)
+            else:
+                start = i
+                while text[i] not in ",)":
+                    i += 1
+                token = text[start:i].strip()
+                value = None if token.upper() == "NULL" else token
+            if text.startswith("::", i):
+                while text[i] not in ",)":
+                    i += 1
+            row.append(value)
+            while text[i] in " \t\r\n":
+                i += 1
+            if text[i] == ",":
+                i += 1
+                continue
+            if text[i] == ")":
+                i += 1
+                break
+            raise DumpParseError(f"Unexpected {text[i]!r} in VALUES")
+        yield row
+
+
+def _read_statement(first: str, lines: Iterator[str]) -> str:
+    """Join lines until the statement's terminating semicolon, outside quotes."""
+    statement = first
+    while statement.count("'") % 2 or not statement.rstrip().endswith(";"):
+        try:
+            statement += next(lines)
+        except StopIteration:
+            raise DumpParseError("Dump ends inside a statement")
+    return statement
+
+
+class _Spool:
+    """Per table COPY files in a scratch directory."""
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.tables: Dict[str, TableData] = {}
+        self.files: Dict[str, TextIO] = {}
+
+    def open(self, table: str, columns: List[str]) -> TextIO:
+        if table not in self.tables:
+            path = os.path.join(self.out_dir, f"{table}.copy")
+            self.tables[table] = TableData(table, columns, path)
+            self.files[table] = open(path, "w", encoding="utf-8", newline="\n")
+        elif self.tables[table].columns != columns:
+            raise DumpParseError(f"Table {table} appears with different column lists")
+        return self.files[table]
+
+    def write_row(self, table: str, columns: List[str], values: Iterable[Any]):
+        self.open(table, columns).write("\t".join(copy_escape(v) for v in values) + "\n")
+        self.tables[table].rows += 1
+
+    def close(self) -> Dict[str, TableData]:
+        for handle in self.files.values():
+            handle.close()
+        return self.tables
+
+
+def split_dump(lines: Iterable[str], out_dir: str) -> Dict[str, TableData]:
+    """
+    Split a plain pg_dump into one COPY text file per table under out_dir.
+    Schema statements are ignored; the tables are created from the models.
+    """
+    spool = _Spool(out_dir)
+    create_columns: Dict[str, List[str]] = {}
+    it = iter(lines)
+    try:
+        for line in it:
+            match = COPY_RE.match(line)
+            if match:
+                table = _unquote(match["table"])
+                handle = spool.open(table, _column_list(match["columns"]))
+                rows = 0
+                for data in it:
+                    if data.rstrip("\r\n") == "\\.":
+                        break
+                    # Already COPY text format
+                    handle.write(data if data.endswith("\n") else data + "\n")
+                    rows += 1
+                else:
+                    raise DumpParseError(f"COPY block for {table} is not terminated")
+                spool.tables[table].rows += rows
+                continue
+
+            match = INSERT_RE.match(line)
+            if match:
+                statement = _read_statement(line, it)
+                table = _unquote(match["table"])
+                if match["columns"]:
+                    columns = _column_list(match["columns"])
+                elif table in create_columns:
+                    columns = create_columns[table]
+                else:
+                    raise DumpParseError(f"INSERT into {table} has no column list and no CREATE TABLE")
+                try:
+                    for row in parse_values(statement[match.end():]):
+                        spool.write_row(table, columns, row)
+                except IndexError:
+                    raise DumpParseError(f"Truncated VALUES list in INSERT into {table}")
+                continue
+
+            match = CREATE_TABLE_RE.match(line)
+            if match:
+                # Remember column order for INSERTs without a column list
+                columns = []
+                for definition in it:
+                    definition = definition.strip()
+                    if definition.startswith(")"):
+                        break
+                    first = definition.split()[0] if definition else ""
+                    if first and first.upper() not in {"CONSTRAINT", "PRIMARY", "UNIQUE", "FOREIGN", "CHECK"}:
+                        columns.append(_unquote(first))
+                create_columns[_unquote(match["table"])] = columns
+    finally:
+        tables = spool.close()
+    return tables
+
+
+def split_parquet(path: str, out_dir: str) -> Dict[str, TableData]:
+    """
+    Split a Parquet export (one denormalized row per idea) back into the
+    companies, users, ideas, performance, catalyst and descriptions tables.
+    """
+    try:
+        import pyarrow.dataset as ds  # type: ignore  # Optional dependency without stubs
+    except ImportError:
+        raise RuntimeError("Loading Parquet needs pyarrow: pip install pyarrow")
+    from api.models import Catalysts, Company, Description, Idea, Performance, User
+
+    def names(model) -> List[str]:
+        return [column.name for column in model.__table__.columns]
+
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    available = set(dataset.schema.names)
+    performance_columns = names(Performance)[1:]
+    spool = _Spool(out_dir)
+    seen_companies, seen_users = set(), set()
+    try:
+        for batch in dataset.to_batches():
+            for row in batch.to_pylist():
+                if row["company_id"] not in seen_companies:
+                    seen_companies.add(row["company_id"])
+                    spool.write_row(Company.__tablename__, names(Company), [row["company_id"], row["company_name"]])
+                if row["user_id"] not in seen_users:
+                    seen_users.add(row["user_id"])
+                    spool.write_row(User.__tablename__, names(User), [row["username"], row["user_id"]])
+                spool.write_row(Idea.__tablename__, names(Idea), [row[c] for c in names(Idea)])
+                if any(row[c] is not None for c in performance_columns):
+                    spool.write_row(
+                        Performance.__tablename__, names(Performance),
+                        [row["id"]] + [row[c] for c in performance_columns],
+                    )
+                if "catalysts" in available and row["catalysts"] is not None:
+                    spool.write_row(Catalysts.__tablename__, names(Catalysts), [row["id"], row["catalysts"]])
+                if "description" in available and row["description"] is not None:
+                    # Only the plain text columns, compressed storage is filled in by its own job
+                    spool.write_row(
+                        Description.__tablename__, ["idea_id", "description"], [row["id"], row["description"]]
+                    )
+    finally:
+        tables = spool.close()
+    return tables
+
+
+def _read_copy(data: TableData) -> Iterator[List[Optional[str]]]:
+    """Rows of a spooled table. Ids, links and dates never need COPY escapes."""
+    with open(data.path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            yield [None if v == "\\N" else v for v in line.rstrip("\n").split("\t")]
+
+
+def rekey_ideas(tables: Dict[str, TableData]) -> int:
+    """
+    Rewrite the spooled ideas and their child rows to the ids of their links,
+    keeping one idea per link as migrate_idea_ids does. Returns the number of
+    duplicate ideas dropped.
+    """
+    ideas = tables.get("ideas")
+    if ideas is None or not {"id", "link", "date"} <= set(ideas.columns):
+        return 0
+    child_tables = [
+        tables[model.__tablename__] for model in CHILD_MODELS
+        if model.__tablename__ in tables and "idea_id" in tables[model.__tablename__].columns
+    ]
+    children = {
+        data.name: {row[data.columns.index("idea_id")] for row in _read_copy(data)} for data in child_tables
+    }
+    id_column, link_column, date_column = (ideas.columns.index(c) for c in ("id", "link", "date"))
+    plan = plan_idea_ids(
+        ((row[id_column], row[link_column], row[date_column]) for row in _read_copy(ideas)), children
+    )
+    merges: Dict[Optional[str], IdeaMerge] = {idea_id: merge for merge in plan for idea_id in merge.ids}
+
+    def rewrite(data: TableData, column: int, kept_id: Callable[[IdeaMerge], Optional[str]]):
+        """Rows of ideas in no group as they are, of each group only kept_id's with the new id."""
+        path = data.path + ".rekeyed"
+        data.rows = 0
+        with open(path, "w", encoding="utf-8", newline="\n") as out:
+            for row in _read_copy(data):
+                merge = merges.get(row[column])
+                if merge is not None:
+                    if row[column] != kept_id(merge):
+                        continue
+                    row[column] = merge.new_id
+                    if data is ideas:
+                        row[link_column] = merge.link
+                out.write("\t".join("\\N" if v is None else v for v in row) + "\n")
+                data.rows += 1
+        os.replace(path, data.path)
+
+    if not plan:
+        return 0
+    rewrite(ideas, id_column, lambda merge: merge.kept)
+    for data in child_tables:
+        rewrite(data, data.columns.index("idea_id"), lambda merge: merge.children.get(data.name))
+    return sum(len(merge.duplicates) for merge in plan)
+
+
+def _model_tables(names: Iterable[str]) -> List[Table]:
+    """Copies of the model tables for the loaded table names, in dependency order."""
+    wanted = set(names)
+    # Compiling ADD CONSTRAINT marks a constraint to be left out of CREATE
+    # TABLE, so the models' own tables must not be used for it
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    return [table for table in metadata.sorted_tables if table.name in wanted]
+
+
+def create_table_ddl(table: Table, dialect) -> str:
+    """CREATE TABLE with only column names and types: no keys, constraints or indexes."""
+    quote = dialect.identifier_preparer.quote
+    columns = ", ".join(f"{quote(c.name)} {c.type.compile(dialect=dialect)}" for c in table.columns)
+    return f"CREATE TABLE {quote(table.name)} ({columns})"
+
+
+def post_load_ddl(tables: List[Table], dialect) -> Tuple[List[List[str]], List[str], List[str]]:
+    """
+    DDL to run after the data is in: per table key statements (run in
+    parallel across tables), index builds (each in parallel) and foreign
+    keys (after every key they reference exists).
+    """
+    loaded = {table.name for table in tables}
+    keys, indexes, foreign_keys = [], [], []
+    for table in tables:
+        statements = [str(AddConstraint(table.primary_key).compile(dialect=dialect))]
+        statements += [
+            str(AddConstraint(constraint).compile(dialect=dialect))
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint)
+        ]
+        keys.append(statements)
+        indexes += [str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes]
+        foreign_keys += [
+            str(AddConstraint(fk).compile(dialect=dialect))
+            for fk in table.foreign_key_constraints
+            if fk.referred_table.name in loaded
+        ]
+    return keys, indexes, foreign_keys
+
+
+def _copy(engine: Engine, data: TableData) -> int:
+    quote = engine.dialect.identifier_preparer.quote
+    columns = ", ".join(quote(column) for column in data.columns)
+    sql = f"COPY {quote(data.name)} ({columns}) FROM STDIN"
+    connection: Any = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET synchronous_commit = off")
+        with open(data.path, "r", encoding="utf-8") as handle:
+            _copy_from(cursor, sql, handle)
+        connection.commit()
+    finally:
+        connection.close()
+    return data.rows
+
+
+def _copy_from(cursor, sql: str, handle: IO[str]):
+    if hasattr(cursor, "copy_expert"):
+        # psycopg2
+        cursor.copy_expert(sql, handle, size=1 << 20)
+        return
+    # psycopg 3
+    with cursor.copy(sql) as copy:
+        while chunk := handle.read(1 << 20):
+            copy.write(chunk)
+
+
+def _run_ddl(engine: Engine, statements: List[str]):
+    with engine.begin() as connection:
+        connection.execute(text(f"SET maintenance_work_mem = '{MAINTENANCE_WORK_MEM}'"))
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def load_tables(
+    engine: Engine,
+    tables: Dict[str, TableData],
+    jobs: int = 4,
+    replace: bool = False,
+    foreign_keys: bool = True,
+    log=print,
+) -> Dict[str, int]:
+    """Create, COPY, index and ANALYZE the spooled tables. Returns rows per table."""
+    model_tables = _model_tables(tables)
+    skipped = sorted(set(tables) - {table.name for table in model_tables})
+    if skipped:
+        log(f"Skipping tables without a model: {', '.join(skipped)}")
+    if not model_tables:
+        raise DumpParseError("No known tables found in the input")
+    dialect = engine.dialect
+    quote = dialect.identifier_preparer.quote
+
+    existing = set(inspect(engine).get_table_names()) & {table.name for table in model_tables}
+    if existing and not replace:
+        raise RuntimeError(f"Tables already exist: {', '.join(sorted(existing))} (use --replace)")
+
+    started = time.perf_counter()
+    dropped = rekey_ideas(tables)
+    log(f"Re-keyed ideas by link, dropping {dropped} duplicates, in {time.perf_counter() - started:.1f}s")
+
+    step = time.perf_counter()
+    with engine.begin() as connection:
+        for table in reversed(model_tables):
+            if table.name in existing:
+                connection.execute(text(f"DROP TABLE {quote(table.name)} CASCADE"))
+        for table in model_tables:
+            connection.execute(text(create_table_ddl(table, dialect)))
+    log(f"Created {len(model_tables)} tables in {time.perf_counter() - step:.1f}s")
+
+    keys, indexes, fks = post_load_ddl(model_tables, dialect)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        step = time.perf_counter()
+        counts = dict(zip(
+            [table.name for table in model_tables],
+            pool.map(lambda table: _copy(engine, tables[table.name]), model_tables),
+        ))
+        log(f"Copied {sum(counts.values())} rows in {time.perf_counter() - step:.1f}s")
+
+        step = time.perf_counter()
+        list(pool.map(lambda statements: _run_ddl(engine, statements), keys))
+        list(pool.map(lambda statement: _run_ddl(engine, [statement]), indexes))
+        log(f"Built keys and {len(indexes)} indexes in {time.perf_counter() - step:.1f}s")
+
+    step = time.perf_counter()
+    if foreign_keys:
+        _run_ddl(engine, fks)
+    # Tables missing from the input (e.g. author_stats) are created empty
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # Every idea may have changed
+        for data_set, table in ((IDEAS, "ideas"), (PERFORMANCE, "performance")):
+            if table in counts:
+                record_change(connection, data_set, "bulk_load")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table in model_tables:
+            connection.execute(text(f"ANALYZE {quote(table.name)}"))
+    log(f"Added foreign keys and analyzed in {time.perf_counter() - step:.1f}s")
+    log(f"Loaded in {time.perf_counter() - started:.1f}s")
+    return counts
+
+
+def main() -> int:
+    import argparse
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Bulk load a pg_dump or Parquet export into Postgres")
+    parser.add_argument("source", help="Plain pg_dump .sql file, or a Parquet export directory")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Parallel connections")
+    parser.add_argument("--replace", action="store_true", help="Drop tables that already exist")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="Do nothing, successfully, when the tables are already loaded")
+    parser.add_argument("--no-foreign-keys", action="store_true", help="Skip adding foreign keys")
+    parser.add_argument("--work-dir", help="Scratch directory for the split tables (default: a temp dir)")
+    args = parser.parse_args()
+
+    if args.skip_existing and not args.replace:
+        existing = set(inspect(engine).get_table_names()) & {table.name for table in Base.metadata.sorted_tables}
+        if existing:
+            print(f"Tables already exist, skipping the load: {', '.join(sorted(existing))}")
+            return 0
+
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as work_dir:
+        started = time.perf_counter()
+        if os.path.isdir(args.source) or args.source.endswith(".parquet"):
+            tables = split_parquet(args.source, work_dir)
+        else:
+            with open(args.source, "r", encoding="utf-8") as dump:
+                tables = split_dump(dump, work_dir)
+        print(f"Split {len(tables)} tables in {time.perf_counter() - started:.1f}s")
+        counts = load_tables(
+            engine, tables, jobs=args.jobs, replace=args.replace, foreign_keys=not args.no_foreign_keys,
+        )
+    for name, rows in counts.items():
+        print(f"  {name}: {rows} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Switch descriptions to compressed storage, or back.
+
+Compressed descriptions keep the text zstd compressed in
+descriptions.description_compressed, optionally with a dictionary trained on
+a sample of descriptions, and a plain text preview in descriptions.preview.
+The API only decompresses when the full text is requested. Descriptions no
+longer than the preview are left as they are. Needs the zstandard package.
+
+Usage:
+    python -m api.jobs.compress_descriptions --schema-only   # add the new columns
+    python -m api.jobs.compress_descriptions --train         # train a dictionary and compress
+    python -m api.jobs.compress_descriptions                 # compress new rows with the latest dictionary
+    python -m api.jobs.compress_descriptions --decompress    # back to plain text
+
+Postgres only returns the freed space to the OS after a
+`VACUUM FULL descriptions`.
+"""
+from datetime import datetime
+from typing import Dict, Optional, cast
+
+from sqlalchemy import Table, func, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from api.models import Description, DescriptionDictionary
+from ValueInvestorsClub.ValueInvestorsClub.models import compression
+
+
+def ensure_schema(engine: Engine):
+    """Add the compressed storage columns and dictionary table to an existing database."""
+    cast(Table, DescriptionDictionary.__table__).create(engine, checkfirst=True)
+    existing = {column["name"] for column in inspect(engine).get_columns(Description.__tablename__)}
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        for column in Description.__table__.columns:
+            if column.name not in existing:
+                connection.execute(text(
+                    f"ALTER TABLE {Description.__tablename__} "
+                    f"ADD COLUMN {quote(column.name)} {column.type.compile(dialect=engine.dialect)}"
+                ))
+        if engine.dialect.name == "postgresql":
+            connection.execute(text(f"ALTER TABLE {Description.__tablename__} ALTER COLUMN description DROP NOT NULL"))
+
+
+def train_dictionary(session: Session, sample_size: int = 2000, size: int = 112 * 1024) -> DescriptionDictionary:
+    """Train and store a dictionary on a random sample of descriptions."""
+    sample = session.scalars(select(Description).order_by(func.random()).limit(sample_size)).all()
+    texts = [description.full_text() for description in sample]
+    dictionary = DescriptionDictionary(
+        dictionary=compression.train_dictionary([t for t in texts if t], size),
+        created_at=datetime.now(),
+    )
+    session.add(dictionary)
+    session.commit()
+    return dictionary
+
+
+def latest_dictionary(session: Session) -> Optional[DescriptionDictionary]:
+    return session.scalars(select(DescriptionDictionary).order_by(DescriptionDictionary.id.desc()).limit(1)).first()
+
+
+def compress_descriptions(
+    session: Session,
+    dictionary: Optional[DescriptionDictionary] = None,
+    recompress: bool = False,
+    batch_size: int = 200,
+    level: int = compression.COMPRESSION_LEVEL,
+) -> Dict[str, int]:
+    """
+    Compress plain descriptions, and with recompress=True also descriptions
+    compressed with another dictionary. Commits every batch_size rows.
+    """
+    dictionary_id = dictionary.id if dictionary else None
+    dictionary_bytes = dictionary.dictionary if dictionary else None
+    stats = {"rows": 0, "text_bytes": 0, "compressed_bytes": 0}
+
+    pending = Description.description.isnot(None) & (func.length(Description.description) > compression.PREVIEW_CHARS)
+    if recompress:
+        other = Description.dictionary_id.isnot(None) if dictionary_id is None else (
+            Description.dictionary_id.is_(None) | (Description.dictionary_id != dictionary_id)
+        )
+        pending = pending | (Description.description_compressed.isnot(None) & other)
+
+    last_id = ""
+    while True:
+        batch = session.scalars(
+            select(Description)
+            .where(pending, Description.idea_id > last_id)
+            .order_by(Description.idea_id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        for description in batch:
+            full_text = description.full_text()
+            compressed = compression.compress_text(full_text, dictionary_bytes, level)
+            description.description_compressed = compressed
+            description.dictionary_id = dictionary_id
+            description.preview = compression.make_preview(full_text)
+            description.description = None
+            stats["rows"] += 1
+            stats["text_bytes"] += len(full_text.encode("utf-8"))
+            stats["compressed_bytes"] += len(compressed)
+        last_id = batch[-1].idea_id
+        session.commit()
+        # Don't keep every description of the table in the identity map
+        session.expunge_all()
+    return stats
+
+
+def decompress_descriptions(session: Session, batch_size: int = 200) -> int:
+    """Store every compressed description as plain text again."""
+    restored = 0
+    last_id = ""
+    while True:
+        batch = session.scalars(
+            select(Description)
+            .where(Description.description_compressed.isnot(None), Description.idea_id > last_id)
+            .order_by(Description.idea_id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        for description in batch:
+            description.description = description.full_text()
+            description.description_compressed = None
+            description.dictionary_id = None
+            description.preview = None
+        restored += len(batch)
+        last_id = batch[-1].idea_id
+        session.commit()
+        session.expunge_all()
+    return restored
+
+
+def main() -> int:
+    import argparse
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Compress descriptions with zstd, or restore them")
+    parser.add_argument("--schema-only", action="store_true", help="Only add the new columns and table")
+    parser.add_argument("--train", action="store_true", help="Train a new dictionary first and recompress with it")
+    parser.add_argument("--no-dictionary", action="store_true", help="Compress without a dictionary")
+    parser.add_argument("--recompress", action="store_true", help="Recompress rows using an older dictionary")
+    parser.add_argument("--decompress", action="store_true", help="Store every description as plain text again")
+    parser.add_argument("--sample-size", type=int, default=2000, help="Descriptions to train the dictionary on")
+    parser.add_argument("--dictionary-size", type=int, default=112 * 1024, help="Dictionary size in bytes")
+    parser.add_argument("--level", type=int, default=compression.COMPRESSION_LEVEL, help="zstd compression level")
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per transaction")
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    if args.schema_only:
+        return 0
+
+    with Session(engine) as session:
+        if args.decompress:
+            print(f"Restored {decompress_descriptions(session, args.batch_size)} descriptions")
+            return 0
+
+        dictionary = None
+        if args.train:
+            dictionary = train_dictionary(session, args.sample_size, args.dictionary_size)
+            print(f"Trained dictionary {dictionary.id} ({len(dictionary.dictionary)} bytes)")
+        elif not args.no_dictionary:
+            dictionary = latest_dictionary(session)
+
+        stats = compress_descriptions(
+            session, dictionary, recompress=args.recompress or args.train,
+            batch_size=args.batch_size, level=args.level,
+        )
+    ratio = stats["text_bytes"] / stats["compressed_bytes"] if stats["compressed_bytes"] else 0
+    print(f"Compressed {stats['rows']} descriptions: {stats['text_bytes']} -> "
+          f"{stats['compressed_bytes']} bytes ({ratio:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
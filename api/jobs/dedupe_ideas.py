@@ -0,0 +1,151 @@
+"""
+Find and merge duplicate ideas.
+
+The early crawls stored some ideas more than once, under different ids and
+sometimes different links, so migrate_idea_ids can't tell they're the same.
+They show up as ideas by the same author on the same ticker at the same
+time. This job:
+
+1. finds every cluster of such ideas in one pass over the ideas table, with
+   a window function partitioned by author, ticker and date (ideas missing
+   any of them are left alone), and ranks each cluster's copies: the one
+   keyed by its link's id first, as migrate_idea_ids would key it, then one
+   with a link, then the one with the most description, catalyst and
+   performance rows, then by id,
+2. merges each cluster into its first idea, a batch of clusters per
+   transaction: the survivor keeps its link, child rows it lacks are moved
+   over from the best copy that has them, the rest are deleted with the
+   copies.
+
+Each cluster is re-read and locked in its own transaction before it's
+merged, so ideas changed or removed since the scan are skipped and the API
+can keep serving while the job runs. Every batch that merges anything bumps
+the ideas data version and logs the merged ids, which is how the API's
+caches and GET /changes consumers pick the changes up.
+
+Usage:
+    python -m api.jobs.dedupe_ideas --dry-run   # list the clusters
+    python -m api.jobs.dedupe_ideas --batch-size 100
+"""
+from itertools import groupby
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import case, func, select
+from sqlalchemy.engine import Connection, Engine
+
+from api.jobs.migrate_idea_ids import CHILD_MODELS, IdeaMerge, apply_merge
+from api.models import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.links import idea_id_from_link
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import IDEAS, ensure_schema, record_change
+
+
+def clusters_statement():
+    """Every duplicated idea with its link and child row count, a cluster at a time."""
+    child_rows = sum(case((model.idea_id.isnot(None), 1), else_=0) for model in CHILD_MODELS)
+    query = select(Idea.id, Idea.link, Idea.user_id, Idea.company_id, Idea.date, child_rows.label("child_rows"))
+    for model in CHILD_MODELS:
+        query = query.outerjoin(model, model.idea_id == Idea.id)
+    partition = (Idea.user_id, Idea.company_id, Idea.date)
+    counted = (
+        query.add_columns(func.count().over(partition_by=partition).label("copies"))
+        .where(Idea.user_id.isnot(None), Idea.company_id.isnot(None), Idea.date.isnot(None))
+        .subquery()
+    )
+    return (
+        select(counted)
+        .where(counted.c.copies > 1)
+        .order_by(counted.c.user_id, counted.c.company_id, counted.c.date, counted.c.id)
+    )
+
+
+def survivor_rank(row: Any) -> tuple:
+    """Sort key of a cluster's copies, the one to keep first."""
+    return (row.id != idea_id_from_link(row.link), not row.link, -row.child_rows, row.id)
+
+
+def find_clusters(connection: Connection) -> Iterator[List[str]]:
+    """Ids of each cluster of duplicates, the survivor first."""
+    rows = connection.execution_options(stream_results=True).execute(clusters_statement())
+    for _, cluster in groupby(rows, key=lambda row: (row.user_id, row.company_id, row.date)):
+        yield [row.id for row in sorted(cluster, key=survivor_rank)]
+
+
+def merge_cluster(connection: Connection, ids: List[str]) -> int:
+    """
+    Merge the copies into ids[0], if they're all still alike. Returns the
+    number of ideas deleted.
+    """
+    ideas = Idea.__table__
+    rows = connection.execute(
+        select(ideas.c.id, ideas.c.link, ideas.c.user_id, ideas.c.company_id, ideas.c.date)
+        .where(ideas.c.id.in_(ids))
+        .with_for_update()
+    ).all()
+    by_id = {row.id: row for row in rows}
+    survivor = by_id.get(ids[0])
+    if survivor is None:
+        return 0
+    key = (survivor.user_id, survivor.company_id, survivor.date)
+    copies = [i for i in ids if i in by_id and (by_id[i].user_id, by_id[i].company_id, by_id[i].date) == key]
+    if len(copies) < 2:
+        return 0
+    children = {
+        model.__tablename__: set(connection.scalars(select(model.idea_id).where(model.idea_id.in_(copies))))
+        for model in CHILD_MODELS
+    }
+    apply_merge(connection, IdeaMerge(
+        survivor.id, survivor.link, copies,
+        {table: next((i for i in copies if i in having), None) for table, having in children.items()},
+    ))
+    return len(copies) - 1
+
+
+def dedupe_ideas(engine: Engine, batch_size: int = 100, dry_run: bool = False, log=print) -> Dict[str, int]:
+    """Merge every cluster of duplicate ideas. Returns counts of what was found and deleted."""
+    with engine.connect() as connection:
+        clusters = list(find_clusters(connection))
+    stats = {
+        "clusters": len(clusters),
+        "duplicates": sum(len(cluster) - 1 for cluster in clusters),
+        "deleted": 0,
+    }
+    if dry_run:
+        for cluster in clusters:
+            log(f"  keep {cluster[0]}, merge {', '.join(cluster[1:])}")
+        return stats
+
+    for start in range(0, len(clusters), batch_size):
+        with engine.begin() as connection:
+            merged = []
+            for cluster in clusters[start:start + batch_size]:
+                deleted = merge_cluster(connection, cluster)
+                if deleted:
+                    stats["deleted"] += deleted
+                    merged.extend(cluster)
+            if merged:
+                record_change(connection, IDEAS, "dedupe_ideas", merged)
+        log(f"Merged {min(start + batch_size, len(clusters))} of {len(clusters)} clusters")
+    return stats
+
+
+def main() -> int:
+    import argparse
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Merge ideas stored more than once")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the duplicate clusters")
+    parser.add_argument("--batch-size", type=int, default=100, help="Clusters per transaction")
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    stats = dedupe_ideas(engine, batch_size=args.batch_size, dry_run=args.dry_run)
+    if args.dry_run:
+        print(f"Found {stats['clusters']} clusters with {stats['duplicates']} duplicates")
+    else:
+        print(f"Merged {stats['clusters']} clusters, deleting {stats['deleted']} duplicates")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
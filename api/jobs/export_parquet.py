@@ -0,0 +1,113 @@
+"""
+Export ideas to Parquet files partitioned by the year the idea was posted.
+
+Rows are streamed from the database oldest first with a server-side cursor and
+written a batch at a time, with one open file per year, so memory use stays
+flat even with the description text included. Requires pyarrow.
+
+Usage:
+    python -m api.jobs.export_parquet out/ideas
+    python -m api.jobs.export_parquet out/ideas --include-text --start-date 2010-01-01
+
+The output directory uses hive style partitions (year=2012/part-0.parquet),
+which pandas, pyarrow, DuckDB and Spark all read directly.
+"""
+import os
+from datetime import date
+from itertools import groupby
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+from api.export import EXPORT_BATCH_SIZE, export_batches, export_names
+from api.filters import IdeaFilters
+
+
+def _schema(include_text: bool):
+    import pyarrow as pa  # type: ignore  # Optional dependency without stubs
+
+    fields = [
+        ("id", pa.string()), ("link", pa.string()), ("company_id", pa.string()),
+        ("company_name", pa.string()), ("user_id", pa.string()), ("username", pa.string()),
+        ("date", pa.timestamp("us")), ("is_short", pa.bool_()), ("is_contest_winner", pa.bool_()),
+    ]
+    fields += [(name, pa.float64()) for name in export_names()[len(fields):]]
+    if include_text:
+        fields += [("catalysts", pa.string()), ("description", pa.string())]
+    return pa.schema(fields)
+
+
+def export_parquet(
+    db: Session,
+    out_dir: str,
+    filters: Optional[IdeaFilters] = None,
+    include_text: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """Write matching ideas under out_dir/year=YYYY/ and return the row count."""
+    try:
+        import pyarrow as pa  # type: ignore  # Optional dependency without stubs
+        import pyarrow.parquet as pq  # type: ignore  # Optional dependency without stubs
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    schema = _schema(include_text)
+    names = schema.names
+    date_index = names.index("date")
+
+    writer: Any = None
+    current_year = None
+    written = 0
+    try:
+        for rows in export_batches(db, filters or IdeaFilters(), include_text, batch_size):
+            # Rows arrive in date order, so each year is one contiguous run
+            for year, group in groupby(rows, key=lambda row: row[date_index].year):
+                if year != current_year:
+                    if writer is not None:
+                        writer.close()
+                    partition = os.path.join(out_dir, f"year={year}")
+                    os.makedirs(partition, exist_ok=True)
+                    writer = pq.ParquetWriter(os.path.join(partition, "part-0.parquet"), schema, compression="zstd")
+                    current_year = year
+                group_rows = list(group)
+                columns = list(zip(*group_rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    names=names,
+                ))
+                written += len(group_rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def main() -> int:
+    import argparse
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Export ideas to year partitioned Parquet files")
+    parser.add_argument("out_dir", help="Directory to write year=YYYY partitions into")
+    parser.add_argument("--include-text", action="store_true", help="Include catalysts and description text")
+    parser.add_argument("--company-id", help="Only export ideas on this ticker")
+    parser.add_argument("--user-id", help="Only export ideas by this user link")
+    parser.add_argument("--start-date", type=date.fromisoformat, help="Earliest idea date (YYYY-MM-DD)")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Latest idea date (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Rows fetched per round trip")
+    args = parser.parse_args()
+
+    filters = IdeaFilters(
+        company_id=args.company_id,
+        user_id=args.user_id,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    with Session(engine) as session:
+        written = export_parquet(session, args.out_dir, filters, args.include_text, args.batch_size)
+    print(f"Wrote {written} ideas to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Load performance rows computed from price data.
+
+Performance is computed outside the API from the stooq downloads (see
+Pricing Data in the README) and used to be written to the table directly,
+so nothing could tell new returns had arrived. This job reads them from a
+CSV with an idea_id column and any of the Performance columns, and upserts
+them in one transaction that also bumps the performance data version and
+logs every idea it wrote. Rows of ideas that aren't in the database are
+skipped.
+
+Usage:
+    python -m api.jobs.load_performance performance.csv
+    python -m api.jobs.load_performance performance.csv --dry-run
+"""
+import csv
+from typing import Dict, Iterator, List, Optional, TextIO, cast
+
+from sqlalchemy import Table, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+
+from api.models import Idea, Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import PERFORMANCE, ensure_schema, record_change
+
+BATCH_SIZE = 1000
+
+
+def read_performance(handle: TextIO) -> Iterator[Dict[str, Optional[object]]]:
+    """Performance rows from CSV, with empty values as NULL."""
+    columns = {column.name for column in cast(Table, Performance.__table__).columns}
+    reader = csv.DictReader(handle)
+    unknown = set(reader.fieldnames or []) - columns
+    if "idea_id" not in (reader.fieldnames or []) or unknown:
+        raise ValueError(f"Expected an idea_id column and Performance columns, got unknown {sorted(unknown)}")
+    for row in reader:
+        yield {
+            name: (value if name == "idea_id" else float(value)) if value != "" else None
+            for name, value in row.items()
+        }
+
+
+def upsert_performance(connection: Connection, rows: List[Dict[str, Optional[object]]]) -> List[str]:
+    """Insert or update rows of existing ideas. Returns the idea ids written."""
+    existing = set(connection.scalars(select(Idea.id).where(Idea.id.in_([row["idea_id"] for row in rows]))))
+    rows = [row for row in rows if row["idea_id"] in existing]
+    if not rows:
+        return []
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(cast(Table, Performance.__table__))
+    columns = [name for name in rows[0] if name != "idea_id"]
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=["idea_id"], set_={name: statement.excluded[name] for name in columns}
+        ),
+        rows,
+    )
+    return [cast(str, row["idea_id"]) for row in rows]
+
+
+def load_performance(engine: Engine, handle: TextIO, batch_size: int = BATCH_SIZE,
+                     dry_run: bool = False) -> Dict[str, int]:
+    """Upsert every row of the CSV in one transaction. Returns counts of rows read and written."""
+    stats = {"read": 0, "written": 0}
+    written: List[str] = []
+    with engine.connect() as connection:
+        batch: List[Dict[str, Optional[object]]] = []
+        for row in read_performance(handle):
+            stats["read"] += 1
+            batch.append(row)
+            if len(batch) == batch_size:
+                written += upsert_performance(connection, batch)
+                batch = []
+        if batch:
+            written += upsert_performance(connection, batch)
+        stats["written"] = len(written)
+        if dry_run:
+            connection.rollback()
+            return stats
+        if written:
+            record_change(connection, PERFORMANCE, "load_performance", written)
+        connection.commit()
+    return stats
+
+
+def main() -> int:
+    import argparse
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Load performance rows and bump the performance data version")
+    parser.add_argument("source", help="CSV with an idea_id column and Performance columns")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per statement")
+    parser.add_argument("--dry-run", action="store_true", help="Roll back instead of committing")
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    with open(args.source, "r", encoding="utf-8", newline="") as handle:
+        stats = load_performance(engine, handle, batch_size=args.batch_size, dry_run=args.dry_run)
+    prefix = "Would load" if args.dry_run else "Loaded"
+    print(f"{prefix} {stats['written']} of {stats['read']} performance rows")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
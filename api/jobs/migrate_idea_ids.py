@@ -0,0 +1,174 @@
+"""
+Re-key ideas by the numeric VIC id in their link.
+
+The scraper used to give every idea it stored a random UUID, so each
+re-crawl added another copy of the ideas it saw again. Ideas are now keyed
+by idea_id_from_link() (see models/links.py) and their normalized links are
+unique. This job moves an existing database over:
+
+1. ideas are grouped by the id their link maps to, and one row per group is
+   kept: the one that already has the new id, else the one with the most
+   description, catalyst and performance rows, else the earliest, else the
+   lowest id,
+2. the kept row takes the new id and the normalized link, its child rows
+   move with it and the other copies are deleted with theirs, a batch of
+   groups per transaction, and
+3. the unique link index is created.
+
+Every batch bumps the ideas data version and logs the old and new ids it
+touched. Ideas without a link keep their id. The job can be run again at any time:
+once every id matches its link there is nothing to do. bulk_load applies the
+same plan to the tables it loads, so a fresh load doesn't need it.
+
+Usage:
+    python -m api.jobs.migrate_idea_ids --dry-run   # report what would change
+    python -m api.jobs.migrate_idea_ids --batch-size 500
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, cast
+
+from sqlalchemy import Index, Table, delete, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from api.models import Catalysts, Description, Idea, Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.links import idea_id_from_link, normalize_link
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import IDEAS, ensure_schema, record_change
+
+CHILD_MODELS = (Description, Catalysts, Performance)
+LINK_INDEX = "uq_ideas_link"
+
+
+@dataclass
+class IdeaMerge:
+    """One group of ideas with the same link id, and what to keep of it."""
+    new_id: str
+    link: str
+    # Current ids of the group, the one to keep first
+    ids: List[str]
+    # Per child table, the id whose row is kept, if any has one
+    children: Dict[str, Optional[str]]
+
+    @property
+    def kept(self) -> str:
+        return self.ids[0]
+
+    @property
+    def duplicates(self) -> List[str]:
+        return self.ids[1:]
+
+
+def plan_idea_ids(ideas: Iterable[Sequence[Any]], children: Dict[str, Set[Any]]) -> List[IdeaMerge]:
+    """
+    The groups that need rewriting, from (id, link, date) rows of every idea
+    and the idea ids that have a row in each child table.
+    """
+    groups: Dict[str, List[Sequence[Any]]] = defaultdict(list)
+    for row in ideas:
+        new_id = idea_id_from_link(row[1])
+        if new_id is not None:
+            groups[new_id].append(row)
+
+    plan = []
+    for new_id, rows in groups.items():
+        rows = sorted(rows, key=lambda row: (
+            row[0] != new_id,
+            -sum(row[0] in ids for ids in children.values()),
+            row[2] is None,
+            row[2] or "",
+            row[0],
+        ))
+        ids = [row[0] for row in rows]
+        link = normalize_link(rows[0][1])
+        if ids == [new_id] and rows[0][1] == link:
+            continue
+        plan.append(IdeaMerge(
+            new_id, link, ids,
+            {table: next((i for i in ids if i in children[table]), None) for table in children},
+        ))
+    return plan
+
+
+def load_plan(connection: Connection) -> List[IdeaMerge]:
+    """The rewrite plan for the ideas in the database."""
+    children = {
+        model.__tablename__: set(connection.scalars(select(model.idea_id))) for model in CHILD_MODELS
+    }
+    return plan_idea_ids(connection.execute(select(Idea.id, Idea.link, Idea.date)), children)
+
+
+def apply_merge(connection: Connection, merge: IdeaMerge):
+    """Give the kept idea its new id and link, and delete the other copies."""
+    ideas = cast(Table, Idea.__table__)
+    old_ids = [i for i in merge.ids if i != merge.new_id]
+    if merge.kept != merge.new_id:
+        kept = connection.execute(select(ideas).where(ideas.c.id == merge.kept)).mappings().one()
+        # An empty link is exempt from the unique index until the copies are gone
+        connection.execute(insert(ideas).values({**kept, "id": merge.new_id, "link": ""}))
+    for model in CHILD_MODELS:
+        table = cast(Table, model.__table__)
+        source = merge.children.get(table.name)
+        if source is not None and source != merge.new_id:
+            connection.execute(update(table).where(table.c.idea_id == source).values(idea_id=merge.new_id))
+        # Also removes child rows added since the plan was made
+        others = [i for i in old_ids if i != source]
+        if others:
+            connection.execute(delete(table).where(table.c.idea_id.in_(others)))
+    if old_ids:
+        connection.execute(delete(ideas).where(ideas.c.id.in_(old_ids)))
+    connection.execute(update(ideas).where(ideas.c.id == merge.new_id).values(link=merge.link))
+
+
+def create_link_index(engine: Engine):
+    """The unique index on ideas.link, if it doesn't exist yet."""
+    index: Index = next(i for i in cast(Table, Idea.__table__).indexes if i.name == LINK_INDEX)
+    index.create(engine, checkfirst=True)
+
+
+def migrate_idea_ids(engine: Engine, batch_size: int = 500, dry_run: bool = False, log=print) -> Dict[str, int]:
+    """Rewrite every idea to its link id. Returns counts of what changed."""
+    with engine.connect() as connection:
+        plan = load_plan(connection)
+    stats = {
+        "groups": len(plan),
+        "rekeyed": sum(merge.kept != merge.new_id for merge in plan),
+        "duplicates": sum(len(merge.duplicates) for merge in plan),
+    }
+    if dry_run:
+        for merge in plan:
+            if merge.duplicates:
+                log(f"  {merge.new_id} {merge.link}: keep {merge.kept}, delete {', '.join(merge.duplicates)}")
+        return stats
+
+    for start in range(0, len(plan), batch_size):
+        batch = plan[start:start + batch_size]
+        with engine.begin() as connection:
+            for merge in batch:
+                apply_merge(connection, merge)
+            touched = [i for merge in batch for i in [merge.new_id, *merge.ids]]
+            record_change(connection, IDEAS, "migrate_idea_ids", touched)
+        log(f"Rewrote {min(start + batch_size, len(plan))} of {len(plan)} ideas")
+    create_link_index(engine)
+    return stats
+
+
+def main() -> int:
+    import argparse
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Re-key ideas by the VIC id in their link and remove duplicates")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--batch-size", type=int, default=500, help="Idea groups per transaction")
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    stats = migrate_idea_ids(engine, batch_size=args.batch_size, dry_run=args.dry_run)
+    prefix = "Would rewrite" if args.dry_run else "Rewrote"
+    print(f"{prefix} {stats['groups']} ideas: {stats['rekeyed']} new ids, "
+          f"{stats['duplicates']} duplicates removed")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -2,24 +2,38 @@
 Main entry point for the Value Investors Club API.
 Creates the FastAPI application and includes all routes.
 """
-import uvicorn
 from fastapi import FastAPI
 
-from api.routes import health_router, ideas_router, companies_router, users_router
+from api.metrics import MetricsMiddleware, install_query_hooks
+from api.responses import CompressionMiddleware, response_class_options
+from api.routes import (
+    health_router, ideas_router, companies_router, users_router, export_router, metrics_router, changes_router,
+)
 
 # Create FastAPI app
 app = FastAPI(
     title="Value Investors Club API",
     description="Read-only API for accessing Value Investors Club data",
     version="1.0.0",
+    **response_class_options(),
 )
 
+# gzip/brotli for large responses, see api/responses.py
+app.add_middleware(CompressionMiddleware)
+# Outermost, so request timings include compression. See api/metrics.py
+app.add_middleware(MetricsMiddleware)
+install_query_hooks()
+
 # Include all routers
 app.include_router(health_router)
 app.include_router(ideas_router)
 app.include_router(companies_router)
 app.include_router(users_router)
+app.include_router(export_router)
+app.include_router(metrics_router)
+app.include_router(changes_router)
 
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,406 @@
+"""
+Request metrics in the Prometheus text format, and opt-in request profiling.
+
+MetricsMiddleware times every request and, through SQLAlchemy cursor events,
+counts the queries it ran and the time spent running them. TimedRoute, the
+route class of every router, records the route template and the time spent
+in the endpoint function; the rest of the route handler's time is FastAPI's
+validation and JSON serialization of the result. instrument_pool() times
+connection pool checkouts. Everything is exposed at /metrics, with a
+Server-Timing header on every response for a quick look in the browser.
+
+Metrics are kept per process, so with several workers each is scraped (or
+aggregated) separately.
+
+With API_PROFILING=1, a request with ?profile=1 or an X-Profile: 1 header
+gets a profile of its endpoint function instead of its body: pyinstrument
+when it's installed, cProfile otherwise. It covers the queries, ORM loading
+and building of the result, not FastAPI's own serialization.
+"""
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+PROFILING = os.getenv("API_PROFILING", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # Per label set: non-cumulative bucket counts (the last is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def count(self, *labels: str) -> int:
+        return sum(self._values[labels][0]) if labels in self._values else 0
+
+    def sum(self, *labels: str) -> float:
+        return self._values[labels][1][0] if labels in self._values else 0.0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total[0]:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter("vic_api_requests_total", "Requests by route, method and status.", ("route", "method", "status"))
+REQUEST_SECONDS = Histogram(
+    "vic_api_request_duration_seconds", "Request latency, first byte to last.", LATENCY_BUCKETS, ("route", "method")
+)
+DB_SECONDS = Histogram(
+    "vic_api_request_db_seconds", "Time per request spent executing SQL.", LATENCY_BUCKETS, ("route",)
+)
+SERIALIZATION_SECONDS = Histogram(
+    "vic_api_request_serialization_seconds",
+    "Time per request spent validating and serializing the endpoint's result.", LATENCY_BUCKETS, ("route",),
+)
+QUERIES = Histogram("vic_api_request_queries", "SQL statements executed per request.", QUERY_BUCKETS, ("route",))
+POOL_WAIT_SECONDS = Histogram(
+    "vic_api_db_pool_wait_seconds", "Time spent waiting for a pooled database connection.", LATENCY_BUCKETS
+)
+
+METRICS: List[Union[Counter, Histogram]] = [
+    REQUESTS, REQUEST_SECONDS, DB_SECONDS, SERIALIZATION_SECONDS, QUERIES, POOL_WAIT_SECONDS,
+]
+
+
+@dataclass
+class RequestStats:
+    route: Optional[str] = None
+    queries: int = 0
+    db_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+    endpoint_seconds: float = 0.0
+    handler_seconds: float = 0.0
+    profile: bool = False
+    profile_report: Optional[str] = None
+
+    def server_timing(self) -> str:
+        return (f"db;dur={self.db_seconds * 1000:.1f};desc=\"{self.queries} queries\", "
+                f"endpoint;dur={self.endpoint_seconds * 1000:.1f}")
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, shared with the threads it runs code in."""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    stats = _current.get()
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_hooks():
+    """Count and time the SQL of every engine in this process."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_pool(engine: Engine):
+    """Time checkouts from engine's connection pool, including waits for a free connection."""
+    pool = engine.pool
+    connect = pool.connect
+    if getattr(connect, "_timed", False):
+        return
+
+    @functools.wraps(connect)
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            waited = time.perf_counter() - started
+            POOL_WAIT_SECONDS.observe(waited)
+            stats = _current.get()
+            if stats is not None:
+                stats.pool_wait_seconds += waited
+
+    timed_connect._timed = True  # type: ignore[attr-defined]
+    pool.connect = timed_connect  # type: ignore[method-assign]
+
+
+def pool_metrics(engine: Engine) -> List[str]:
+    """Gauges for the engine's pool, for pools that keep those counts."""
+    pool = engine.pool
+    lines = []
+    for name, attribute, documentation in (
+        ("vic_api_db_pool_size", "size", "Configured connection pool size."),
+        ("vic_api_db_pool_checked_out", "checkedout", "Connections currently in use."),
+        ("vic_api_db_pool_overflow", "overflow", "Connections open beyond the pool size."),
+    ):
+        method = getattr(pool, attribute, None)
+        if method is not None:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {method()}"]
+    return lines
+
+
+def render_metrics(engine: Optional[Engine] = None) -> str:
+    lines: List[str] = []
+    for metric in METRICS:
+        lines += metric.render()
+    if engine is not None:
+        lines += pool_metrics(engine)
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def _profiling(stats: RequestStats) -> Iterator[None]:
+    try:
+        from pyinstrument import Profiler  # type: ignore  # Optional dependency
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        sampler = Profiler(async_mode="disabled")
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            stats.profile_report = sampler.output_text(unicode=True, color=False)
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Only one cProfile can run at a time
+        stats.profile_report = "Another request is being profiled, try again"
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        stats.profile_report = out.getvalue()
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_async(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return await endpoint(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                if stats.profile:
+                    with _profiling(stats):
+                        return await endpoint(*args, **kwargs)
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats.endpoint_seconds += time.perf_counter() - started
+
+        timed: Callable = timed_async
+    else:
+        @functools.wraps(endpoint)
+        def timed_sync(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return endpoint(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                if stats.profile:
+                    with _profiling(stats):
+                        return endpoint(*args, **kwargs)
+                return endpoint(*args, **kwargs)
+            finally:
+                stats.endpoint_seconds += time.perf_counter() - started
+
+        timed = timed_sync
+    timed._timed = True  # type: ignore[attr-defined]
+    return timed
+
+
+def query_budget(queries: int) -> Callable[[Callable], Callable]:
+    """
+    Declare the most SQL statements one request to the endpoint may run.
+
+    Goes below the router decorator. The budgets are checked by the API tests
+    (api/tests/test_query_budgets.py), so an endpoint that starts loading
+    related rows one by one fails CI instead of slowing down in production.
+    """
+    def annotate(endpoint: Callable) -> Callable:
+        endpoint.query_budget = queries  # type: ignore[attr-defined]
+        return endpoint
+
+    return annotate
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records its template and endpoint time in the request's stats."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not getattr(endpoint, "_timed", False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+        self.query_budget: Optional[int] = getattr(endpoint, "query_budget", None)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def timed_handler(request):
+            stats = _current.get()
+            if stats is None:
+                return await handler(request)
+            stats.route = route
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                stats.handler_seconds += time.perf_counter() - started
+
+        return timed_handler
+
+
+def _wants_profile(scope: Scope) -> bool:
+    if Headers(scope=scope).get("x-profile") == "1":
+        return True
+    query = scope.get("query_string", b"").decode("latin-1")
+    return any(part in ("profile=1", "profile=true") for part in query.split("&"))
+
+
+def record_request(method: str, stats: RequestStats, status: int, elapsed: float):
+    route = stats.route or "unmatched"
+    REQUESTS.inc(route, method, str(status))
+    REQUEST_SECONDS.observe(elapsed, route, method)
+    DB_SECONDS.observe(stats.db_seconds, route)
+    QUERIES.observe(stats.queries, route)
+    if stats.handler_seconds:
+        SERIALIZATION_SECONDS.observe(max(stats.handler_seconds - stats.endpoint_seconds, 0.0), route)
+
+
+class MetricsMiddleware:
+    """Collect RequestStats for every request and record them when it ends."""
+
+    def __init__(self, app: ASGIApp, profiling: Optional[bool] = None):
+        self.app = app
+        self.profiling = profiling
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profiling = PROFILING if self.profiling is None else self.profiling
+        stats = RequestStats(profile=profiling and _wants_profile(scope))
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            if not stats.profile:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            record_request(scope["method"], stats, status, elapsed)
+
+        if stats.profile:
+            report = stats.profile_report or "No endpoint ran for this request"
+            body = (
+                f"{scope['method']} {scope['path']} -> {status} in {elapsed * 1000:.1f} ms, "
+                f"{stats.queries} queries in {stats.db_seconds * 1000:.1f} ms, "
+                f"pool wait {stats.pool_wait_seconds * 1000:.1f} ms\n\n{report}"
+            ).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"cache-control", b"no-store"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
@@ -1,21 +1,45 @@
 """
 Models package for the ValueInvestorsClub API.
-Imports the SQLAlchemy models from the ValueInvestorsClub package.
+Re-exports the SQLAlchemy models from the ValueInvestorsClub package. They're
+imported when one is first used, all at once, as their relationships refer to
+each other by name.
 """
-from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
-from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
-from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
-from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
-from ValueInvestorsClub.ValueInvestorsClub.models.User import User
-from ValueInvestorsClub.ValueInvestorsClub.models.Catalysts import Catalysts
-from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from typing import TYPE_CHECKING, Any
+
+from ValueInvestorsClub.ValueInvestorsClub import models as _models
+
+if TYPE_CHECKING:
+    from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
+    from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+    from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+    from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
+    from ValueInvestorsClub.ValueInvestorsClub.models.DescriptionDictionary import DescriptionDictionary
+    from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+    from ValueInvestorsClub.ValueInvestorsClub.models.Catalysts import Catalysts
+    from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+    from ValueInvestorsClub.ValueInvestorsClub.models.AuthorStats import AuthorStats
+    from ValueInvestorsClub.ValueInvestorsClub.models.DataVersion import DataVersion
+    from ValueInvestorsClub.ValueInvestorsClub.models.IdeaChange import IdeaChange
 
 __all__ = [
     "Base",
     "Idea",
     "Company",
     "Description",
+    "DescriptionDictionary",
     "User",
     "Catalysts",
     "Performance",
-]
\ No newline at end of file
+    "AuthorStats",
+    "DataVersion",
+    "IdeaChange",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    _models.load_models()
+    for model in __all__:
+        globals()[model] = getattr(getattr(_models, model), model)
+    return globals()[name]
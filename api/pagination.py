@@ -0,0 +1,41 @@
+"""
+Keyset pagination helpers.
+
+Cursors are opaque url-safe strings wrapping the sort key of the last row of
+a page, so the next page is a range scan on an index instead of an OFFSET.
+"""
+import base64
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row returned."""
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """Decode a cursor from encode_cursor, raising a 400 when it's malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(sort_column, tie_column, cursor_values: List[Any], descending: bool):
+    """
+    Condition selecting rows after the cursor for an ORDER BY of
+    (sort_column asc|desc, tie_column asc).
+    """
+    value, tie = cursor_values
+    after = sort_column < value if descending else sort_column > value
+    return after | ((sort_column == value) & (tie_column > tie))
@@ -0,0 +1,103 @@
+"""
+Shared description of the stored performance horizons.
+
+The performance table has one column per horizon. Routes refer to them by a
+query string key (e.g. "one_year_perf") and the frontend by a short label
+(e.g. "1Y"), so the mapping between the three lives here in one place.
+
+The timeline fields served with performance (labels, values and the
+label -> value map) only depend on the row's values, so they are built once
+per distinct row by performance_timeline() and shared between requests.
+"""
+import os
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from api.models import Performance
+
+
+class PerformancePeriod(NamedTuple):
+    key: str
+    label: str
+    column: str
+
+
+PERFORMANCE_PERIODS: List[PerformancePeriod] = [
+    PerformancePeriod("one_week_perf", "1W", "oneWeekClosePerf"),
+    PerformancePeriod("two_week_perf", "2W", "twoWeekClosePerf"),
+    PerformancePeriod("one_month_perf", "1M", "oneMonthPerf"),
+    PerformancePeriod("three_month_perf", "3M", "threeMonthPerf"),
+    PerformancePeriod("six_month_perf", "6M", "sixMonthPerf"),
+    PerformancePeriod("one_year_perf", "1Y", "oneYearPerf"),
+    PerformancePeriod("two_year_perf", "2Y", "twoYearPerf"),
+    PerformancePeriod("three_year_perf", "3Y", "threeYearPerf"),
+    PerformancePeriod("five_year_perf", "5Y", "fiveYearPerf"),
+]
+
+DEFAULT_PERFORMANCE_PERIOD = "one_year_perf"
+
+# Distinct performance rows whose timelines are kept, roughly 1 KB each
+PERFORMANCE_CACHE_SIZE = int(os.getenv("PERFORMANCE_CACHE_SIZE", "16384"))
+
+_PERIODS_BY_KEY: Dict[str, PerformancePeriod] = {p.key: p for p in PERFORMANCE_PERIODS}
+
+
+def performance_period(period: str) -> PerformancePeriod:
+    """Look up a performance_period query value, falling back to one year."""
+    return _PERIODS_BY_KEY.get(period, _PERIODS_BY_KEY[DEFAULT_PERFORMANCE_PERIOD])
+
+
+def performance_column(period: str):
+    """
+    Map a performance_period query value to its Performance column.
+    Unknown values fall back to the one year column.
+    """
+    return getattr(Performance, performance_period(period).column)
+
+
+def performance_columns():
+    """All stored horizon columns, shortest first."""
+    return [getattr(Performance, p.column) for p in PERFORMANCE_PERIODS]
+
+
+def direction_adjusted_return(ratio: Optional[float], is_short: bool) -> Optional[float]:
+    """
+    Simple return of an idea from a stored price ratio: a long earns
+    ratio - 1 and a short earns 1 - ratio.
+    """
+    if ratio is None:
+        return None
+    return 1.0 - ratio if is_short else ratio - 1.0
+
+
+class PerformanceTimeline(NamedTuple):
+    labels: List[str]
+    values: List[float]
+    periods: Dict[str, float]
+
+
+def performance_values(performance) -> Tuple[Optional[float], ...]:
+    """
+    A performance row's values, nextDayOpen and nextDayClose first and then
+    every horizon shortest first. Doubles as the row's version: any change to
+    the row gives a different tuple.
+    """
+    return (performance.nextDayOpen, performance.nextDayClose) + tuple(
+        getattr(performance, p.column) for p in PERFORMANCE_PERIODS
+    )
+
+
+@lru_cache(maxsize=PERFORMANCE_CACHE_SIZE)
+def performance_timeline(values: Tuple[Optional[float], ...]) -> Optional[PerformanceTimeline]:
+    """
+    The horizons with a value, for performance_values() of a row, or None
+    when there are none. The result is shared, so it must not be modified.
+    """
+    valid = [(p.label, value) for p, value in zip(PERFORMANCE_PERIODS, values[2:]) if value is not None]
+    if not valid:
+        return None
+    return PerformanceTimeline(
+        labels=[label for label, _ in valid],
+        values=[value for _, value in valid],
+        periods=dict(valid),
+    )
@@ -0,0 +1,39 @@
+"""
+Pricing package for the ValueInvestorsClub API.
+Matches VIC tickers to locally stored daily price series and computes
+returns over arbitrary horizons from them.
+"""
+from api.pricing.tickers import (
+    TickerIndex,
+    SeriesRef,
+    Resolution,
+    CoverageReport,
+    parse_vic_ticker,
+    normalize_symbol,
+    resolve_all_ideas,
+    coverage_report,
+)
+from api.pricing.horizons import Horizon, HorizonError, parse_horizon, parse_horizons
+from api.pricing.store import PriceSeries, PriceStore, get_price_store
+from api.pricing.returns import IdeaReturns, compute_idea_returns, compute_series_returns
+
+__all__ = [
+    "TickerIndex",
+    "SeriesRef",
+    "Resolution",
+    "CoverageReport",
+    "parse_vic_ticker",
+    "normalize_symbol",
+    "resolve_all_ideas",
+    "coverage_report",
+    "Horizon",
+    "HorizonError",
+    "parse_horizon",
+    "parse_horizons",
+    "PriceSeries",
+    "PriceStore",
+    "get_price_store",
+    "IdeaReturns",
+    "compute_idea_returns",
+    "compute_series_returns",
+]
@@ -0,0 +1,76 @@
+"""
+Parsing of free form return horizons such as "3d", "2w", "18m" or "5y".
+
+Horizons are calendar offsets from the idea date, which is how the stored
+performance columns were computed (one week, one month, ...).
+"""
+import re
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+_HORIZON = re.compile(r"^\s*(\d+)\s*([dwmy])\s*$", re.IGNORECASE)
+
+MAX_HORIZON_DAYS = 366 * 30
+
+
+class HorizonError(ValueError):
+    """Raised for horizons that can't be parsed."""
+
+
+@dataclass(frozen=True)
+class Horizon:
+    amount: int
+    unit: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.amount}{self.unit}"
+
+    @property
+    def approx_days(self) -> int:
+        return self.amount * {"d": 1, "w": 7, "m": 31, "y": 366}[self.unit]
+
+    def targets(self, start: np.ndarray) -> np.ndarray:
+        """
+        Vectorized target dates for an array of datetime64[D] start dates.
+        Month and year offsets clip to the end of shorter months.
+        """
+        if self.unit in ("d", "w"):
+            days = self.amount * (7 if self.unit == "w" else 1)
+            return start + np.timedelta64(days, "D")
+
+        months = self.amount * (12 if self.unit == "y" else 1)
+        month_start = start.astype("datetime64[M]")
+        day_offset = (start - month_start.astype("datetime64[D]")).astype(np.int64)
+        target_month = month_start + np.timedelta64(months, "M")
+        next_month = (target_month + np.timedelta64(1, "M")).astype("datetime64[D]")
+        last_day = (next_month - target_month.astype("datetime64[D]")).astype(np.int64) - 1
+        return target_month.astype("datetime64[D]") + np.minimum(day_offset, last_day).astype("timedelta64[D]")
+
+
+def parse_horizon(text: str) -> Horizon:
+    match = _HORIZON.match(text)
+    if not match:
+        raise HorizonError(f"Invalid horizon {text!r}, expected e.g. 3d, 2w, 18m or 5y")
+    horizon = Horizon(int(match.group(1)), match.group(2).lower())
+    if horizon.amount == 0 or horizon.approx_days > MAX_HORIZON_DAYS:
+        raise HorizonError(f"Horizon {text!r} is out of range")
+    return horizon
+
+
+def parse_horizons(text: str, limit: int = 20) -> List[Horizon]:
+    """Parse a comma separated list of horizons, dropping duplicates."""
+    horizons: List[Horizon] = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        horizon = parse_horizon(part)
+        if horizon not in horizons:
+            horizons.append(horizon)
+    if not horizons:
+        raise HorizonError("At least one horizon is required")
+    if len(horizons) > limit:
+        raise HorizonError(f"At most {limit} horizons can be requested at once")
+    return horizons
@@ -0,0 +1,107 @@
+"""
+On the fly return computation for arbitrary horizons.
+
+Returns follow the convention of the performance table: the close on (or just
+before) the horizon date divided by the close of the first trading day after
+the idea was posted. Ideas are grouped by price series and every horizon is
+looked up with a single np.searchsorted over that series.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from api.pricing.horizons import Horizon
+from api.pricing.store import PriceSeries, PriceStore
+
+
+@dataclass
+class IdeaReturns:
+    idea_id: str
+    ticker: str
+    price_symbol: Optional[str] = None
+    base_date: Optional[date] = None
+    base_close: Optional[float] = None
+    returns: Dict[str, Optional[float]] = field(default_factory=dict)
+    unmatched_reason: Optional[str] = None
+
+
+def _as_day(value) -> np.datetime64:
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+def compute_series_returns(
+    series: PriceSeries, idea_dates: np.ndarray, horizons: List[Horizon]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute returns for many ideas on the same series.
+
+    Returns (base_idx, ratios) where base_idx is the index of the base close
+    for each idea (-1 when there's no trading after the idea date) and ratios
+    is an (ideas x horizons) array with NaN where the horizon isn't covered.
+    """
+    n = len(series)
+    ratios = np.full((len(idea_dates), len(horizons)), np.nan)
+    if n == 0:
+        return np.full(len(idea_dates), -1), ratios
+
+    # First trading day strictly after the idea was posted
+    base_idx = np.searchsorted(series.dates, idea_dates, side="right")
+    has_base = base_idx < n
+    safe_base = np.minimum(base_idx, n - 1)
+    base_close = series.closes[safe_base]
+    last_date = series.dates[-1]
+
+    for j, horizon in enumerate(horizons):
+        targets = horizon.targets(idea_dates)
+        idx = np.searchsorted(series.dates, targets, side="right") - 1
+        # Targets past the end of the series mean the stock stopped trading
+        ok = has_base & (targets <= last_date) & (idx >= safe_base)
+        ratios[:, j] = np.where(ok, series.closes[np.maximum(idx, 0)] / base_close, np.nan)
+
+    return np.where(has_base, base_idx, -1), ratios
+
+
+def compute_idea_returns(
+    store: PriceStore,
+    ideas: Iterable[Tuple[str, str, Any]],
+    horizons: List[Horizon],
+) -> Dict[str, IdeaReturns]:
+    """Compute returns for (idea_id, ticker, date) rows, one pass per series."""
+    results: Dict[str, IdeaReturns] = {}
+    groups: Dict[str, List[Tuple[str, np.datetime64]]] = defaultdict(list)
+    refs = {}
+
+    for idea_id, ticker, posted in ideas:
+        result = IdeaReturns(idea_id=idea_id, ticker=ticker or "")
+        results[idea_id] = result
+        resolution = store.index.resolve(result.ticker, posted.date() if isinstance(posted, datetime) else posted)
+        ref = resolution.series
+        if ref is None:
+            result.unmatched_reason = resolution.reason
+            result.returns = {h.label: None for h in horizons}
+            continue
+        result.price_symbol = ref.key
+        refs[ref.path] = ref
+        groups[ref.path].append((idea_id, _as_day(posted)))
+
+    for path, members in groups.items():
+        series = store.load(refs[path])
+        idea_dates = np.array([d for _, d in members], dtype="datetime64[D]")
+        base_idx, ratios = compute_series_returns(series, idea_dates, horizons)
+        for row, (idea_id, _) in enumerate(members):
+            result = results[idea_id]
+            if base_idx[row] >= 0:
+                result.base_date = series.dates[base_idx[row]].astype(date)
+                result.base_close = float(series.closes[base_idx[row]])
+            else:
+                result.unmatched_reason = "no_prices_after_idea"
+            result.returns = {
+                h.label: (None if np.isnan(ratios[row, j]) else float(ratios[row, j]))
+                for j, h in enumerate(horizons)
+            }
+    return results
@@ -0,0 +1,112 @@
+"""
+Local store of daily close prices backed by stooq files on disk.
+
+Series are loaded on demand into compact NumPy arrays and kept in a bounded
+LRU cache, so repeated requests for the same tickers never touch the disk.
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from api.pricing.tickers import SeriesRef, TickerIndex
+
+# Root of a stooq download and/or a prebuilt index from `python -m api.pricing.tickers`
+PRICE_DATA_DIR = os.getenv("PRICE_DATA_DIR")
+PRICE_INDEX_PATH = os.getenv("PRICE_INDEX_PATH")
+PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", "512"))
+
+
+@dataclass(frozen=True)
+class PriceSeries:
+    """Daily closes for one ticker, sorted by date."""
+    dates: np.ndarray  # datetime64[D]
+    closes: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def read_stooq_file(path: str) -> PriceSeries:
+    """Read the date and close columns of a stooq bulk or csv download file."""
+    import pandas as pd  # type: ignore  # Missing stubs for pandas
+
+    frame = pd.read_csv(path, usecols=lambda c: c.strip("<>").upper() in ("DATE", "CLOSE"))
+    frame.columns = [c.strip("<>").upper() for c in frame.columns]
+    raw_dates = frame["DATE"].astype(str)
+    fmt = "%Y-%m-%d" if raw_dates.str.contains("-").any() else "%Y%m%d"
+    dates = pd.to_datetime(raw_dates, format=fmt).to_numpy().astype("datetime64[D]")
+    closes = frame["CLOSE"].to_numpy(dtype=np.float64)
+
+    keep = np.isfinite(closes) & (closes > 0)
+    dates, closes = dates[keep], closes[keep]
+    order = np.argsort(dates, kind="stable")
+    return PriceSeries(dates=dates[order], closes=closes[order])
+
+
+class PriceStore:
+    """Resolves tickers through a TickerIndex and serves cached price series."""
+
+    def __init__(self, index: TickerIndex, cache_size: int = PRICE_CACHE_SIZE):
+        self.index = index
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, PriceSeries]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, ref: SeriesRef) -> PriceSeries:
+        with self._lock:
+            series = self._cache.get(ref.path)
+            if series is not None:
+                self._cache.move_to_end(ref.path)
+                self.hits += 1
+                return series
+            self.misses += 1
+
+        # Read outside the lock so a slow file doesn't block cached lookups
+        series = read_stooq_file(ref.path)
+        with self._lock:
+            self._cache[ref.path] = series
+            self._cache.move_to_end(ref.path)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return series
+
+    def cache_info(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_store: Optional[PriceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_price_store() -> Optional[PriceStore]:
+    """
+    Dependency returning the process wide price store.
+    Returns None when no price data has been configured.
+    """
+    global _store
+    if _store is not None:
+        return _store
+    if not PRICE_INDEX_PATH and not PRICE_DATA_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            if PRICE_INDEX_PATH and os.path.exists(PRICE_INDEX_PATH):
+                index = TickerIndex.load(PRICE_INDEX_PATH)
+            elif PRICE_DATA_DIR:
+                index = TickerIndex.from_stooq_dir(PRICE_DATA_DIR)
+            else:
+                return None
+            _store = PriceStore(index)
+    return _store
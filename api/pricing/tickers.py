@@ -0,0 +1,403 @@
+"""
+Resolution of raw VIC tickers to local stooq price series.
+
+The companies table stores tickers the way VIC displays them, e.g. "ABC US",
+"XYZ LN" or "BRK/B US", while the stooq daily files are named like
+"abc.us.txt", "xyz.uk.txt" and "brk-b.us.txt". This module builds a hash index
+from normalized ticker keys to the series on disk and resolves tickers against
+it, taking exchange suffixes, share classes and the date range each series is
+valid for (delisted symbols get reused) into account.
+"""
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Bloomberg style exchange codes used on VIC mapped to stooq market suffixes
+EXCHANGE_SUFFIXES: Dict[str, str] = {
+    # United States
+    "US": "us", "UN": "us", "UW": "us", "UQ": "us", "UA": "us",
+    "UR": "us", "UP": "us", "UV": "us", "UF": "us", "UT": "us",
+    # United Kingdom
+    "LN": "uk",
+    # Germany
+    "GR": "de", "GY": "de", "GF": "de", "GM": "de", "GS": "de",
+    "GH": "de", "GD": "de", "GB": "de", "GI": "de", "TH": "de",
+    # Japan
+    "JP": "jp", "JT": "jp",
+    # Hong Kong
+    "HK": "hk",
+    # Poland
+    "PW": "pl",
+    # Hungary
+    "HB": "hu",
+}
+
+# Yahoo style suffixes that also show up in some write-ups, e.g. "VOD.L"
+DOT_SUFFIXES: Dict[str, str] = {
+    "L": "uk",
+    "DE": "de",
+    "F": "de",
+    "T": "jp",
+    "HK": "hk",
+    "WA": "pl",
+    "BD": "hu",
+}
+
+# Exchange codes we recognise but have no stooq data for
+UNSUPPORTED_EXCHANGES = {
+    "CN", "CT", "AU", "FP", "NA", "IM", "SM", "SW", "SS", "DC", "NO", "FH",
+    "BB", "ID", "PL", "AV", "GA", "KS", "TT", "SP", "IN", "BZ", "MM", "SJ",
+    "NZ", "TB", "IJ", "MK", "PM", "CH", "CI", "AR", "IT", "TI", "RM", "LI",
+}
+
+# Markets tried, in order, when a ticker has no exchange at all
+DEFAULT_SUFFIXES: Tuple[str, ...] = ("us",)
+
+_SEPARATORS = re.compile(r"[./\s_-]+")
+
+
+@dataclass(frozen=True)
+class SeriesRef:
+    """A price series on disk and the date range it covers."""
+    key: str
+    path: str
+    start: date
+    end: date
+
+    def covers(self, on: date, tolerance: timedelta) -> bool:
+        return self.start - tolerance <= on <= self.end + tolerance
+
+
+@dataclass
+class Resolution:
+    """The outcome of resolving one VIC ticker."""
+    ticker: str
+    series: Optional[SeriesRef] = None
+    method: Optional[str] = None
+    reason: Optional[str] = None
+    exchange: Optional[str] = None
+
+    @property
+    def matched(self) -> bool:
+        return self.series is not None
+
+
+@dataclass
+class CoverageReport:
+    """Summary of how many companies and ideas could be matched to prices."""
+    total_ideas: int = 0
+    matched_ideas: int = 0
+    total_tickers: int = 0
+    matched_tickers: int = 0
+    methods: Dict[str, int] = field(default_factory=dict)
+    unmatched_reasons: Dict[str, int] = field(default_factory=dict)
+    unmatched_exchanges: Dict[str, int] = field(default_factory=dict)
+    # (ticker, reason, number of ideas) sorted by number of ideas
+    unmatched: List[Tuple[str, str, int]] = field(default_factory=list)
+
+    @property
+    def idea_coverage(self) -> float:
+        return self.matched_ideas / self.total_ideas if self.total_ideas else 0.0
+
+    @property
+    def ticker_coverage(self) -> float:
+        return self.matched_tickers / self.total_tickers if self.total_tickers else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["idea_coverage"] = self.idea_coverage
+        data["ticker_coverage"] = self.ticker_coverage
+        return data
+
+
+def normalize_symbol(symbol: str) -> str:
+    """
+    Normalize a bare symbol so share classes compare equal.
+    "BRK/B", "BRK.B", "BRK B" and "brk-b" all become "brk-b".
+    """
+    return _SEPARATORS.sub("-", symbol.strip().lower()).strip("-")
+
+
+def parse_vic_ticker(raw: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a raw VIC ticker into a normalized symbol and an exchange code.
+
+    "ABC US" -> ("abc", "US"), "BRK/B US" -> ("brk-b", "US"),
+    "VOD.L" -> ("vod", "L"), "AAPL" -> ("aapl", None)
+    """
+    text = raw.strip().upper()
+    if text.endswith(" EQUITY"):
+        text = text[: -len(" EQUITY")]
+    tokens = [t for t in re.split(r"[\s:]+", text) if t]
+    if not tokens:
+        return "", None
+
+    if len(tokens) > 1 and (tokens[-1] in EXCHANGE_SUFFIXES or tokens[-1] in UNSUPPORTED_EXCHANGES):
+        return normalize_symbol(" ".join(tokens[:-1])), tokens[-1]
+
+    symbol = " ".join(tokens)
+    if "." in symbol:
+        base, _, suffix = symbol.rpartition(".")
+        if base and suffix in DOT_SUFFIXES:
+            return normalize_symbol(base), suffix
+    return normalize_symbol(symbol), None
+
+
+def _exchange_suffix(exchange: str) -> Optional[str]:
+    return EXCHANGE_SUFFIXES.get(exchange) or DOT_SUFFIXES.get(exchange)
+
+
+def _parse_date(value: str) -> date:
+    value = value.strip()
+    if "-" in value:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    return datetime.strptime(value, "%Y%m%d").date()
+
+
+def read_series_range(path: str) -> Optional[Tuple[date, date]]:
+    """
+    Read the first and last date of a stooq file without parsing all of it.
+    Supports both the bulk "<TICKER>,<PER>,<DATE>,..." layout and the
+    "Date,Open,High,Low,Close,Volume" csv download layout.
+    """
+    with open(path, "rb") as f:
+        header = f.readline().decode("utf-8", "replace")
+        first = f.readline().decode("utf-8", "replace")
+        if not first.strip():
+            return None
+        # Seek back from the end far enough to capture the last full line
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 512))
+        last = f.read().decode("utf-8", "replace").strip().splitlines()[-1]
+
+    columns = [c.strip().strip("<>").upper() for c in header.split(",")]
+    date_col = columns.index("DATE") if "DATE" in columns else 0
+    try:
+        return _parse_date(first.split(",")[date_col]), _parse_date(last.split(",")[date_col])
+    except (ValueError, IndexError):
+        return None
+
+
+class TickerIndex:
+    """
+    Hash index from normalized "symbol.market" keys to price series.
+
+    Several series may share a key when a delisted symbol was later reused by
+    another company, so each key maps to a list ordered by start date and the
+    one valid on the idea date is picked at resolution time.
+    """
+
+    def __init__(self, tolerance_days: int = 7):
+        self.tolerance = timedelta(days=tolerance_days)
+        self._series: Dict[str, List[SeriesRef]] = defaultdict(list)
+        # bare symbol -> markets it trades on, for tickers without an exchange
+        self._markets: Dict[str, set] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return sum(len(refs) for refs in self._series.values())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._series
+
+    def add(self, ref: SeriesRef) -> None:
+        refs = self._series[ref.key]
+        refs.append(ref)
+        refs.sort(key=lambda r: r.start)
+        symbol, _, market = ref.key.rpartition(".")
+        self._markets[symbol].add(market)
+
+    @classmethod
+    def from_stooq_dir(cls, root: str, tolerance_days: int = 7) -> "TickerIndex":
+        """
+        Build an index by walking a stooq download, e.g. data/daily/us/...,
+        where every file is named "<symbol>.<market>.txt".
+        """
+        index = cls(tolerance_days=tolerance_days)
+        for path in Path(root).rglob("*.*"):
+            if path.suffix.lower() not in (".txt", ".csv"):
+                continue
+            symbol, _, market = path.stem.lower().rpartition(".")
+            if not symbol:
+                continue
+            date_range = read_series_range(str(path))
+            if date_range is None:
+                continue
+            key = f"{normalize_symbol(symbol)}.{market}"
+            index.add(SeriesRef(key=key, path=str(path), start=date_range[0], end=date_range[1]))
+        return index
+
+    def save(self, path: str) -> None:
+        """Persist the index so it doesn't have to be rebuilt from disk."""
+        rows = [
+            [ref.key, ref.path, ref.start.isoformat(), ref.end.isoformat()]
+            for refs in self._series.values() for ref in refs
+        ]
+        with open(path, "w") as f:
+            json.dump({"tolerance_days": self.tolerance.days, "series": rows}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "TickerIndex":
+        with open(path, "r") as f:
+            data = json.load(f)
+        index = cls(tolerance_days=data["tolerance_days"])
+        for key, series_path, start, end in data["series"]:
+            index.add(SeriesRef(key, series_path, date.fromisoformat(start), date.fromisoformat(end)))
+        return index
+
+    def _lookup(self, key: str, on: Optional[date]) -> Tuple[Optional[SeriesRef], Optional[str]]:
+        refs = self._series.get(key)
+        if not refs:
+            return None, "not_found"
+        if on is None:
+            return refs[-1], None
+        for ref in refs:
+            if ref.covers(on, self.tolerance):
+                return ref, None
+        return None, "out_of_range"
+
+    def _candidates(self, symbol: str, exchange: Optional[str]) -> List[Tuple[str, str]]:
+        """Keys to try, in order of preference, paired with the method name."""
+        if exchange is not None:
+            suffixes: Iterable[str] = [_exchange_suffix(exchange) or ""]
+        else:
+            markets = self._markets.get(symbol, set())
+            # Only fall back to a foreign market when the symbol is unambiguous
+            suffixes = list(DEFAULT_SUFFIXES) + (sorted(markets) if len(markets) == 1 else [])
+
+        candidates = []
+        for suffix in suffixes:
+            candidates.append((f"{symbol}.{suffix}", "exact" if exchange else "default_market"))
+            if "-" in symbol:
+                candidates.append((f"{symbol.replace('-', '')}.{suffix}", "share_class_compact"))
+                candidates.append((f"{symbol.split('-')[0]}.{suffix}", "share_class_base"))
+        return candidates
+
+    def resolve(self, ticker: str, on: Optional[date] = None) -> Resolution:
+        """Resolve one raw VIC ticker, optionally as of the idea date."""
+        symbol, exchange = parse_vic_ticker(ticker)
+        resolution = Resolution(ticker=ticker, exchange=exchange)
+        if not symbol:
+            resolution.reason = "empty_ticker"
+            return resolution
+        if exchange is not None and _exchange_suffix(exchange) is None:
+            resolution.reason = "unsupported_exchange"
+            return resolution
+
+        reason = "not_found"
+        for key, method in self._candidates(symbol, exchange):
+            ref, miss = self._lookup(key, on)
+            if ref is not None:
+                resolution.series = ref
+                resolution.method = method
+                return resolution
+            # A key that exists but doesn't cover the date is the more useful reason
+            if miss == "out_of_range":
+                reason = miss
+        resolution.reason = reason
+        return resolution
+
+    def resolve_many(
+        self, rows: Iterable[Tuple[str, str, Optional[date]]]
+    ) -> Dict[str, Resolution]:
+        """
+        Resolve many (idea_id, ticker, date) rows in one pass.
+        Tickers are parsed once and lookups are memoized per (ticker, date).
+        """
+        memo: Dict[Tuple[str, Optional[date]], Resolution] = {}
+        results = {}
+        for idea_id, ticker, on in rows:
+            day = on.date() if isinstance(on, datetime) else on
+            key = (ticker, day)
+            if key not in memo:
+                memo[key] = self.resolve(ticker, day)
+            results[idea_id] = memo[key]
+        return results
+
+
+def resolve_all_ideas(session, index: TickerIndex) -> Dict[str, Resolution]:
+    """Resolve the company of every idea in the database with a single query."""
+    from sqlalchemy import select
+    from api.models import Idea
+
+    rows = session.execute(select(Idea.id, Idea.company_id, Idea.date)).all()
+    return index.resolve_many((idea_id, ticker or "", on) for idea_id, ticker, on in rows)
+
+
+def coverage_report(resolutions: Dict[str, Resolution], top: int = 50) -> CoverageReport:
+    """Summarize idea and ticker coverage for a set of resolutions."""
+    report = CoverageReport(total_ideas=len(resolutions))
+    by_ticker: Dict[str, List[Resolution]] = defaultdict(list)
+    methods: Counter = Counter()
+    for resolution in resolutions.values():
+        by_ticker[resolution.ticker].append(resolution)
+        if resolution.matched:
+            report.matched_ideas += 1
+            methods[resolution.method] += 1
+
+    reasons: Counter = Counter()
+    exchanges: Counter = Counter()
+    unmatched = []
+    report.total_tickers = len(by_ticker)
+    for ticker, items in by_ticker.items():
+        misses = [r for r in items if not r.matched]
+        if len(misses) < len(items):
+            report.matched_tickers += 1
+            continue
+        reason = misses[0].reason or "not_found"
+        reasons[reason] += 1
+        exchanges[misses[0].exchange or "NONE"] += 1
+        unmatched.append((ticker, reason, len(items)))
+
+    unmatched.sort(key=lambda row: (-row[2], row[0]))
+    report.methods = dict(methods)
+    report.unmatched_reasons = dict(reasons)
+    report.unmatched_exchanges = dict(exchanges.most_common())
+    report.unmatched = unmatched[:top]
+    return report
+
+
+def main() -> int:
+    """Build the ticker index and print a coverage report for the database."""
+    import argparse
+    from sqlalchemy.orm import Session
+    from api.database import engine
+
+    parser = argparse.ArgumentParser(description="Match VIC tickers to stooq price files")
+    parser.add_argument("prices_dir", help="Root of the stooq daily data download")
+    parser.add_argument("--index-out", help="Write the built index to this json file")
+    parser.add_argument("--report-out", help="Write the coverage report to this json file")
+    parser.add_argument("--top", type=int, default=50, help="Number of unmatched tickers to list")
+    args = parser.parse_args()
+
+    index = TickerIndex.from_stooq_dir(args.prices_dir)
+    print(f"Indexed {len(index)} price series")
+    if args.index_out:
+        index.save(args.index_out)
+
+    with Session(engine) as session:
+        resolutions = resolve_all_ideas(session, index)
+    report = coverage_report(resolutions, top=args.top)
+
+    print(f"Ideas matched:   {report.matched_ideas}/{report.total_ideas} ({report.idea_coverage:.1%})")
+    print(f"Tickers matched: {report.matched_tickers}/{report.total_tickers} ({report.ticker_coverage:.1%})")
+    print(f"Match methods:   {report.methods}")
+    print(f"Unmatched by reason:   {report.unmatched_reasons}")
+    print(f"Unmatched by exchange: {report.unmatched_exchanges}")
+    for ticker, reason, count in report.unmatched:
+        print(f"  {ticker:<24} {reason:<22} {count} ideas")
+
+    if args.report_out:
+        with open(args.report_out, "w") as f:
+            json.dump(report.to_dict(), f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
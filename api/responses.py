@@ -0,0 +1,208 @@
+"""
+JSON serialization and response compression for the API.
+
+Serialization: FastAPI releases with the Pydantic dump_json fast path already
+serialize response models to JSON bytes in Rust, and a custom response class
+would switch that off. On older releases every response goes through
+json.dumps, so FastJSONResponse (orjson when installed) is used instead.
+API_JSON_RESPONSE picks explicitly: auto (default), orjson or json.
+
+Compression: CompressionMiddleware negotiates brotli (when the brotli package
+is installed) or gzip from Accept-Encoding for text-like responses of at least
+API_COMPRESSION_MIN_SIZE bytes. Streamed responses are compressed chunk by
+chunk and flushed so clients still see rows as they are produced. Server-sent
+events are never compressed. Set API_COMPRESSION to an empty string to turn it
+off, or to e.g. "gzip" to only offer gzip.
+"""
+import inspect
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson  # type: ignore  # Optional dependency
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import brotli  # type: ignore  # Optional dependency
+except ImportError:
+    brotli = None  # type: ignore[assignment]
+
+JSON_RESPONSE = os.getenv("API_JSON_RESPONSE", "auto")
+COMPRESSION = os.getenv("API_COMPRESSION", "br,gzip")
+COMPRESSION_MIN_SIZE = int(os.getenv("API_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", "4"))
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes, with orjson when it's installed."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps()."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def pydantic_fast_path() -> bool:
+    """Whether this FastAPI serializes response models straight to JSON bytes."""
+    from fastapi import routing
+    return "dump_json" in inspect.signature(routing.serialize_response).parameters
+
+
+def response_class_options() -> Dict[str, Any]:
+    """FastAPI() keyword arguments for the configured JSON serialization."""
+    if JSON_RESPONSE == "json":
+        return {}
+    if JSON_RESPONSE == "orjson" or (orjson is not None and not pydantic_fast_path()):
+        return {"default_response_class": FastJSONResponse}
+    return {}
+
+
+def available_encodings(configured: str = COMPRESSION) -> List[str]:
+    """Configured encodings this process can produce, most preferred first."""
+    encodings = [e.strip() for e in configured.split(",") if e.strip()]
+    return [e for e in encodings if e == "gzip" or (e == "br" and brotli is not None)]
+
+
+def choose_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the first of encodings the client accepts, honouring q=0."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type == "text/event-stream":
+        return False
+    return content_type.startswith("text/") or content_type.endswith(("json", "csv", "xml", "javascript"))
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + (self._br.flush() if flush else b"")
+        return self._gzip.compress(data) + (self._gzip.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + self._br.finish()
+        return self._gzip.compress(data) + self._gzip.flush()
+
+
+class CompressionMiddleware:
+    """Compress responses with the best encoding the client accepts."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: Optional[List[str]] = None,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.encodings = available_encodings() if encodings is None else encodings
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, config: CompressionMiddleware):
+        self._send = send
+        self.encoding = encoding
+        self.config = config
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(scope=start)
+            if (
+                start["status"] < 200 or start["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not _compressible(headers.get("content-type", ""))
+                or (not more_body and len(body) < self.config.minimum_size)
+            ):
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+            self.compressor = _Compressor(self.encoding, self.config.gzip_level, self.config.brotli_quality)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                await self._send(start)
+            else:
+                body = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+
+        if self.passthrough or self.compressor is None:
+            await self._send(message)
+            return
+        if more_body:
+            chunk = self.compressor.compress(body, flush=True)
+            if chunk:
+                await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            await self._send({"type": "http.response.body", "body": self.compressor.finish(body)})
@@ -6,10 +6,16 @@ from api.routes.health import router as health_router
 from api.routes.ideas import router as ideas_router
 from api.routes.companies import router as companies_router
 from api.routes.users import router as users_router
+from api.routes.export import router as export_router
+from api.routes.metrics import router as metrics_router
+from api.routes.changes import router as changes_router
 
 __all__ = [
     "health_router",
     "ideas_router", 
     "companies_router", 
-    "users_router"
+    "users_router",
+    "export_router",
+    "metrics_router",
+    "changes_router",
 ]
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Routes for the change feed of the ValueInvestorsClub API.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from api.changes import changes_since, stream_changes
+from api.database import get_read_db
+from api.metrics import TimedRoute, query_budget
+from api.schemas import ChangesResponse
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get(
+    "/changes",
+    response_model=ChangesResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+@query_budget(2)
+def get_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Return changes after this change id"),
+    limit: int = Query(1000, ge=1, le=10000, description="Most changes per page or event batch"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Changes to the data after the change id `since`, with the current data
+    versions. Each change names an idea that was added, updated or removed,
+    or none when every idea may have changed. With
+    `Accept: text/event-stream` the changes are streamed as Server-Sent
+    Events as they're committed, resuming after Last-Event-ID on reconnects.
+    """
+    try:
+        if "text/event-stream" in request.headers.get("accept", ""):
+            if last_event_id and last_event_id.isdigit():
+                since = max(since, int(last_event_id))
+            return StreamingResponse(
+                stream_changes(db.get_bind(), since, limit),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        return changes_since(db, since, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_changes: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,23 +1,34 @@
 """
 Routes for companies in the ValueInvestorsClub API.
 """
-from fastapi import APIRouter, Query, Depends
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from statistics import median
 
-from api.database import get_db
-from api.models import Company
-from api.schemas import CompanyResponse
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from sqlalchemy.orm import Session, contains_eager
+from typing import Any, List, Optional
 
-router = APIRouter()
+from api.caching import cacheable
+from api.database import get_read_db
+from api.metrics import TimedRoute, query_budget
+from api.models import Company, Idea
+from api.performance import DEFAULT_PERFORMANCE_PERIOD, direction_adjusted_return, performance_period
+from api.schemas import (
+    CompanyIdeaResponse,
+    CompanyResponse,
+    CompanyTimelineResponse,
+    CompanyTimelineSummary,
+)
+
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/companies/", response_model=List[CompanyResponse])
+@query_budget(1)
 def get_companies(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get companies with optional name/ticker search
@@ -31,4 +42,75 @@ def get_companies(
         )
 
     companies = query.order_by(Company.ticker).offset(skip).limit(limit).all()
-    return companies
\ No newline at end of file
+    return companies
+
+
+# Tickers can contain a slash (e.g. "BRK/B US"), hence the path converter
+@router.get("/companies/{ticker:path}/ideas", response_model=CompanyTimelineResponse)
+@query_budget(2)
+def get_company_ideas(
+    ticker: str,
+    request: Request,
+    response: Response,
+    performance_period_key: str = Query(
+        DEFAULT_PERFORMANCE_PERIOD, alias="performance_period",
+        description="Period the summary median_return is taken over, e.g. one_year_perf",
+    ),
+    sort_order: str = Query("asc", description="Date order (asc or desc)"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get every idea on a company in date order with its author and performance,
+    plus an aggregate header. Responses carry an ETag and can be cached.
+    """
+    try:
+        company = db.get(Company, ticker)
+        if not company:
+            raise HTTPException(status_code=404, detail=f"Company {ticker} not found")
+
+        # One query over ideas(company_id, date) with the author and
+        # performance rows joined in
+        ordering = Idea.date.desc() if sort_order.lower() == "desc" else Idea.date.asc()
+        ideas = (
+            db.query(Idea)
+            .outerjoin(Idea.user)
+            .outerjoin(Idea.performance)
+            .options(contains_eager(Idea.user), contains_eager(Idea.performance))
+            .filter(Idea.company_id == ticker)
+            .order_by(ordering, Idea.id)
+            .all()
+        )
+
+        period = performance_period(performance_period_key)
+        adjusted = (
+            direction_adjusted_return(getattr(idea.performance, period.column), idea.is_short)
+            for idea in ideas
+            if idea.performance is not None
+        )
+        returns: List[float] = [r for r in adjusted if r is not None]
+        short_count = sum(1 for idea in ideas if idea.is_short)
+        long_count = len(ideas) - short_count
+        dates: List[Any] = [idea.date for idea in ideas if idea.date is not None]
+
+        summary = CompanyTimelineSummary(
+            idea_count=len(ideas),
+            long_count=long_count,
+            short_count=short_count,
+            long_short_ratio=long_count / short_count if short_count else None,
+            performance_period=period.key,
+            ideas_with_returns=len(returns),
+            median_return=median(returns) if returns else None,
+            first_idea_date=min(dates) if dates else None,
+            last_idea_date=max(dates) if dates else None,
+        )
+        payload = CompanyTimelineResponse(
+            company=CompanyResponse.model_validate(company),
+            summary=summary,
+            ideas=[CompanyIdeaResponse.model_validate(idea) for idea in ideas],
+        )
+        return cacheable(request, response, payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_company_ideas: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
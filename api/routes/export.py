@@ -0,0 +1,45 @@
+"""
+Routes for bulk export of the ValueInvestorsClub dataset.
+"""
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from api.database import get_read_db
+from api.export import EXPORT_FORMATS, export_batches, export_names, iter_csv, iter_ndjson
+from api.filters import IdeaFilters
+from api.metrics import TimedRoute, query_budget
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def _stream(db: Session, filters: IdeaFilters, include_text: bool, encode):
+    # The body is sent after the request's own session may have been closed,
+    # so the stream runs in a session of its own on the same engine
+    with Session(bind=db.get_bind()) as session:
+        yield from encode(export_batches(session, filters, include_text), export_names(include_text))
+
+
+@router.get("/export/ideas")
+@query_budget(1)
+def export_ideas(
+    format: str = Query("ndjson", description="Output format: ndjson or csv"),
+    include_text: bool = Query(False, description="Include the catalysts and full description text"),
+    filters: IdeaFilters = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Stream every idea matching the filters, oldest first, with company, author
+    and performance columns. Rows are read with a server-side cursor so the
+    whole dataset can be exported in constant memory.
+    """
+    media_type = EXPORT_FORMATS.get(format)
+    if media_type is None:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    encode = iter_csv if format == "csv" else iter_ndjson
+    return StreamingResponse(
+        _stream(db, filters, include_text, encode),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="ideas.{format}"'},
+    )
@@ -1,15 +1,57 @@
 """
 Health check routes for the ValueInvestorsClub API.
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
 
-router = APIRouter()
+from api.database import get_db
+from api.health import check_readiness
+from api.metrics import TimedRoute, query_budget
+from api.schemas import ReadinessResponse
+
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/health")
+@query_budget(0)
 def health_check():
     """
     Health check endpoint.
     Returns a simple response indicating that the API is healthy.
     """
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@router.get("/health/live")
+@query_budget(0)
+def liveness_check():
+    """
+    Liveness probe: the process is up and serving requests. Doesn't touch
+    the database, so a database outage doesn't get the process restarted.
+    """
+    return {"status": "alive"}
+
+
+@router.get(
+    "/health/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse, "description": "Not ready to receive traffic"}},
+)
+@query_budget(2)
+def readiness_check(response: Response, db: Session = Depends(get_db)):
+    """
+    Readiness probe: the database answers quickly and the connection pool
+    has room. Answers 503 with the reasons otherwise. Results are cached for
+    a couple of seconds.
+    """
+    try:
+        report = check_readiness(db.get_bind().engine)
+        if not report.ready:
+            response.status_code = 503
+        response.headers["Cache-Control"] = "no-store"
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in readiness_check: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,147 +1,68 @@
 """
 Routes for investment ideas in the ValueInvestorsClub API.
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
-from sqlalchemy import func, or_, and_
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from datetime import date
 
-from api.database import get_db
+from api.counts import Total, count_ideas
+from api.database import get_read_db
+from api.facets import ideas_facets
+from api.filters import IdeaFilters
+from api.idea_index import current_index
+from api.idea_query import ideas_statement
+from api.metrics import TimedRoute, query_budget
 from api.models import Idea, Description, Catalysts, Performance
+from api.pricing import HorizonError, PriceStore, compute_idea_returns, get_price_store, parse_horizons
 from api.schemas import (
+    CompanyResponse,
+    UserResponse,
     IdeaResponse,
     IdeaDetailResponse,
     DescriptionResponse,
     CatalystsResponse,
     PerformanceResponse,
+    IdeaReturnsResponse,
+    IdeaFacetsResponse,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/ideas/", response_model=List[IdeaResponse])
+@query_budget(3)
 def get_ideas(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
-    company_id: Optional[str] = None,
-    user_id: Optional[str] = None,
-    is_short: Optional[bool] = None,
-    is_contest_winner: Optional[bool] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    has_performance: Optional[bool] = None,
-    min_performance: Optional[float] = None,
-    max_performance: Optional[float] = None,
-    performance_period: str = Query("one_year_perf", description="Which performance period to filter/sort by"),
+    filters: IdeaFilters = Depends(),
     sort_by: str = Query("date", description="Field to sort by. Can be date or performance"),
     sort_order: str = Query("desc", description="Sort order (asc or desc)"),
-    db: Session = Depends(get_db),
+    include_total: bool = Query(
+        False, description="Return the number of matching ideas in the X-Total-Count header"
+    ),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get investment ideas with optional filtering and sorting by performance.
+    With include_total, X-Total-Count has the number of matching ideas and
+    X-Total-Count-Exact says whether it is exact or, for very large results
+    on Postgres, the planner's estimate.
     """
     try:
-        # Start with a query on Idea
-        query = db.query(Idea)
-        
-        # Determine if we need to join with Performance table
-        needs_performance_join = (
-            has_performance is not None or 
-            min_performance is not None or 
-            max_performance is not None or
-            sort_by == "performance"
-        )
-        
-        # Join with Performance if needed for filtering or sorting
-        if needs_performance_join:
-            query = query.outerjoin(Performance, Idea.id == Performance.idea_id)
-        
-        # Apply basic filters
-        if company_id:
-            query = query.filter(Idea.company_id == company_id)
-        if user_id:
-            query = query.filter(Idea.user_id == user_id)
-        if is_short is not None:
-            query = query.filter(Idea.is_short == is_short)
-        if is_contest_winner is not None:
-            query = query.filter(Idea.is_contest_winner == is_contest_winner)
-        if start_date:
-            query = query.filter(func.date(Idea.date) >= start_date)
-        if end_date:
-            query = query.filter(func.date(Idea.date) <= end_date)
+        # Answered from memory when the in-process index is enabled
+        index = current_index(db)
+        if index is not None:
+            page, matches = index.search(filters, sort_by, sort_order, skip, limit)
+            if include_total:
+                response.headers["X-Total-Count"] = str(matches)
+                response.headers["X-Total-Count-Exact"] = "true"
+            return page
 
-        # Apply performance filters
-        if has_performance is not None:
-            if has_performance:
-                query = query.filter(Performance.idea_id.isnot(None))
-            else:
-                query = query.filter(or_(
-                    Performance.idea_id.is_(None),
-                    and_(
-                        # For filtering out ideas without any performance data where all metrics are null
-                        Performance.oneWeekClosePerf.is_(None),
-                        Performance.twoWeekClosePerf.is_(None),
-                        Performance.oneMonthPerf.is_(None),
-                        Performance.threeMonthPerf.is_(None),
-                        Performance.sixMonthPerf.is_(None),
-                        Performance.oneYearPerf.is_(None),
-                        Performance.twoYearPerf.is_(None),
-                        Performance.threeYearPerf.is_(None),
-                        Performance.fiveYearPerf.is_(None)
-                    )
-                ))
-        
-        # Map performance_period to database column
-        perf_column = None
-        if performance_period == "one_week_perf":
-            perf_column = Performance.oneWeekClosePerf
-        elif performance_period == "two_week_perf":
-            perf_column = Performance.twoWeekClosePerf
-        elif performance_period == "one_month_perf":
-            perf_column = Performance.oneMonthPerf
-        elif performance_period == "three_month_perf":
-            perf_column = Performance.threeMonthPerf
-        elif performance_period == "six_month_perf":
-            perf_column = Performance.sixMonthPerf
-        elif performance_period == "one_year_perf":
-            perf_column = Performance.oneYearPerf
-        elif performance_period == "two_year_perf":
-            perf_column = Performance.twoYearPerf
-        elif performance_period == "three_year_perf":
-            perf_column = Performance.threeYearPerf
-        elif performance_period == "five_year_perf":
-            perf_column = Performance.fiveYearPerf
-        else:
-            perf_column = Performance.oneYearPerf  # Default
-        
-        # Apply min/max performance filters if column is determined
-        if perf_column is not None:
-            if min_performance is not None:
-                query = query.filter(perf_column >= min_performance)
-            if max_performance is not None:
-                query = query.filter(perf_column <= max_performance)
-        
-        # Ensure required fields are not NULL
-        query = query.filter(Idea.id.isnot(None))
-        query = query.filter(Idea.company_id.isnot(None))
-        query = query.filter(Idea.user_id.isnot(None))
-        query = query.filter(Idea.date.isnot(None))
-        
-        # Apply sorting
-        if sort_by == "performance" and perf_column is not None:
-            if sort_order.lower() == "asc":
-                query = query.order_by(perf_column.asc())
-            else:
-                query = query.order_by(perf_column.desc())
-        else:
-            # Default to date sorting
-            if sort_order.lower() == "asc":
-                query = query.order_by(Idea.date.asc())
-            else:
-                query = query.order_by(Idea.date.desc())
-        
-        ideas = query.offset(skip).limit(limit).all()
+        # One statement per filter shape, with the values as parameters
+        statement, params = ideas_statement(filters, sort_by, sort_order, skip, limit)
+        ideas = db.scalars(statement, params).all()
         
         # Create a list of valid response objects
         result = []
@@ -150,6 +71,15 @@ def get_ideas(
             if idea.link is None:
                 idea.link = ""
             result.append(idea)
+
+        if include_total:
+            if len(ideas) < limit and (ideas or skip == 0):
+                # The last page, so the total is known without counting
+                total = Total(skip + len(ideas), exact=True)
+            else:
+                total = count_ideas(db, filters)
+            response.headers["X-Total-Count"] = str(total.count)
+            response.headers["X-Total-Count-Exact"] = "true" if total.exact else "false"
             
         return result
     except Exception as e:
@@ -157,8 +87,80 @@ def get_ideas(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+MAX_RETURNS_BATCH = 100
+
+
+def _compute_returns(
+    idea_ids: List[str], horizons: str, store: Optional[PriceStore], db: Session
+) -> List[IdeaReturnsResponse]:
+    """Shared implementation of the single and batch returns endpoints."""
+    if store is None:
+        raise HTTPException(status_code=503, detail="Price data is not configured")
+    try:
+        parsed = parse_horizons(horizons)
+    except HorizonError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    rows = (
+        db.query(Idea.id, Idea.company_id, Idea.date)
+        .filter(Idea.id.in_(idea_ids))
+        .all()
+    )
+    results = compute_idea_returns(store, rows, parsed)
+    # Keep the order the ids were requested in
+    return [IdeaReturnsResponse.model_validate(results[idea_id]) for idea_id in idea_ids if idea_id in results]
+
+
+@router.get("/ideas/returns", response_model=List[IdeaReturnsResponse])
+@query_budget(1)
+def get_ideas_returns(
+    idea_ids: List[str] = Query(..., description="Idea ids to compute returns for"),
+    horizons: str = Query("1w,1m,1y", description="Comma separated horizons, e.g. 3d,10d,45d,18m"),
+    store: Optional[PriceStore] = Depends(get_price_store),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get returns for several ideas over arbitrary horizons, computed from daily prices.
+    """
+    if len(idea_ids) > MAX_RETURNS_BATCH:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_RETURNS_BATCH} ideas per request")
+    try:
+        return _compute_returns(list(dict.fromkeys(idea_ids)), horizons, store, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_ideas_returns: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/ideas/facets", response_model=IdeaFacetsResponse)
+@query_budget(2)
+def get_ideas_facets(
+    filters: IdeaFilters = Depends(),
+    top: int = Query(10, ge=1, le=100, description="Companies and authors to list"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Count the ideas matching the filters per year, long/short, contest win and
+    performance availability, with the companies and authors that have the
+    most of them.
+    """
+    try:
+        return ideas_facets(db, filters, top)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_ideas_facets: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @router.get("/ideas/{idea_id}", response_model=IdeaDetailResponse)
-def get_idea_detail(idea_id: str, db: Session = Depends(get_db)):
+@query_budget(4)
+def get_idea_detail(
+    idea_id: str,
+    description_preview: bool = Query(False, description="Return only the start of the description"),
+    db: Session = Depends(get_read_db),
+):
     """
     Get complete details for a specific idea including related data.
     """
@@ -184,15 +186,25 @@ def get_idea_detail(idea_id: str, db: Session = Depends(get_db)):
             idea.link = ""
             
         # Query related data
+        # Compressed text is only read if the full description is asked for
         description = db.query(Description).filter(Description.idea_id == idea_id).first()
         catalysts = db.query(Catalysts).filter(Catalysts.idea_id == idea_id).first()
         
-        # Create base response from idea
-        result = IdeaDetailResponse.model_validate(idea)
+        # Create base response from idea. Related rows are attached below, so
+        # validating the idea itself must not lazy load them a second time
+        result = IdeaDetailResponse(
+            **IdeaResponse.model_validate(idea).model_dump(),
+            company=CompanyResponse.model_validate(idea.company) if idea.company else None,
+            user=UserResponse.model_validate(idea.user) if idea.user else None,
+        )
         
         # Manually attach related objects with explicit field mapping
         if description:
-            result.description = DescriptionResponse(description=description.description)
+            if description_preview:
+                preview, truncated = description.preview_text()
+                result.description = DescriptionResponse(description=preview, is_preview=truncated)
+            else:
+                result.description = DescriptionResponse(description=description.full_text())
         if catalysts:
             result.catalysts = CatalystsResponse(catalysts=catalysts.catalysts)
         
@@ -200,47 +212,8 @@ def get_idea_detail(idea_id: str, db: Session = Depends(get_db)):
         try:
             performance = db.query(Performance).filter(Performance.idea_id == idea_id).first()
             if performance:
-                # Create base performance response with standard metrics
-                perf_response = PerformanceResponse(
-                    nextDayOpen=performance.nextDayOpen,
-                    nextDayClose=performance.nextDayClose,
-                    oneWeekClosePerf=performance.oneWeekClosePerf,
-                    twoWeekClosePerf=performance.twoWeekClosePerf,
-                    oneMonthPerf=performance.oneMonthPerf,
-                    threeMonthPerf=performance.threeMonthPerf,
-                    sixMonthPerf=performance.sixMonthPerf,
-                    oneYearPerf=performance.oneYearPerf,
-                    twoYearPerf=performance.twoYearPerf,
-                    threeYearPerf=performance.threeYearPerf,
-                    fiveYearPerf=performance.fiveYearPerf
-                )
-                
-                # Add timeline data
-                timeline_periods = [
-                    ("1W", performance.oneWeekClosePerf),
-                    ("2W", performance.twoWeekClosePerf),
-                    ("1M", performance.oneMonthPerf),
-                    ("3M", performance.threeMonthPerf),
-                    ("6M", performance.sixMonthPerf),
-                    ("1Y", performance.oneYearPerf),
-                    ("2Y", performance.twoYearPerf),
-                    ("3Y", performance.threeYearPerf),
-                    ("5Y", performance.fiveYearPerf)
-                ]
-                
-                # Filter out None values
-                valid_periods = [(label, value) for label, value in timeline_periods if value is not None]
-                
-                if valid_periods:
-                    perf_response.timeline_labels = [period[0] for period in valid_periods]
-                    perf_response.timeline_values = [period[1] for period in valid_periods]
-                    
-                    # Create performance periods dictionary
-                    perf_response.performance_periods = {
-                        period[0]: period[1] for period in valid_periods
-                    }
-                
-                result.performance = perf_response
+                # Built once per distinct row, timeline included, and shared
+                result.performance = PerformanceResponse.model_validate(performance)
         except Exception as e:
             # Log the error but continue
             print(f"Error loading performance data: {e}")
@@ -256,7 +229,8 @@ def get_idea_detail(idea_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/ideas/{idea_id}/performance", response_model=PerformanceResponse)
-def get_idea_performance(idea_id: str, db: Session = Depends(get_db)):
+@query_budget(1)
+def get_idea_performance(idea_id: str, db: Session = Depends(get_read_db)):
     """
     Get performance metrics for a specific idea including timeline data.
     """
@@ -265,48 +239,7 @@ def get_idea_performance(idea_id: str, db: Session = Depends(get_db)):
         if not performance:
             raise HTTPException(status_code=404, detail="Performance data not found")
         
-        # Get the core performance metrics
-        response = PerformanceResponse(
-            nextDayOpen=performance.nextDayOpen,
-            nextDayClose=performance.nextDayClose,
-            oneWeekClosePerf=performance.oneWeekClosePerf,
-            twoWeekClosePerf=performance.twoWeekClosePerf,
-            oneMonthPerf=performance.oneMonthPerf,
-            threeMonthPerf=performance.threeMonthPerf,
-            sixMonthPerf=performance.sixMonthPerf,
-            oneYearPerf=performance.oneYearPerf,
-            twoYearPerf=performance.twoYearPerf,
-            threeYearPerf=performance.threeYearPerf,
-            fiveYearPerf=performance.fiveYearPerf
-        )
-        
-        # Create timeline data from the performance metrics
-        # Define the timeline periods and labels
-        timeline_periods = [
-            ("1W", performance.oneWeekClosePerf),
-            ("2W", performance.twoWeekClosePerf),
-            ("1M", performance.oneMonthPerf),
-            ("3M", performance.threeMonthPerf),
-            ("6M", performance.sixMonthPerf),
-            ("1Y", performance.oneYearPerf),
-            ("2Y", performance.twoYearPerf),
-            ("3Y", performance.threeYearPerf),
-            ("5Y", performance.fiveYearPerf)
-        ]
-        
-        # Filter out None values and create the timeline data
-        valid_periods = [(label, value) for label, value in timeline_periods if value is not None]
-        
-        if valid_periods:
-            response.timeline_labels = [period[0] for period in valid_periods]
-            response.timeline_values = [period[1] for period in valid_periods]
-            
-            # Create performance periods dictionary
-            response.performance_periods = {
-                period[0]: period[1] for period in valid_periods
-            }
-        
-        return response
+        return PerformanceResponse.model_validate(performance)
     except HTTPException:
         # Re-raise HTTP exceptions without modification
         raise
@@ -315,8 +248,32 @@ def get_idea_performance(idea_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/ideas/{idea_id}/returns", response_model=IdeaReturnsResponse)
+@query_budget(1)
+def get_idea_returns(
+    idea_id: str,
+    horizons: str = Query("1w,1m,1y", description="Comma separated horizons, e.g. 3d,10d,45d,18m"),
+    store: Optional[PriceStore] = Depends(get_price_store),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get returns for an idea over arbitrary horizons, computed from daily prices.
+    """
+    try:
+        results = _compute_returns([idea_id], horizons, store, db)
+        if not results:
+            raise HTTPException(status_code=404, detail="Idea not found")
+        return results[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_idea_returns: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @router.get("/ideas/{idea_id}/description", response_model=DescriptionResponse)
-def get_idea_description(idea_id: str, db: Session = Depends(get_db)):
+@query_budget(1)
+def get_idea_description(idea_id: str, db: Session = Depends(get_read_db)):
     """
     Get the full description text for an idea.
     """
@@ -326,7 +283,7 @@ def get_idea_description(idea_id: str, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Description not found")
         
         # Create a response that explicitly maps the fields
-        response = DescriptionResponse(description=description.description)
+        response = DescriptionResponse(description=description.full_text())
         return response
     except HTTPException:
         # Re-raise HTTP exceptions without modification
@@ -336,8 +293,28 @@ def get_idea_description(idea_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/ideas/{idea_id}/description/stream", response_class=StreamingResponse)
+@query_budget(1)
+def stream_idea_description(idea_id: str, db: Session = Depends(get_read_db)):
+    """
+    Stream the full description as plain text, decompressing it a chunk at a
+    time when it is stored compressed.
+    """
+    try:
+        description = db.query(Description).filter(Description.idea_id == idea_id).first()
+        if not description:
+            raise HTTPException(status_code=404, detail="Description not found")
+        return StreamingResponse(description.iter_text(), media_type="text/plain; charset=utf-8")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in stream_idea_description: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @router.get("/ideas/{idea_id}/catalysts", response_model=CatalystsResponse)
-def get_idea_catalysts(idea_id: str, db: Session = Depends(get_db)):
+@query_budget(1)
+def get_idea_catalysts(idea_id: str, db: Session = Depends(get_read_db)):
     """
     Get the catalysts text for an idea.
     """
@@ -359,7 +336,8 @@ def get_idea_catalysts(idea_id: str, db: Session = Depends(get_db)):
 
 # Debug endpoint for idea detail
 @router.get("/debug/ideas/{idea_id}")
-def debug_idea_detail(idea_id: str, db: Session = Depends(get_db)):
+@query_budget(1)
+def debug_idea_detail(idea_id: str, db: Session = Depends(get_read_db)):
     """
     Simple debug endpoint to get an idea by ID.
     """
@@ -0,0 +1,24 @@
+"""
+Prometheus metrics for the ValueInvestorsClub API.
+"""
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from api.database import get_db
+from api.metrics import TimedRoute, query_budget, render_metrics
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+@query_budget(0)
+def metrics(db: Session = Depends(get_db)):
+    """
+    Request, query and connection pool metrics of this process in the
+    Prometheus text format.
+    """
+    return PlainTextResponse(
+        render_metrics(db.get_bind().engine),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,23 +1,50 @@
 """
 Routes for users in the ValueInvestorsClub API.
 """
-from fastapi import APIRouter, Query, Depends
-from sqlalchemy.orm import Session
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from sqlalchemy.orm import Session, contains_eager
 from typing import List, Optional
 
-from api.database import get_db
-from api.models import User
-from api.schemas import UserResponse
+from api.caching import cacheable
+from api.database import get_read_db
+from api.metrics import TimedRoute, query_budget
+from api.models import AuthorStats, Idea, User
+from api.pagination import decode_cursor, encode_cursor, keyset_filter
+from api.performance import PERFORMANCE_PERIODS
+from api.schemas import (
+    AuthorStatsResponse,
+    HorizonStatsResponse,
+    LeaderboardResponse,
+    UserIdeaResponse,
+    UserProfileResponse,
+    UserResponse,
+)
+
+router = APIRouter(route_class=TimedRoute)
 
-router = APIRouter()
+LEADERBOARD_SORT_FIELDS = {
+    "idea_count": AuthorStats.idea_count,
+    "long_count": AuthorStats.long_count,
+    "short_count": AuthorStats.short_count,
+    "contest_wins": AuthorStats.contest_wins,
+    "ideas_with_returns": AuthorStats.ideas_with_returns,
+    "hit_rate": AuthorStats.hit_rate,
+    "mean_return": AuthorStats.mean_return,
+    "median_return": AuthorStats.median_return,
+    "mean_excess_return": AuthorStats.mean_excess_return,
+    "median_excess_return": AuthorStats.median_excess_return,
+}
 
 
 @router.get("/users/", response_model=List[UserResponse])
+@query_budget(1)
 def get_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get users with optional username search
@@ -29,4 +56,150 @@ def get_users(
         query = query.filter(User.username.ilike(search))
 
     users = query.order_by(User.username).offset(skip).limit(limit).all()
-    return users
\ No newline at end of file
+    return users
+
+
+@router.get("/users/leaderboard", response_model=LeaderboardResponse)
+@query_budget(1)
+def get_leaderboard(
+    horizon: str = Query("1Y", description="Performance horizon: 1W, 2W, 1M, 3M, 6M, 1Y, 2Y, 3Y or 5Y"),
+    sort_by: str = Query("median_excess_return", description="Metric to rank authors by"),
+    sort_order: str = Query("desc", description="Sort order (asc or desc)"),
+    min_ideas: int = Query(1, ge=0, description="Minimum ideas with a return over the horizon"),
+    min_hit_rate: Optional[float] = Query(None, ge=0, le=1),
+    min_contest_wins: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Rank authors by their precomputed track record, paged with a keyset cursor.
+    """
+    if horizon not in {p.label for p in PERFORMANCE_PERIODS}:
+        raise HTTPException(status_code=422, detail=f"Unknown horizon {horizon!r}")
+    sort_column = LEADERBOARD_SORT_FIELDS.get(sort_by)
+    if sort_column is None:
+        raise HTTPException(
+            status_code=422, detail=f"sort_by must be one of {', '.join(LEADERBOARD_SORT_FIELDS)}"
+        )
+    descending = sort_order.lower() != "asc"
+
+    query = (
+        db.query(AuthorStats, User.username)
+        .join(User, User.user_link == AuthorStats.user_link)
+        .filter(AuthorStats.horizon == horizon)
+        .filter(AuthorStats.ideas_with_returns >= min_ideas)
+        # Authors without a value for the metric can't be ranked on it
+        .filter(sort_column.isnot(None))
+    )
+    if min_hit_rate is not None:
+        query = query.filter(AuthorStats.hit_rate >= min_hit_rate)
+    if min_contest_wins is not None:
+        query = query.filter(AuthorStats.contest_wins >= min_contest_wins)
+
+    after = decode_cursor(cursor, 2)
+    if after is not None:
+        query = query.filter(keyset_filter(sort_column, AuthorStats.user_link, after, descending))
+
+    query = query.order_by(
+        sort_column.desc() if descending else sort_column.asc(),
+        AuthorStats.user_link.asc(),
+    )
+    rows = query.limit(limit + 1).all()
+
+    items = [
+        AuthorStatsResponse(username=username, **_stats_fields(stats))
+        for stats, username in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1][0]
+        next_cursor = encode_cursor(getattr(last, sort_by), last.user_link)
+    return LeaderboardResponse(items=items, next_cursor=next_cursor)
+
+
+def _stats_fields(stats: AuthorStats) -> dict:
+    """Columns of an author_stats row that AuthorStatsResponse exposes."""
+    return {
+        name: getattr(stats, name)
+        for name in AuthorStatsResponse.model_fields
+        if name != "username"
+    }
+
+
+# User links are full URLs, hence the path converter. Declared after the
+# static /users/ routes so it doesn't swallow them.
+@router.get("/users/{user_link:path}", response_model=UserProfileResponse)
+@query_budget(3)
+def get_user_profile(
+    user_link: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100, description="Ideas per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get a user's profile: aggregates from the author_stats summary table and
+    a keyset-paged list of their ideas, newest first, with performance
+    embedded. Usernames are accepted in place of the user link.
+    """
+    try:
+        user = db.get(User, user_link) or db.query(User).filter(User.username == user_link).first()
+        if not user:
+            raise HTTPException(status_code=404, detail=f"User {user_link} not found")
+
+        stats = (
+            db.query(AuthorStats)
+            .filter(AuthorStats.user_link == user.user_link)
+            .all()
+        )
+        by_horizon = {row.horizon: row for row in stats}
+        summary = stats[0] if stats else None
+
+        query = (
+            db.query(Idea)
+            .outerjoin(Idea.company)
+            .outerjoin(Idea.performance)
+            .options(contains_eager(Idea.company), contains_eager(Idea.performance))
+            # Undated ideas can't be keyset paged by date, and /ideas/ skips them too
+            .filter(Idea.user_id == user.user_link, Idea.date.isnot(None))
+        )
+        after = decode_cursor(cursor, 2)
+        if after is not None:
+            try:
+                after[0] = datetime.fromisoformat(after[0])
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.filter(keyset_filter(Idea.date, Idea.id, after, descending=True))
+        ideas = query.order_by(Idea.date.desc(), Idea.id.asc()).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(ideas) > limit:
+            last = ideas[limit - 1]
+            next_cursor = encode_cursor(last.date, last.id)
+
+        payload = UserProfileResponse(
+            username=user.username,
+            user_link=user.user_link,
+            idea_count=summary.idea_count if summary else None,
+            long_count=summary.long_count if summary else None,
+            short_count=summary.short_count if summary else None,
+            contest_wins=summary.contest_wins if summary else None,
+            first_post=summary.first_post if summary else None,
+            last_post=summary.last_post if summary else None,
+            stats_updated_at=summary.updated_at if summary else None,
+            returns=[
+                HorizonStatsResponse.model_validate(by_horizon[p.label])
+                for p in PERFORMANCE_PERIODS
+                if p.label in by_horizon
+            ],
+            ideas=[UserIdeaResponse.model_validate(idea) for idea in ideas[:limit]],
+            next_cursor=next_cursor,
+        )
+        return cacheable(request, response, payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_user_profile: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,18 +1,146 @@
 #!/usr/bin/env python3
 """
-Custom server script to run the API on a specific port
+Production launcher for the API: several uvicorn worker processes sized to
+the container.
+
+- Workers: WEB_CONCURRENCY if set, else WORKERS_PER_CPU per CPU of the
+  container's CPU quota, capped so that WORKER_MEMORY_MB per worker fits in
+  its memory limit.
+- Connection pools: every worker gets an equal share of DB_CONNECTION_BUDGET,
+  the connections all workers together may open to Postgres (keep it below
+  max_connections, leaving room for jobs and psql). Half of a share is the
+  pool, the rest overflow. Pools are created in each worker after it
+  starts, see api/database/connection.py. Workers are capped at half the
+  budget so that every one gets at least two connections without the total
+  going over it.
+- Recycling: a worker is replaced after MAX_REQUESTS requests (plus up to
+  MAX_REQUESTS_JITTER on uvicorn versions that support it, so they don't
+  all restart at once), finishing its requests in flight first. SIGHUP
+  replaces all of them the same way.
+
+Usage:
+    python -m api.run_server
+    python -m api.run_server --workers 4 --port 8080
+    python -m api.run_server --print-config
 """
-import uvicorn
-import sys
+import inspect
+import math
 import os
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
 
 # Add the project root to the path to ensure imports work
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import the application from main.py
-from api.main import app
+WORKERS_PER_CPU = float(os.getenv("WORKERS_PER_CPU", "2"))
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "256"))
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "60"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "20000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "2000"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+CGROUP = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return handle.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit(cgroup: str = CGROUP) -> float:
+    """CPUs this process may use: the cgroup quota, else the CPUs it may run on."""
+    quota = _read(os.path.join(cgroup, "cpu.max"))
+    if quota is not None:
+        limit, _, period = quota.partition(" ")
+        if limit != "max":
+            return int(limit) / int(period)
+    else:
+        # cgroup v1
+        v1_limit = _read(os.path.join(cgroup, "cpu", "cpu.cfs_quota_us"))
+        v1_period = _read(os.path.join(cgroup, "cpu", "cpu.cfs_period_us"))
+        if v1_limit and v1_period and int(v1_limit) > 0:
+            return int(v1_limit) / int(v1_period)
+    if hasattr(os, "sched_getaffinity"):
+        return float(len(os.sched_getaffinity(0)))
+    return float(os.cpu_count() or 1)
+
+
+def memory_limit(cgroup: str = CGROUP) -> Optional[int]:
+    """The cgroup memory limit in bytes, or None without one."""
+    limit = _read(os.path.join(cgroup, "memory.max"))
+    if limit is None:
+        limit = _read(os.path.join(cgroup, "memory", "memory.limit_in_bytes"))
+    if not limit or limit == "max":
+        return None
+    # cgroup v1 reports "no limit" as a huge number
+    return int(limit) if int(limit) < 1 << 60 else None
+
+
+@dataclass
+class ServerConfig:
+    workers: int
+    pool_size: int
+    max_overflow: int
+
+
+def server_config(cpus: float, memory: Optional[int], workers: Optional[int] = None,
+                  worker_memory_mb: int = WORKER_MEMORY_MB,
+                  connection_budget: int = DB_CONNECTION_BUDGET) -> ServerConfig:
+    """Worker count and per worker pool size for the given limits."""
+    if workers is None:
+        workers = max(1, math.ceil(cpus * WORKERS_PER_CPU))
+        if memory is not None:
+            workers = min(workers, max(1, memory // (worker_memory_mb * 1024 * 1024)))
+    # Two connections each at least, within the budget
+    workers = min(workers, max(1, connection_budget // 2))
+    share = max(2, connection_budget // workers)
+    pool_size = math.ceil(share / 2)
+    return ServerConfig(workers, pool_size, share - pool_size)
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the API with workers sized to the container")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"), help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or None,
+                        help="Worker processes (default: from the CPU and memory limits)")
+    parser.add_argument("--print-config", action="store_true", help="Print the computed settings and exit")
+    args = parser.parse_args()
+
+    config = server_config(cpu_limit(), memory_limit(), args.workers)
+    if args.workers and args.workers > config.workers:
+        print(f"Capped {args.workers} workers to {config.workers}, "
+              f"two connections each within DB_CONNECTION_BUDGET={DB_CONNECTION_BUDGET}")
+    print(f"{config.workers} workers on {args.host}:{args.port}, "
+          f"each with a pool of {config.pool_size}+{config.max_overflow} connections")
+    if args.print_config:
+        return 0
+
+    # Inherited by the workers, which create their engines with them
+    os.environ["DB_POOL_SIZE"] = str(config.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(config.max_overflow)
+    import uvicorn
+    options: Dict[str, Any] = {}
+    # Not in uvicorn before 0.41
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.run).parameters:
+        options["limit_max_requests_jitter"] = MAX_REQUESTS_JITTER
+    uvicorn.run(
+        "api.main:app",
+        host=args.host,
+        port=args.port,
+        workers=config.workers,
+        limit_max_requests=MAX_REQUESTS or None,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        **options,
+    )
+    return 0
+
 
 if __name__ == "__main__":
-    PORT = 8000  # Use standard port for frontend compatibility
-    print(f"Starting server on port {PORT}")
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
\ No newline at end of file
+    sys.exit(main())
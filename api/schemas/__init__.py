@@ -10,6 +10,22 @@ from api.schemas.schemas import (
     UserResponse,
     IdeaResponse,
     IdeaDetailResponse,
+    IdeaReturnsResponse,
+    AuthorStatsResponse,
+    LeaderboardResponse,
+    CompanyIdeaResponse,
+    CompanyTimelineSummary,
+    CompanyTimelineResponse,
+    UserIdeaResponse,
+    HorizonStatsResponse,
+    UserProfileResponse,
+    PoolStatusResponse,
+    ReadinessResponse,
+    YearFacet,
+    FacetValue,
+    IdeaFacetsResponse,
+    ChangeResponse,
+    ChangesResponse,
 )
 
 __all__ = [
@@ -20,4 +36,20 @@ __all__ = [
     "UserResponse",
     "IdeaResponse",
     "IdeaDetailResponse",
+    "IdeaReturnsResponse",
+    "AuthorStatsResponse",
+    "LeaderboardResponse",
+    "CompanyIdeaResponse",
+    "CompanyTimelineSummary",
+    "CompanyTimelineResponse",
+    "UserIdeaResponse",
+    "HorizonStatsResponse",
+    "UserProfileResponse",
+    "PoolStatusResponse",
+    "ReadinessResponse",
+    "YearFacet",
+    "FacetValue",
+    "IdeaFacetsResponse",
+    "ChangeResponse",
+    "ChangesResponse",
 ]
\ No newline at end of file
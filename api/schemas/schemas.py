@@ -1,9 +1,17 @@
 """
 Pydantic models for request/response schemas for the ValueInvestorsClub API.
 """
-from typing import List, Optional, Dict
-from datetime import datetime
-from pydantic import BaseModel
+from functools import lru_cache
+from typing import Any, List, Optional, Dict, Tuple
+from datetime import date, datetime
+from pydantic import BaseModel, model_validator
+
+from api.performance import (
+    PERFORMANCE_CACHE_SIZE,
+    PERFORMANCE_PERIODS,
+    performance_timeline,
+    performance_values,
+)
 
 
 class PerformanceResponse(BaseModel):
@@ -32,12 +40,37 @@ class PerformanceResponse(BaseModel):
     # Useful for comparing across different time periods
     performance_periods: Optional[Dict[str, float]] = None
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def _from_row(cls, data: Any, handler):
+        # Performance rows are turned into a response, timeline included, once
+        # per distinct set of values and the instance is shared from then on
+        if data is None or isinstance(data, (dict, BaseModel)):
+            return handler(data)
+        return _performance_response(performance_values(data))
+
     model_config = {"from_attributes": True}
 
 
+@lru_cache(maxsize=PERFORMANCE_CACHE_SIZE)
+def _performance_response(values: Tuple[Optional[float], ...]) -> PerformanceResponse:
+    fields: Dict[str, Any] = {"nextDayOpen": values[0], "nextDayClose": values[1]}
+    fields.update({p.column: value for p, value in zip(PERFORMANCE_PERIODS, values[2:])})
+    timeline = performance_timeline(values)
+    if timeline is not None:
+        fields.update(
+            timeline_labels=timeline.labels,
+            timeline_values=timeline.values,
+            performance_periods=timeline.periods,
+        )
+    return PerformanceResponse.model_construct(**fields)
+
+
 class DescriptionResponse(BaseModel):
     """Description of an investment idea."""
     description: str
+    # True when description is only the start of the text
+    is_preview: bool = False
 
     model_config = {"from_attributes": True}
 
@@ -86,4 +119,187 @@ class IdeaDetailResponse(IdeaResponse):
     catalysts: Optional[CatalystsResponse] = None
     performance: Optional[PerformanceResponse] = None
 
-    model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+
+class IdeaReturnsResponse(BaseModel):
+    """Returns for an idea over requested horizons, computed from daily prices."""
+    idea_id: str
+    ticker: str
+    price_symbol: Optional[str] = None
+    base_date: Optional[date] = None
+    base_close: Optional[float] = None
+    # Horizon label (e.g. "3d", "18m") to close / base close, None when not covered
+    returns: Dict[str, Optional[float]] = {}
+    unmatched_reason: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+class AuthorStatsResponse(BaseModel):
+    """Precomputed track record of an author over one performance horizon."""
+    user_link: str
+    username: str
+    horizon: str
+    idea_count: int
+    long_count: int
+    short_count: int
+    contest_wins: int
+    ideas_with_returns: int
+    hit_rate: Optional[float] = None
+    mean_return: Optional[float] = None
+    median_return: Optional[float] = None
+    mean_excess_return: Optional[float] = None
+    median_excess_return: Optional[float] = None
+
+    model_config = {"from_attributes": True}
+
+
+class LeaderboardResponse(BaseModel):
+    """A page of the author leaderboard."""
+    items: List[AuthorStatsResponse]
+    # Pass as `cursor` to fetch the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
+class CompanyIdeaResponse(IdeaResponse):
+    """An idea on a company's timeline with its author and outcome."""
+    user: Optional[UserResponse] = None
+    performance: Optional[PerformanceResponse] = None
+
+    model_config = {"from_attributes": True}
+
+
+class CompanyTimelineSummary(BaseModel):
+    """Aggregates over every idea posted on a company."""
+    idea_count: int
+    long_count: int
+    short_count: int
+    # long_count / short_count, None when there are no shorts
+    long_short_ratio: Optional[float] = None
+    # Performance period the median is taken over, e.g. "one_year_perf"
+    performance_period: str
+    ideas_with_returns: int
+    # Median direction adjusted simple return, e.g. 0.12 for +12%
+    median_return: Optional[float] = None
+    first_idea_date: Optional[datetime] = None
+    last_idea_date: Optional[datetime] = None
+
+
+class CompanyTimelineResponse(BaseModel):
+    """A company's ideas in date order with an aggregate header."""
+    company: CompanyResponse
+    summary: CompanyTimelineSummary
+    ideas: List[CompanyIdeaResponse]
+
+
+class UserIdeaResponse(IdeaResponse):
+    """An idea in a user's profile with its company and outcome."""
+    company: Optional[CompanyResponse] = None
+    performance: Optional[PerformanceResponse] = None
+
+    model_config = {"from_attributes": True}
+
+
+class HorizonStatsResponse(BaseModel):
+    """An author's direction adjusted returns over one performance horizon."""
+    horizon: str
+    ideas_with_returns: int
+    hit_rate: Optional[float] = None
+    mean_return: Optional[float] = None
+    median_return: Optional[float] = None
+    mean_excess_return: Optional[float] = None
+    median_excess_return: Optional[float] = None
+
+    model_config = {"from_attributes": True}
+
+
+class UserProfileResponse(BaseModel):
+    """A user's track record and a page of their ideas, newest first."""
+    username: str
+    user_link: str
+    # Aggregates come from author_stats and are None until it has been refreshed
+    idea_count: Optional[int] = None
+    long_count: Optional[int] = None
+    short_count: Optional[int] = None
+    contest_wins: Optional[int] = None
+    first_post: Optional[datetime] = None
+    last_post: Optional[datetime] = None
+    stats_updated_at: Optional[datetime] = None
+    returns: List[HorizonStatsResponse] = []
+    ideas: List[UserIdeaResponse] = []
+    # Pass as `cursor` to fetch the next page of ideas, None on the last page
+    next_cursor: Optional[str] = None
+
+
+class PoolStatusResponse(BaseModel):
+    """Connection pool usage. Counts are None for pools that don't keep them."""
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    # Checkouts since the previous readiness check and their average wait
+    checkouts: int = 0
+    average_wait_seconds: Optional[float] = None
+
+
+class ReadinessResponse(BaseModel):
+    """Whether this process should receive traffic, and why not."""
+    ready: bool
+    reasons: List[str] = []
+    checked_at: datetime
+    database_latency_seconds: Optional[float] = None
+    pool: PoolStatusResponse
+    # The "all" data version and how long ago it was last bumped
+    data_version: Optional[str] = None
+    data_age_seconds: Optional[float] = None
+
+
+class YearFacet(BaseModel):
+    """Ideas posted in a calendar year."""
+    year: int
+    count: int
+
+
+class FacetValue(BaseModel):
+    """Ideas on a company or by an author: value is the ticker or user link."""
+    value: str
+    label: Optional[str] = None
+    count: int
+
+
+class IdeaFacetsResponse(BaseModel):
+    """Counts of the ideas matching a filter set, broken down per facet."""
+    total: int
+    years: List[YearFacet] = []
+    long_count: int = 0
+    short_count: int = 0
+    contest_winner_count: int = 0
+    with_performance_count: int = 0
+    without_performance_count: int = 0
+    # Most ideas first
+    top_companies: List[FacetValue] = []
+    top_users: List[FacetValue] = []
+
+
+class ChangeResponse(BaseModel):
+    """An idea touched by a data change; idea_id None means every idea."""
+    id: int
+    version: int
+    data_set: str
+    idea_id: Optional[str] = None
+    source: str
+    changed_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class ChangesResponse(BaseModel):
+    """A page of the change log and the current data versions."""
+    # The "all" version and the version of each data set
+    version: int
+    versions: Dict[str, int] = {}
+    changes: List[ChangeResponse] = []
+    # Pass as `since` for the next page or poll
+    next_since: int
+    has_more: bool = False
@@ -76,7 +76,7 @@ def test_get_idea_detail(idea_id):
                         "user_link": idea.user.user_link if idea.user else None
                     } if idea.user else None,
                     "description": {
-                        "description": description.description
+                        "description": description.full_text()
                     } if description else None,
                     "catalysts": {
                         "catalysts": catalysts.catalysts
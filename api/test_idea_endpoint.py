@@ -144,7 +144,7 @@ def get_idea_detail(idea_id):
                 print(traceback.format_exc())
                 
             try:
-                description_model = DescriptionResponse.model_validate(description) if description else None
+                description_model = DescriptionResponse(description=description.full_text()) if description else None
                 print(f"Description model validation successful: {description_model}")
             except Exception as e:
                 print(f"Error validating description model: {e}")
@@ -4,8 +4,10 @@ Fixtures for API integration tests.
 import pytest
 import os
 import sys
+from contextlib import contextmanager
+from typing import Any, List, Tuple
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -15,12 +17,21 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../.
 # Import models and app
 from ValueInvestorsClub.ValueInvestorsClub.models.Base import Base
 from api.main import app 
-from api.database import get_db
+from api.counts import clear_count_cache
+from api.database import get_db, get_read_db
+from api.facets import clear_facets_cache
+from api.idea_index import clear_idea_index
+
+# Tests use in-memory SQLite unless TEST_DATABASE_URL points at a Postgres
+# test database (see setup_test_db.py), which also checks EXPLAIN plans
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
 
-# Use in-memory SQLite for tests
 @pytest.fixture(scope="session")
 def engine():
-    """Create engine for in-memory SQLite test database."""
+    """Create engine for the test database."""
+    if TEST_DATABASE_URL:
+        return create_engine(TEST_DATABASE_URL)
     return create_engine(
         "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
@@ -43,6 +54,9 @@ def db_session(engine):
     
     # Clean up after test
     Base.metadata.drop_all(engine)
+    clear_count_cache()
+    clear_facets_cache()
+    clear_idea_index()
 
 @pytest.fixture(scope="function")
 def client(db_session):
@@ -55,10 +69,81 @@ def client(db_session):
     
     # Override the dependency
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     # Create test client
     with TestClient(app) as client:
         yield client
     
     # Clean up
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+
+class QueryLog:
+    """SQL statements, with their parameters, run on the test engine."""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, Any]] = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def selects(self) -> List[Tuple[str, Any]]:
+        return [(sql, params) for sql, params in self.statements if sql.lstrip().upper().startswith("SELECT")]
+
+    def __str__(self):
+        return "\n".join(f"{i + 1}. {sql}" for i, (sql, _) in enumerate(self.statements))
+
+
+@pytest.fixture
+def count_queries(engine):
+    """
+    Context manager recording every statement run on the engine inside it:
+
+        with count_queries() as queries:
+            client.get("/ideas/")
+        assert len(queries) <= 2, str(queries)
+    """
+    @contextmanager
+    def recording():
+        log = QueryLog()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            log.statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield log
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return recording
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@pytest.fixture
+def explain(engine):
+    """
+    Tables a statement reads with a sequential scan on Postgres, with the
+    planner told to avoid them: whatever is left has no usable index. Skips
+    the test on SQLite.
+    """
+    if engine.dialect.name != "postgresql":
+        pytest.skip("EXPLAIN plans are only checked on Postgres (set TEST_DATABASE_URL)")
+
+    def seq_scans(statement: str, parameters: Any = None) -> List[str]:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters or {}).scalar()
+            connection.rollback()
+        return [
+            node["Relation Name"] for node in _plan_nodes(plan[0]["Plan"])
+            if node["Node Type"] == "Seq Scan"
+        ]
+
+    return seq_scans
@@ -0,0 +1,91 @@
+"""
+Tests for the vectorized backtesting engine.
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd  # type: ignore  # Missing stubs for pandas
+import pytest
+
+from api.backtest import BacktestData, Strategy, expand_grid, run_grid, simulate
+from api.pricing import PriceSeries
+
+
+@pytest.fixture
+def data():
+    calendar = np.array(
+        ["2020-01-06", "2020-01-07", "2020-01-08", "2020-01-09", "2020-01-10"], dtype="datetime64[D]"
+    )
+    series = [
+        PriceSeries(calendar, np.array([100.0, 100.0, 110.0, 121.0, 121.0])),
+        # A missing print on the 8th is forward filled
+        PriceSeries(calendar[[0, 1, 3, 4]], np.array([50.0, 50.0, 25.0, 25.0])),
+    ]
+    ideas = pd.DataFrame([
+        {"id": "long", "company_id": "AAA US", "user_id": "u1", "date": datetime(2020, 1, 6, 20),
+         "is_short": False, "is_contest_winner": True},
+        {"id": "short", "company_id": "BBB US", "user_id": "u2", "date": datetime(2020, 1, 7, 20),
+         "is_short": True, "is_contest_winner": False},
+        {"id": "unpriced", "company_id": "CCC LN", "user_id": "u1", "date": datetime(2020, 1, 7, 20),
+         "is_short": False, "is_contest_winner": False},
+    ])
+    return BacktestData.from_series(ideas, series, np.array([0, 1, -1]))
+
+
+def test_strategy_validation():
+    with pytest.raises(ValueError):
+        Strategy(entry_delay=0)
+    with pytest.raises(ValueError):
+        Strategy(sizing="kelly")
+    assert Strategy(user_ids=["a"], start_date="2020-01-01").user_ids == ("a",)
+    assert Strategy(start_date="2020-01-01").start_date == date(2020, 1, 1)
+
+
+def test_long_only(data):
+    result = simulate(data, Strategy(is_short=False, holding_period=2))
+    assert result.trades == 1
+    assert result.total_return == pytest.approx(0.21)
+    assert result.max_drawdown == 0.0
+    assert result.start == np.datetime64("2020-01-07")
+
+
+def test_equal_weight_long_short(data):
+    result = simulate(data, Strategy(is_short=None, holding_period=2))
+    assert result.trades == 2
+    # +10% alone, then half in A (+10%) and half short B (-50%), then B flat
+    assert result.equity == pytest.approx([1.0, 1.1, 1.43, 1.43])
+    assert result.exposure == 0.75
+    assert result.turnover > 0
+
+
+def test_fixed_sizing_and_filters(data):
+    result = simulate(data, Strategy(is_short=None, user_ids=("u2",), holding_period=1,
+                                     sizing="fixed", position_size=0.5))
+    assert result.trades == 1
+    assert result.total_return == pytest.approx(0.25)
+    assert simulate(data, Strategy(is_short=None, is_contest_winner=True, holding_period=1)).trades == 1
+    assert simulate(data, Strategy(is_short=None, end_date=date(2020, 1, 6))).trades == 1
+    # Entering after the last trading day leaves nothing to trade
+    assert simulate(data, Strategy(is_short=None, entry_delay=10)).trades == 0
+
+
+def test_drawdown(data):
+    # Going long B loses half in one day
+    result = simulate(data, Strategy(is_short=None, follow_direction=False, user_ids=("u2",)))
+    assert result.max_drawdown == pytest.approx(-0.5)
+    assert result.cagr < 0
+
+
+def test_grid_in_parallel_matches_serial(data):
+    strategies = list(expand_grid(Strategy(is_short=None), {
+        "entry_delay": [1, 2],
+        "holding_period": [1, 2, 3],
+    }))
+    assert len(strategies) == 6
+    assert strategies[0].name == "entry_delay=1,holding_period=1"
+
+    serial = run_grid(data, strategies, processes=1)
+    parallel = run_grid(data, strategies, processes=2, chunk_size=2)
+    assert list(parallel["name"]) == list(serial["name"])
+    assert parallel["cagr"].to_numpy() == pytest.approx(serial["cagr"].to_numpy())
+    assert serial["cagr"].is_monotonic_decreasing
@@ -0,0 +1,80 @@
+"""
+Tests for the synthetic data generator and the load benchmark.
+"""
+import subprocess
+import sys
+from collections import Counter
+
+from api.bench import importtime, load
+from api.bench.data import seed
+from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+
+
+def test_seed_is_skewed(db_session):
+    seed(db_session, ideas=500, companies=50, users=50, description_words=100, batch_size=200)
+    assert db_session.query(Idea).count() == 500
+
+    per_user = Counter(user for (user,) in db_session.query(Idea.user_id))
+    # The most prolific author writes far more than an even share of 10
+    assert per_user["https://valueinvestorsclub.com/users/author0"] > 50
+    lengths = [len(text.split()) for (text,) in db_session.query(Description.description)]
+    # Whole sentences of 8 to 24 words, adding up to about 50 to 100 words
+    assert 20 <= min(lengths) and max(lengths) <= 140
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert load.percentile(values, 0.5) == 50
+    assert load.percentile(values, 0.99) == 99
+    assert load.percentile([3.0], 0.9) == 3.0
+    assert load.percentile([], 0.5) is None
+
+
+def test_load_run(client, db_session):
+    seed(db_session, ideas=100, companies=10, users=10, description_words=20)
+
+    report = load.run(lambda: client, duration=None, requests=60, workers=1, deep_offset=80)
+    assert set(report["scenarios"]) == set(load.MIX)
+    assert report["total"]["requests"] == 60
+    assert report["total"]["errors"] == 0
+    assert report["total"]["p50_ms"] <= report["total"]["p99_ms"]
+    assert "total" in load.format_table(report, baseline=report)
+
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2500 |       3100 |     sqlalchemy.sql
+import time:       600 |       3700 |   sqlalchemy
+import time:      1000 |       4700 | api.main
+"""
+
+
+def test_parse_importtime():
+    assert importtime.parse_importtime(IMPORTTIME) == [
+        ("_io", 120, 120), ("sqlalchemy.sql", 2500, 3100), ("sqlalchemy", 600, 3700), ("api.main", 1000, 4700),
+    ]
+    report = {"module": "api.main", "total_ms": 5.0, "modules": {"api.main": 5.0, "numpy": 1.0}}
+    baseline = {"module": "api.main", "total_ms": 4.0, "modules": {"api.main": 4.0}}
+    assert importtime.regression(report, baseline) == 25
+    assert "Imported now but not in the baseline: numpy" in importtime.format_table(report, baseline)
+
+
+def imported_modules(statement):
+    script = f"import sys; {statement}; print('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=importtime.ROOT, capture_output=True, text=True,
+                            check=True)
+    return set(result.stdout.split())
+
+
+def test_lazy_imports():
+    # Importing a job or api.models doesn't import the app or every model
+    modules = imported_modules("import api.models")
+    assert "api.main" not in modules
+    assert "ValueInvestorsClub.ValueInvestorsClub.models.Idea" not in modules
+    # The first model used loads all of them, for their relationships
+    modules = imported_modules("from api.models import Idea")
+    assert "ValueInvestorsClub.ValueInvestorsClub.models.Performance" in modules
+    # The server is only needed to run the app directly
+    assert "uvicorn" not in imported_modules("import api.main")
@@ -0,0 +1,154 @@
+"""
+Tests for the pg_dump / Parquet splitter and DDL of the bulk loader.
+Loading itself needs Postgres and isn't covered here.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from api.jobs.bulk_load import (
+    DumpParseError,
+    _model_tables,
+    copy_escape,
+    create_table_ddl,
+    parse_values,
+    post_load_ddl,
+    split_dump,
+)
+
+COPY_DUMP = """\
+--
+-- PostgreSQL database dump
+--
+SET statement_timeout = 0;
+
+CREATE TABLE public.companies (
+    ticker character varying(32) NOT NULL,
+    company_name character varying(128) NOT NULL
+);
+
+COPY public.companies (ticker, company_name) FROM stdin;
+ABC US\tABC Corp
+XYZ LN\tXYZ\\tplc
+\\.
+
+COPY public.performance (idea_id, "nextDayOpen", "nextDayClose", "oneYearPerf") FROM stdin;
+abc\t10\t10.5\t\\N
+\\.
+
+ALTER TABLE ONLY public.companies
+    ADD CONSTRAINT companies_pkey PRIMARY KEY (ticker);
+"""
+
+INSERT_DUMP = """\
+CREATE TABLE public.users (
+    username character varying(64) NOT NULL,
+    user_link character varying(128) NOT NULL,
+    CONSTRAINT users_pkey PRIMARY KEY (user_link)
+);
+
+INSERT INTO public.users VALUES ('o''brien', 'https://valueinvestorsclub.com/users/obrien');
+INSERT INTO public.descriptions (idea_id, description) VALUES ('abc', 'Line one;
+line two with a tab\there'), ('def', NULL);
+INSERT INTO public.ideas (id, link, company_id, user_id, date, is_short, is_contest_winner) VALUES ('abc', '', 'ABC US', 'u', '2020-01-03 21:30:00'::timestamp, true, false);
+"""
+
+
+def read_copy(data):
+    with open(data.path) as handle:
+        return [line.rstrip("\n").split("\t") for line in handle]
+
+
+def test_parse_values():
+    rows = list(parse_values("('a', NULL, 1.5), ( 'it''s',true , -2 ) ;"))
+    assert rows == [["a", None, "1.5"], ["it's", "true", "-2"]]
+    assert list(parse_values("('2020-01-01'::date, 'x')")) == [["2020-01-01", "x"]]
+    with pytest.raises(DumpParseError):
+        list(parse_values("'a'"))
+
+
+def test_copy_escape():
+    assert copy_escape(None) == "\\N"
+    assert copy_escape(True) == "t"
+    assert copy_escape("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert copy_escape(datetime(2020, 1, 3, 21, 30)) == "2020-01-03 21:30:00"
+
+
+def test_split_copy_dump(tmp_path):
+    tables = split_dump(COPY_DUMP.splitlines(keepends=True), str(tmp_path))
+
+    assert set(tables) == {"companies", "performance"}
+    assert tables["companies"].columns == ["ticker", "company_name"]
+    assert tables["companies"].rows == 2
+    # COPY data is passed through untouched
+    assert read_copy(tables["companies"])[1] == ["XYZ LN", "XYZ\\tplc"]
+    assert tables["performance"].columns == ["idea_id", "nextDayOpen", "nextDayClose", "oneYearPerf"]
+    assert read_copy(tables["performance"]) == [["abc", "10", "10.5", "\\N"]]
+
+
+def test_split_insert_dump(tmp_path):
+    tables = split_dump(INSERT_DUMP.splitlines(keepends=True), str(tmp_path))
+
+    # Column order comes from CREATE TABLE when the INSERT has no column list
+    assert tables["users"].columns == ["username", "user_link"]
+    assert read_copy(tables["users"]) == [["o'brien", "https://valueinvestorsclub.com/users/obrien"]]
+
+    assert tables["descriptions"].rows == 2
+    assert read_copy(tables["descriptions"]) == [
+        ["abc", "Line one;\\nline two with a tab\\there"],
+        ["def", "\\N"],
+    ]
+    assert read_copy(tables["ideas"])[0][4:] == ["2020-01-03 21:30:00", "true", "false"]
+
+
+def test_unterminated_copy(tmp_path):
+    with pytest.raises(DumpParseError):
+        split_dump(["COPY public.users (username, user_link) FROM stdin;\n", "a\tb\n"], str(tmp_path))
+
+
+def test_ddl():
+    dialect = postgresql.dialect()
+    tables = _model_tables(["ideas", "performance", "users", "companies", "unknown"])
+    assert [t.name for t in tables][-1] == "performance"
+
+    ideas = next(t for t in tables if t.name == "ideas")
+    ddl = create_table_ddl(ideas, dialect)
+    assert ddl.startswith("CREATE TABLE ideas (id VARCHAR, link VARCHAR(256)")
+    assert "PRIMARY" not in ddl and "REFERENCES" not in ddl
+
+    keys, indexes, foreign_keys = post_load_ddl(tables, dialect)
+    assert ["ALTER TABLE ideas ADD PRIMARY KEY (id)"] in keys
+    assert "CREATE INDEX ix_ideas_company_id_date ON ideas (company_id, date)" in indexes
+    assert any("REFERENCES companies" in fk for fk in foreign_keys)
+    assert create_table_ddl(tables[-1], dialect).count('"nextDayOpen" FLOAT') == 1
+
+
+def test_split_parquet_roundtrip(db_session, tmp_path):
+    pytest.importorskip("pyarrow")
+    from api.jobs.bulk_load import split_parquet
+    from api.jobs.export_parquet import export_parquet
+    from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+    from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
+    from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+    from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+    db_session.add_all([Company(ticker="ABC US", company_name="ABC Corp"), User(username="u", user_link="link")])
+    db_session.commit()
+    for i in range(3):
+        db_session.add(Idea(id=f"i{i}", link="", company_id="ABC US", user_id="link",
+                            date=datetime(2010 + i, 1, 1), is_short=False, is_contest_winner=False))
+    db_session.add(Description(idea_id="i1", description="multi\nline"))
+    db_session.commit()
+    export_parquet(db_session, str(tmp_path / "export"), include_text=True)
+
+    tables = split_parquet(str(tmp_path / "export"), str(tmp_path))
+    assert {name: data.rows for name, data in tables.items()} == {
+        "companies": 1, "users": 1, "ideas": 3, "descriptions": 1,
+    }
+    assert tables["descriptions"].columns == ["idea_id", "description"]
+    assert read_copy(tables["descriptions"]) == [["i1", "multi\\nline"]]
+    # Every spooled row has a field per listed column, or COPY rejects it
+    for data in tables.values():
+        assert {len(row) for row in read_copy(data)} == {len(data.columns)}
+    assert read_copy(tables["ideas"])[0][4] == "2010-01-01 00:00:00"
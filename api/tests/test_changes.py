@@ -0,0 +1,121 @@
+"""
+Tests for data versions, the change log and the /changes feed.
+"""
+import io
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from api import changes
+from api.jobs.load_performance import load_performance
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.DataVersion import DataVersion
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.IdeaChange import IdeaChange
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import IDEAS, PERFORMANCE, record_change
+
+
+@pytest.fixture
+def ideas(db_session):
+    db_session.add_all([Company(ticker="ABC US", company_name="ABC Corp"), User(username="u", user_link="link")])
+    db_session.commit()
+    db_session.add_all([
+        Idea(id=idea_id, link="", company_id="ABC US", user_id="link", date=datetime(2020, 1, 1),
+             is_short=False, is_contest_winner=False)
+        for idea_id in ("i1", "i2", "i3")
+    ])
+    db_session.commit()
+
+
+def test_record_change(db_session):
+    assert record_change(db_session, IDEAS, "spider", ["i2", "i1", "i2"]) == 1
+    assert record_change(db_session, PERFORMANCE, "load_performance", ["i1"]) == 2
+    assert record_change(db_session, IDEAS, "bulk_load") == 3
+    db_session.commit()
+
+    assert {v.name: v.version for v in db_session.query(DataVersion)} == {"all": 3, "ideas": 2, "performance": 1}
+    logged = db_session.query(IdeaChange).order_by(IdeaChange.id)
+    assert [(c.version, c.data_set, c.idea_id, c.source) for c in logged] == [
+        (1, "ideas", "i1", "spider"),
+        (1, "ideas", "i2", "spider"),
+        (2, "performance", "i1", "load_performance"),
+        (3, "ideas", None, "bulk_load"),
+    ]
+
+
+def test_changes_pages(client, db_session):
+    response = client.get("/changes")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"version": 0, "versions": {}, "changes": [], "next_since": 0, "has_more": False}
+
+    record_change(db_session, IDEAS, "spider", ["i1", "i2", "i3"])
+    record_change(db_session, PERFORMANCE, "load_performance", ["i2"])
+    db_session.commit()
+
+    first = client.get("/changes?limit=2").json()
+    assert first["version"] == 2
+    assert first["versions"] == {"ideas": 1, "performance": 1}
+    assert [c["idea_id"] for c in first["changes"]] == ["i1", "i2"]
+    assert first["has_more"] is True
+    rest = client.get(f"/changes?since={first['next_since']}&limit=2").json()
+    assert [(c["data_set"], c["idea_id"]) for c in rest["changes"]] == [("ideas", "i3"), ("performance", "i2")]
+    assert rest["has_more"] is False
+    # Nothing new
+    assert client.get(f"/changes?since={rest['next_since']}").json()["changes"] == []
+
+
+def events(body: str):
+    """(id, event, data) of every event of a text/event-stream body."""
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if "event" in fields:
+            parsed.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+def test_changes_stream(client, db_session, monkeypatch):
+    monkeypatch.setattr(changes, "CHANGES_POLL_INTERVAL", 0)
+    monkeypatch.setattr(changes, "CHANGES_STREAM_TIMEOUT", 0)
+    record_change(db_session, IDEAS, "spider", ["i1", "i2", "i3"])
+    db_session.commit()
+
+    response = client.get("/changes?limit=2", headers={"Accept": "text/event-stream"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("retry: 0\n\n")
+    sent = events(response.text)
+    assert [(event_id, data["idea_id"]) for event_id, _, data in sent[:-1]] == [("1", "i1"), ("2", "i2"), ("3", "i3")]
+    assert sent[-1][1:] == ("timeout", {"next_since": 3})
+
+    # A reconnecting EventSource resumes after the last event it saw
+    resumed = client.get("/changes", headers={"Accept": "text/event-stream", "Last-Event-ID": "2"})
+    assert [data["idea_id"] for _, event, data in events(resumed.text) if event == "change"] == ["i3"]
+
+
+def test_load_performance(engine, db_session, ideas):
+    csv = (
+        "idea_id,nextDayOpen,nextDayClose,oneYearPerf\n"
+        "i1,10,11,1.5\n"
+        "i2,20,21,\n"
+        "missing,1,1,1\n"
+    )
+    assert load_performance(engine, io.StringIO(csv), dry_run=True) == {"read": 3, "written": 2}
+    assert db_session.query(Performance).count() == 0
+
+    assert load_performance(engine, io.StringIO(csv), batch_size=2) == {"read": 3, "written": 2}
+    assert {(p.idea_id, p.oneYearPerf) for p in db_session.query(Performance)} == {("i1", 1.5), ("i2", None)}
+    # Updated in place the next time
+    load_performance(engine, io.StringIO("idea_id,nextDayOpen,nextDayClose,oneYearPerf\ni1,10,11,2.0\n"))
+    db_session.expire_all()
+    assert db_session.get(Performance, "i1").oneYearPerf == 2.0
+
+    assert db_session.get(DataVersion, "performance").version == 2
+    assert [c.idea_id for c in db_session.query(IdeaChange).order_by(IdeaChange.id)] == ["i1", "i2", "i1"]
+
+    with pytest.raises(ValueError):
+        load_performance(engine, io.StringIO("idea_id,price\ni1,1\n"))
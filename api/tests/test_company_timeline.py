@@ -0,0 +1,83 @@
+"""
+Tests for the company timeline endpoint.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+
+@pytest.fixture
+def timeline_data(db_session):
+    db_session.add_all([
+        Company(ticker="BRK/B US", company_name="Berkshire Hathaway"),
+        Company(ticker="OTHER US", company_name="Other Inc"),
+        User(username="author", user_link="https://valueinvestorsclub.com/users/author"),
+    ])
+    db_session.commit()
+    ideas = [
+        ("b1", "BRK/B US", datetime(2015, 6, 1), False, 1.2),
+        ("b2", "BRK/B US", datetime(2012, 3, 1), False, 1.4),
+        ("b3", "BRK/B US", datetime(2018, 9, 1), True, 1.1),
+        ("b4", "BRK/B US", datetime(2020, 1, 1), False, None),
+        ("o1", "OTHER US", datetime(2016, 1, 1), False, 2.0),
+    ]
+    for idea_id, ticker, posted, is_short, one_year in ideas:
+        db_session.add(Idea(
+            id=idea_id, link="", company_id=ticker, user_id="https://valueinvestorsclub.com/users/author",
+            date=posted, is_short=is_short, is_contest_winner=False,
+        ))
+        if one_year is not None:
+            db_session.add(Performance(idea_id=idea_id, nextDayOpen=10.0, nextDayClose=10.0, oneYearPerf=one_year))
+    db_session.commit()
+
+
+def test_company_ideas(client, timeline_data):
+    response = client.get("/companies/BRK/B US/ideas")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+
+    assert data["company"]["ticker"] == "BRK/B US"
+    assert [idea["id"] for idea in data["ideas"]] == ["b2", "b1", "b3", "b4"]
+    assert data["ideas"][0]["user"]["username"] == "author"
+    assert data["ideas"][0]["performance"]["oneYearPerf"] == 1.4
+    assert data["ideas"][0]["performance"]["performance_periods"] == {"1Y": 1.4}
+    assert data["ideas"][3]["performance"] is None
+
+    summary = data["summary"]
+    assert (summary["idea_count"], summary["long_count"], summary["short_count"]) == (4, 3, 1)
+    assert summary["long_short_ratio"] == 3.0
+    assert summary["ideas_with_returns"] == 3
+    # Long returns of +40% and +20% and -10% on the short
+    assert summary["median_return"] == pytest.approx(0.2)
+    assert summary["first_idea_date"].startswith("2012-03-01")
+
+    response = client.get("/companies/BRK/B US/ideas", params={"sort_order": "desc"})
+    assert [idea["id"] for idea in response.json()["ideas"]] == ["b4", "b3", "b1", "b2"]
+
+
+def test_company_ideas_not_found(client, timeline_data):
+    response = client.get("/companies/NOPE US/ideas")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_company_ideas_etag(client, timeline_data, db_session):
+    response = client.get("/companies/OTHER US/ideas")
+    etag = response.headers["etag"]
+    assert "max-age" in response.headers["cache-control"]
+
+    cached = client.get("/companies/OTHER US/ideas", headers={"If-None-Match": etag})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.content == b""
+
+    # New data changes the ETag
+    db_session.get(Performance, "o1").oneYearPerf = 2.5
+    db_session.commit()
+    response = client.get("/companies/OTHER US/ideas", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
@@ -0,0 +1,122 @@
+"""
+Tests for the duplicate idea merge job.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete
+
+from api.jobs.dedupe_ideas import clusters_statement, dedupe_ideas, find_clusters, merge_cluster
+from ValueInvestorsClub.ValueInvestorsClub.models.Catalysts import Catalysts
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.IdeaChange import IdeaChange
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+AUTHOR = "https://valueinvestorsclub.com/users/author"
+OTHER = "https://valueinvestorsclub.com/users/other"
+
+
+def silent(message):
+    pass
+
+
+@pytest.fixture
+def duplicates(db_session):
+    db_session.add_all([
+        Company(ticker="ABC US", company_name="ABC Corp"),
+        Company(ticker="XYZ US", company_name="XYZ Corp"),
+        User(username="author", user_link=AUTHOR),
+        User(username="other", user_link=OTHER),
+    ])
+    db_session.commit()
+    for idea_id, link, user, ticker, day in [
+        ("a1", "", AUTHOR, "ABC US", 1),
+        ("a2", "https://valueinvestorsclub.com/idea/ABC/102", AUTHOR, "ABC US", 1),
+        ("a3", "", AUTHOR, "ABC US", 1),
+        ("b1", "", AUTHOR, "XYZ US", 2),
+        ("b2", "", AUTHOR, "XYZ US", 2),
+        # Not duplicates: another author, ticker or date
+        ("c1", "", OTHER, "ABC US", 1),
+        ("c2", "", AUTHOR, "XYZ US", 1),
+        ("c3", "", AUTHOR, "ABC US", 3),
+    ]:
+        db_session.add(Idea(id=idea_id, link=link, company_id=ticker, user_id=user,
+                            date=datetime(2020, 1, day, 21, 30), is_short=False, is_contest_winner=False))
+    db_session.commit()
+    db_session.add_all([
+        Description(idea_id="a1", description="a1"),
+        Description(idea_id="a3", description="a3"),
+        Catalysts(idea_id="a3", catalysts="a3"),
+        Performance(idea_id="a1", nextDayOpen=1.0, nextDayClose=1.0, oneYearPerf=1.2),
+        Catalysts(idea_id="b2", catalysts="b2"),
+    ])
+    db_session.commit()
+
+
+def test_find_clusters(engine, duplicates):
+    with engine.connect() as connection:
+        clusters = sorted(find_clusters(connection))
+    # One with a link first, then most child rows
+    assert clusters == [["a2", "a1", "a3"], ["b2", "b1"]]
+
+
+def test_dry_run(engine, db_session, duplicates):
+    report = []
+    assert dedupe_ideas(engine, dry_run=True, log=report.append) == {"clusters": 2, "duplicates": 3, "deleted": 0}
+    assert sorted(report) == ["  keep a2, merge a1, a3", "  keep b2, merge b1"]
+    assert db_session.query(Idea).count() == 8
+
+
+def test_dedupe_ideas(engine, db_session, duplicates):
+    assert dedupe_ideas(engine, batch_size=1, log=silent)["deleted"] == 3
+    assert sorted(id for (id,) in db_session.query(Idea.id)) == ["a2", "b2", "c1", "c2", "c3"]
+    # The survivor keeps its link and gains the rows it lacked
+    assert db_session.get(Idea, "a2").link == "https://valueinvestorsclub.com/idea/ABC/102"
+    assert {d.idea_id: d.description for d in db_session.query(Description)} == {"a2": "a1"}
+    assert {c.idea_id: c.catalysts for c in db_session.query(Catalysts)} == {"a2": "a3", "b2": "b2"}
+    assert [p.idea_id for p in db_session.query(Performance)] == ["a2"]
+    # One ideas version per batch, logging the merged ids
+    assert {(c.version, c.idea_id) for c in db_session.query(IdeaChange)} == {
+        (1, "a1"), (1, "a2"), (1, "a3"), (2, "b1"), (2, "b2"),
+    }
+    assert dedupe_ideas(engine, log=silent)["clusters"] == 0
+
+
+def test_link_id_copy_survives(engine, db_session, duplicates):
+    # Keyed by its link's id, as migrate_idea_ids keys ideas
+    db_session.add(Idea(id="301", link="https://valueinvestorsclub.com/idea/ABC/301", company_id="ABC US",
+                        user_id=AUTHOR, date=datetime(2020, 1, 1, 21, 30), is_short=False, is_contest_winner=False))
+    db_session.commit()
+    with engine.connect() as connection:
+        assert sorted(find_clusters(connection)) == [["301", "a2", "a1", "a3"], ["b2", "b1"]]
+    dedupe_ideas(engine, log=silent)
+    db_session.expire_all()
+    assert db_session.get(Idea, "301").link == "https://valueinvestorsclub.com/idea/ABC/301"
+    assert sorted(id for (id,) in db_session.query(Idea.id)) == ["301", "b2", "c1", "c2", "c3"]
+    assert [p.idea_id for p in db_session.query(Performance)] == ["301"]
+
+
+def test_clusters_need_author_ticker_and_date():
+    # Older databases allow NULLs there, which would otherwise cluster together
+    sql = str(clusters_statement())
+    assert "ideas.date IS NOT NULL" in sql
+    assert "ideas.user_id IS NOT NULL" in sql
+    assert "ideas.company_id IS NOT NULL" in sql
+
+
+def test_merge_skips_changed_clusters(engine, db_session, duplicates):
+    with engine.connect() as connection:
+        clusters = sorted(find_clusters(connection))
+    # Changed by someone else since the scan
+    db_session.query(Idea).filter(Idea.id == "b1").update({"date": datetime(2021, 1, 1)})
+    db_session.execute(delete(Description).where(Description.idea_id == "a3"))
+    db_session.execute(delete(Catalysts).where(Catalysts.idea_id == "a3"))
+    db_session.execute(delete(Idea).where(Idea.id == "a3"))
+    db_session.commit()
+
+    with engine.begin() as connection:
+        assert [merge_cluster(connection, cluster) for cluster in clusters] == [1, 0]
+    assert sorted(id for (id,) in db_session.query(Idea.id)) == ["a2", "b1", "b2", "c1", "c2", "c3"]
@@ -0,0 +1,147 @@
+"""
+Tests for compressed description storage.
+"""
+import json
+import random
+from datetime import datetime
+
+import pytest
+from fastapi import status
+from sqlalchemy import text
+
+from api.jobs.compress_descriptions import compress_descriptions, decompress_descriptions, train_dictionary
+from ValueInvestorsClub.ValueInvestorsClub.models import compression
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+pytest.importorskip("zstandard")
+
+WORDS = ["free", "cash", "flow", "moat", "margin", "valuation", "catalyst", "management", "spin-off", "€", "—"]
+
+
+def fake_description(rng, words=400):
+    return "Thesis: " + " ".join(rng.choice(WORDS) for _ in range(words)) + "\n\nRisks: none."
+
+
+@pytest.fixture
+def descriptions(db_session):
+    rng = random.Random(7)
+    db_session.add_all([
+        Company(ticker="ABC US", company_name="ABC Corp"),
+        User(username="author", user_link="https://valueinvestorsclub.com/users/author"),
+    ])
+    db_session.commit()
+    texts = {}
+    for i in range(120):
+        idea_id = f"idea{i:03d}"
+        db_session.add(Idea(
+            id=idea_id, link="", company_id="ABC US", user_id="https://valueinvestorsclub.com/users/author",
+            date=datetime(2020, 1, 1), is_short=False, is_contest_winner=False,
+        ))
+        # A few short ones that stay uncompressed
+        texts[idea_id] = "Short thesis." if i % 40 == 0 else fake_description(rng)
+        db_session.add(Description(idea_id=idea_id, description=texts[idea_id]))
+    db_session.commit()
+    return texts
+
+
+def test_codec_roundtrip():
+    text = "Multibyte €—" * 5000
+    data = compression.compress_text(text)
+    decompressor = compression.get_decompressor(data)
+    assert compression.decompress_text(data, decompressor) == text
+    chunks = list(compression.iter_decompressed_text(data, decompressor, chunk_size=7))
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+
+
+def test_stream_not_shared():
+    text = "Multibyte €—" * 5000
+    data = compression.compress_text(text)
+    other = compression.compress_text("Another thesis. " * 100)
+    stream = compression.iter_decompressed_text(data, compression.stream_decompressor(data), chunk_size=64)
+    chunks = [next(stream)]
+    # One-shot decompression on this thread in the middle of the stream
+    assert compression.decompress_text(other, compression.get_decompressor(other)) == "Another thesis. " * 100
+    chunks.extend(stream)
+    assert "".join(chunks) == text
+
+
+def test_make_preview():
+    assert compression.make_preview("short") == "short"
+    preview = compression.make_preview("word " * 50, length=22)
+    assert preview == "word word word word…"
+
+
+def test_compress_job(db_session, descriptions):
+    dictionary = train_dictionary(db_session, sample_size=100, size=8 * 1024)
+    dictionary_id = dictionary.id
+    stats = compress_descriptions(db_session, dictionary, batch_size=25)
+    assert stats["rows"] == 117
+    assert stats["text_bytes"] > 4 * stats["compressed_bytes"]
+
+    stored = db_session.get(Description, "idea001")
+    assert stored.is_compressed
+    assert stored.description is None
+    assert stored.dictionary_id == dictionary_id
+    assert stored.full_text() == descriptions["idea001"]
+    assert "".join(stored.iter_text(chunk_size=100)) == descriptions["idea001"]
+    assert stored.preview_text() == (stored.preview, True)
+    assert db_session.get(Description, "idea000").preview_text() == ("Short thesis.", False)
+
+    # Nothing left to do on a second run
+    assert compress_descriptions(db_session, db_session.merge(dictionary))["rows"] == 0
+
+    assert decompress_descriptions(db_session) == 117
+    restored = db_session.get(Description, "idea001")
+    assert restored.description == descriptions["idea001"]
+    assert restored.description_compressed is None
+
+
+def test_api_reads_compressed(client, db_session, descriptions):
+    compress_descriptions(db_session, train_dictionary(db_session, sample_size=100, size=8 * 1024))
+    expected = descriptions["idea005"]
+
+    response = client.get("/ideas/idea005/description")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["description"] == expected
+
+    detail = client.get("/ideas/idea005", params={"description_preview": True}).json()
+    assert detail["description"]["is_preview"] is True
+    assert expected.startswith(detail["description"]["description"].rstrip("…"))
+    assert client.get("/ideas/idea005").json()["description"]["description"] == expected
+
+    response = client.get("/ideas/idea005/description/stream")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == expected
+    assert client.get("/ideas/nope/description/stream").status_code == status.HTTP_404_NOT_FOUND
+
+    rows = [json.loads(line) for line in client.get("/export/ideas", params={"include_text": True}).text.splitlines()]
+    assert {row["id"]: row["description"] for row in rows} == descriptions
+
+
+def test_unmigrated_schema(client, db_session):
+    # A database created before compressed storage existed
+    Description.__table__.drop(db_session.get_bind())
+    db_session.execute(text(
+        "CREATE TABLE descriptions (idea_id VARCHAR NOT NULL PRIMARY KEY REFERENCES ideas (id), "
+        "description VARCHAR(128000) NOT NULL)"
+    ))
+    db_session.add_all([
+        Company(ticker="ABC US", company_name="ABC Corp"),
+        User(username="author", user_link="https://valueinvestorsclub.com/users/author"),
+        Idea(id="idea1", link="", company_id="ABC US", user_id="https://valueinvestorsclub.com/users/author",
+             date=datetime(2020, 1, 1), is_short=False, is_contest_winner=False),
+    ])
+    db_session.commit()
+    db_session.execute(text("INSERT INTO descriptions VALUES ('idea1', 'Plain text thesis.')"))
+    db_session.commit()
+
+    assert client.get("/ideas/idea1/description").json()["description"] == "Plain text thesis."
+    detail = client.get("/ideas/idea1", params={"description_preview": True}).json()
+    assert detail["description"] == {"description": "Plain text thesis.", "is_preview": False}
+    row = json.loads(client.get("/export/ideas", params={"include_text": True}).text)
+    assert row["description"] == "Plain text thesis."
+    assert repr(db_session.get(Description, "idea1")).startswith("Description(idea_id='idea1', description=")
@@ -0,0 +1,84 @@
+"""
+Tests for the streaming export endpoint and the Parquet export job.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from api.export import export_names
+from api.filters import IdeaFilters
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+
+@pytest.fixture
+def export_data(db_session):
+    db_session.add_all([
+        Company(ticker="ABC US", company_name="ABC Corp"),
+        User(username="author", user_link="https://valueinvestorsclub.com/users/author"),
+    ])
+    db_session.commit()
+    for i in range(7):
+        idea_id = f"idea{i}"
+        db_session.add(Idea(
+            id=idea_id, link=f"https://valueinvestorsclub.com/idea/{idea_id}", company_id="ABC US",
+            user_id="https://valueinvestorsclub.com/users/author", date=datetime(2010 + i % 3, 1, 1 + i),
+            is_short=(i % 2 == 1), is_contest_winner=False,
+        ))
+        db_session.add(Description(idea_id=idea_id, description=f"Thesis {i}\nwith, commas"))
+        if i < 4:
+            db_session.add(Performance(idea_id=idea_id, nextDayOpen=10.0, nextDayClose=10.0, oneYearPerf=1.0 + i / 10))
+    db_session.commit()
+
+
+def test_export_ndjson(client, export_data):
+    response = client.get("/export/ideas")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 7
+    assert list(rows[0]) == export_names()
+    # Oldest first
+    assert [row["date"][:4] for row in rows] == ["2010"] * 3 + ["2011"] * 2 + ["2012"] * 2
+    assert rows[0]["username"] == "author"
+    assert "description" not in rows[0]
+
+
+def test_export_filters(client, export_data):
+    rows = client.get("/export/ideas", params={"is_short": True}).text.splitlines()
+    assert len(rows) == 3
+    rows = client.get("/export/ideas", params={"has_performance": True, "min_performance": 1.2}).text.splitlines()
+    assert sorted(json.loads(row)["id"] for row in rows) == ["idea2", "idea3"]
+
+
+def test_export_csv_with_text(client, export_data):
+    response = client.get("/export/ideas", params={"format": "csv", "include_text": True})
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 7
+    assert {row["description"] for row in rows} == {f"Thesis {i}\nwith, commas" for i in range(7)}
+
+
+def test_export_bad_format(client, export_data):
+    assert client.get("/export/ideas", params={"format": "xml"}).status_code == 422
+
+
+def test_export_parquet(db_session, export_data, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from api.jobs.export_parquet import export_parquet
+
+    written = export_parquet(db_session, str(tmp_path), IdeaFilters(), include_text=True, batch_size=2)
+    assert written == 7
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["year=2010", "year=2011", "year=2012"]
+
+    table = pq.read_table(str(tmp_path / "year=2011" / "part-0.parquet"))
+    assert table.num_rows == 2
+    assert table.column("description").to_pylist()[0].startswith("Thesis")
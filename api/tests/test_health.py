@@ -0,0 +1,61 @@
+"""
+Tests for the liveness and readiness endpoints.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from api import health
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import IDEAS, record_change
+
+
+@pytest.fixture(autouse=True)
+def fresh_checks():
+    health.clear_readiness_cache()
+    yield
+    health.clear_readiness_cache()
+
+
+def test_live(client):
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+
+def test_ready(client, db_session):
+    db_session.add_all([Company(ticker="ABC US", company_name="ABC Corp"), User(username="u", user_link="link")])
+    db_session.commit()
+    db_session.add(Idea(id="i1", link="", company_id="ABC US", user_id="link", date=datetime(2020, 1, 1),
+                        is_short=False, is_contest_winner=False))
+    record_change(db_session, IDEAS, "test", ["i1"])
+    db_session.commit()
+
+    response = client.get("/health/ready")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["ready"] is True
+    assert data["reasons"] == []
+    assert data["database_latency_seconds"] >= 0
+    assert data["data_version"] == "1"
+    assert data["data_age_seconds"] >= 0
+    assert response.headers["cache-control"] == "no-store"
+
+    # Cached between checks
+    assert client.get("/health/ready").json()["checked_at"] == data["checked_at"]
+
+
+def test_not_ready_when_slow(client, db_session, monkeypatch):
+    monkeypatch.setattr(health, "HEALTH_MAX_DB_LATENCY", -1.0)
+    response = client.get("/health/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["reasons"][0].startswith("database slow")
+
+
+def test_not_ready_when_pool_exhausted(client, db_session, monkeypatch):
+    exhausted = health.PoolStatusResponse(size=5, checked_out=15, overflow=10, max_overflow=10)
+    monkeypatch.setattr(health, "pool_status", lambda engine: exhausted)
+    response = client.get("/health/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["reasons"] == ["connection pool exhausted (15 checked out)"]
@@ -0,0 +1,110 @@
+"""
+Tests for the in-process idea index: it must answer exactly like the database.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from api import idea_index
+from api.bench.data import seed
+from api.facets import clear_facets_cache, ideas_facets
+from api.filters import IdeaFilters
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.versions import IDEAS, record_change
+
+QUERIES = [
+    "",
+    "sort_order=asc",
+    "skip=20&limit=15",
+    "is_short=true",
+    "is_short=false&is_contest_winner=false&sort_order=asc",
+    "is_contest_winner=true",
+    "start_date=2005-01-01&end_date=2012-06-30",
+    "company_id=C0001 US",
+    "company_id=C0001 US&user_id=https://valueinvestorsclub.com/users/author0",
+    "user_id=https://valueinvestorsclub.com/users/author2&is_short=false",
+    "company_id=unknown",
+    "has_performance=true",
+    "has_performance=false",
+    "min_performance=1.1&performance_period=one_month_perf",
+    "max_performance=0.9&min_performance=0.5",
+    "sort_by=performance",
+    "sort_by=performance&sort_order=asc&performance_period=two_year_perf",
+    "sort_by=performance&is_short=true&skip=5&limit=10",
+]
+
+
+@pytest.fixture
+def index_data(db_session):
+    seed(db_session, ideas=300, companies=8, users=6, description_words=10)
+    # Ideas without performance: no row at all, or a row without values
+    for performance in db_session.query(Performance).filter(Performance.idea_id.in_(["00000003", "00000007"])):
+        db_session.delete(performance)
+    performance = db_session.get(Performance, "00000011")
+    for column in ("oneWeekClosePerf", "twoWeekClosePerf", "oneMonthPerf", "threeMonthPerf", "sixMonthPerf",
+                   "oneYearPerf", "twoYearPerf", "threeYearPerf", "fiveYearPerf"):
+        setattr(performance, column, None)
+    db_session.commit()
+
+
+@pytest.fixture
+def enable_index(monkeypatch):
+    monkeypatch.setattr(idea_index, "IDEA_INDEX", True)
+
+
+def get(client, query):
+    response = client.get(f"/ideas/?limit=500&include_total=true&{query}")
+    assert response.status_code == status.HTTP_200_OK
+    return response.json(), response.headers["x-total-count"]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_index_matches_database(client, index_data, monkeypatch, query):
+    from_database = get(client, query)
+    monkeypatch.setattr(idea_index, "IDEA_INDEX", True)
+    from_index = get(client, query)
+    assert from_index == from_database
+
+
+def test_index_facets_match_database(db_session, index_data):
+    index = idea_index.IdeaIndex.build(db_session)
+    for filters in [
+        IdeaFilters(),
+        IdeaFilters(is_short=True, start_date=datetime(2008, 1, 1).date()),
+        IdeaFilters(company_id="C0002 US", has_performance=False),
+        IdeaFilters(company_id="unknown"),
+    ]:
+        clear_facets_cache()
+        assert index.facets(filters, top=3) == ideas_facets(db_session, filters, top=3)
+
+
+def test_index_rebuilt_on_data_change(client, db_session, index_data, enable_index, monkeypatch):
+    assert get(client, "")[1] == "300"
+    db_session.add(Idea(id="new", link="", company_id="C0000 US",
+                        user_id="https://valueinvestorsclub.com/users/author0",
+                        date=datetime(2030, 1, 1), is_short=False, is_contest_winner=False))
+    record_change(db_session, IDEAS, "test", ["new"])
+    db_session.commit()
+
+    # Within the check interval the index is reused
+    assert get(client, "")[1] == "300"
+    monkeypatch.setattr(idea_index, "IDEA_INDEX_CHECK_INTERVAL", 0)
+    ideas, total = get(client, "")
+    assert total == "301"
+    assert ideas[0]["id"] == "new"
+
+
+def test_index_falls_back_to_database(client, index_data, enable_index, monkeypatch):
+    calls = []
+
+    def broken(cls, db, version=None):
+        calls.append(version)
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(idea_index.IdeaIndex, "build", classmethod(broken))
+    assert get(client, "is_short=true")[0]
+    # Retried after the check interval, not on every request
+    assert get(client, "is_short=false")[0]
+    assert len(calls) == 1
@@ -0,0 +1,83 @@
+"""
+Tests for the cached listing statements and the query overhead benchmark.
+"""
+from datetime import date
+
+import pytest
+
+from api.bench import query_overhead
+from api.bench.data import seed
+from api.database import connection
+from api.filters import IdeaFilters
+from api.idea_query import ideas_statement, query_shape
+
+
+def test_statement_per_shape():
+    first, params = ideas_statement(IdeaFilters(company_id="AAPL", min_performance=0.1), "date", "desc", 0, 20)
+    second, other = ideas_statement(IdeaFilters(company_id="MSFT", min_performance=0.5), "date", "DESC", 40, 10)
+    assert first is second
+    assert params == {"company_id": "AAPL", "min_performance": 0.1, "skip": 0, "limit": 20}
+    assert other == {"company_id": "MSFT", "min_performance": 0.5, "skip": 40, "limit": 10}
+
+    # Different filters set, sort or performance column: different statements
+    assert ideas_statement(IdeaFilters(user_id="u"), "date", "desc", 0, 20)[0] is not first
+    assert ideas_statement(IdeaFilters(company_id="AAPL", min_performance=0.1), "date", "asc", 0, 20)[0] is not first
+    bounded = IdeaFilters(company_id="AAPL", min_performance=0.1, performance_period="six_month_perf")
+    assert ideas_statement(bounded, "date", "desc", 0, 20)[0] is not first
+
+
+def test_shape_ignores_unused_period():
+    # The period only matters when a performance column is filtered or sorted on
+    one_year, _ = query_shape(IdeaFilters(is_short=True), "date", "desc")
+    six_month, _ = query_shape(IdeaFilters(is_short=True, performance_period="six_month_perf"), "date", "desc")
+    assert one_year == six_month
+    assert query_shape(IdeaFilters(), "performance", "desc")[0].period == "one_year_perf"
+    # Unknown periods fall back to one year, like performance_column()
+    assert query_shape(IdeaFilters(), "performance", "desc")[0] == query_shape(
+        IdeaFilters(performance_period="nope"), "performance", "desc"
+    )[0]
+
+
+def test_empty_values_dont_filter():
+    shape, params = query_shape(IdeaFilters(company_id="", user_id=""), "date", "desc")
+    assert shape.filters == () and params == {}
+
+
+def test_matches_legacy_query(db_session):
+    seed(db_session, ideas=300, companies=20, users=20, description_words=10)
+    requests = query_overhead.listing_requests(28, limit=15, companies=20, users=20)
+    requests.append({"filters": IdeaFilters(end_date=date(2000, 6, 1), has_performance=False, is_contest_winner=False),
+                     "sort_by": "performance", "sort_order": "asc", "skip": 0, "limit": 50})
+    for request in requests:
+        args = (db_session, request["filters"], request["sort_by"], request["sort_order"], request["skip"],
+                request["limit"])
+        expected = [idea.id for idea in query_overhead.legacy_query(*args).all()]
+        statement, params = ideas_statement(*args[1:])
+        assert [idea.id for idea in db_session.scalars(statement, params)] == expected
+
+
+def test_query_overhead_run(db_session):
+    seed(db_session, ideas=100, companies=10, users=10, description_words=10)
+    rows = query_overhead.run(db_session, requests=14, limit=5, repeat=1)
+    assert [row["strategy"] for row in rows] == list(query_overhead.STRATEGIES)
+    assert all(row["request_us"] >= row["build_us"] > 0 for row in rows)
+    assert "cached select" in query_overhead.format_table(rows)
+
+
+@pytest.mark.parametrize("url,threshold,expected", [
+    ("postgresql+psycopg://localhost/ideas", "5", {"prepare_threshold": 5}),
+    ("postgresql+psycopg://localhost/ideas", "", {"prepare_threshold": None}),
+    ("postgresql+psycopg2://localhost/ideas", "5", {}),
+    ("sqlite:///ideas.db", "5", {}),
+])
+def test_connect_args(monkeypatch, url, threshold, expected):
+    monkeypatch.setattr(connection, "DB_PREPARE_THRESHOLD", threshold)
+    assert connection.connect_args(url) == expected
+
+
+def test_replica_connect_timeout(monkeypatch):
+    monkeypatch.setattr(connection, "DATABASE_REPLICA_URLS", ["postgresql+psycopg2://replica/ideas", "sqlite:///r.db"])
+    monkeypatch.setattr(connection, "REPLICA_CONNECT_TIMEOUT", 2)
+    assert connection.connect_args("postgresql+psycopg2://replica/ideas") == {"connect_timeout": 2}
+    assert connection.connect_args("postgresql+psycopg2://primary/ideas") == {}
+    assert connection.connect_args("sqlite:///r.db") == {}
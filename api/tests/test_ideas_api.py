@@ -16,6 +16,7 @@ from ValueInvestorsClub.ValueInvestorsClub.models.User import User
 from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
 from ValueInvestorsClub.ValueInvestorsClub.models.Catalysts import Catalysts
 from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from api.schemas import PerformanceResponse
 
 # Create test data
 @pytest.fixture
@@ -275,6 +276,104 @@ def test_get_ideas_with_pagination(client, test_data):
     page2_ids = [idea["id"] for idea in page2]
     assert len(set(page1_ids).intersection(set(page2_ids))) == 0
 
+def test_get_ideas_include_total(client, test_data, count_queries):
+    """Test the total in X-Total-Count, counted once per filter set."""
+    response = client.get("/ideas/?limit=2")
+    assert "x-total-count" not in response.headers
+
+    # A full page: counted, after checking the data version
+    with count_queries() as queries:
+        response = client.get("/ideas/?limit=2&include_total=true")
+    assert response.headers["x-total-count"] == "3"
+    assert response.headers["x-total-count-exact"] == "true"
+    assert len(queries) == 3
+
+    # Same filters on another page: the count is cached
+    with count_queries() as queries:
+        response = client.get("/ideas/?skip=1&limit=1&include_total=true")
+    assert response.headers["x-total-count"] == "3"
+    assert len(queries) == 1
+
+    # The last page gives the total away
+    with count_queries() as queries:
+        response = client.get("/ideas/?company_id=AAPL&limit=10&include_total=true")
+    assert response.headers["x-total-count"] == "2"
+    assert len(queries) == 1
+
+    response = client.get("/ideas/?is_short=true&skip=5&limit=2&include_total=true")
+    assert response.json() == []
+    assert response.headers["x-total-count"] == "1"
+
+def test_cached_totals_cleared_on_data_change(client, db_session, test_data, monkeypatch):
+    """Test that cached totals and facets are dropped once the data version moves."""
+    from api import counts
+    from ValueInvestorsClub.ValueInvestorsClub.models.versions import IDEAS, record_change
+    assert client.get("/ideas/?limit=1&include_total=true").headers["x-total-count"] == "3"
+    assert client.get("/ideas/facets").json()["total"] == 3
+
+    idea = test_data["ideas"][0]
+    db_session.add(Idea(id="new", link="", company_id=idea.company_id, user_id=idea.user_id,
+                        date=datetime(2030, 1, 1), is_short=False, is_contest_winner=False))
+    record_change(db_session, IDEAS, "test", ["new"])
+    db_session.commit()
+    # Within the check interval the cached results are used
+    assert client.get("/ideas/?limit=1&include_total=true").headers["x-total-count"] == "3"
+    monkeypatch.setattr(counts, "DATA_VERSION_CHECK_INTERVAL", 0)
+    assert client.get("/ideas/?limit=1&include_total=true").headers["x-total-count"] == "4"
+    assert client.get("/ideas/facets").json()["total"] == 4
+
+def test_get_ideas_total_estimate(client, test_data, monkeypatch):
+    """Test that large results on Postgres report the planner's estimate."""
+    from api import counts
+    monkeypatch.setattr(counts, "planner_estimate", lambda db, filters: counts.EXACT_COUNT_LIMIT + 1)
+
+    response = client.get("/ideas/?limit=1&include_total=true")
+    assert response.headers["x-total-count"] == str(counts.EXACT_COUNT_LIMIT + 1)
+    assert response.headers["x-total-count-exact"] == "false"
+
+def test_get_ideas_facets(client, test_data, count_queries):
+    """Test facet counts, in one query, under the current filters."""
+    with count_queries() as queries:
+        response = client.get("/ideas/facets")
+    assert response.status_code == status.HTTP_200_OK
+    # And one checking the data version
+    assert len(queries) == 2
+    facets = response.json()
+
+    assert facets["total"] == 3
+    years = {}
+    for idea in test_data["ideas"]:
+        years[idea.date.year] = years.get(idea.date.year, 0) + 1
+    assert facets["years"] == [{"year": year, "count": count} for year, count in sorted(years.items())]
+    assert (facets["long_count"], facets["short_count"]) == (2, 1)
+    assert facets["contest_winner_count"] == 1
+    assert (facets["with_performance_count"], facets["without_performance_count"]) == (1, 2)
+    assert facets["top_companies"][0] == {"value": "AAPL", "label": "Apple Inc.", "count": 2}
+    assert facets["top_users"][0]["label"] == "TestUser1"
+
+    response = client.get("/ideas/facets?is_short=false&top=1")
+    facets = response.json()
+    assert facets["total"] == 2
+    assert (facets["long_count"], facets["short_count"]) == (2, 0)
+    assert facets["top_companies"] == [{"value": "AAPL", "label": "Apple Inc.", "count": 2}]
+    assert len(facets["top_users"]) == 1
+
+    # The facets' total is reused by include_total
+    with count_queries() as queries:
+        response = client.get("/ideas/?is_short=false&limit=1&include_total=true")
+    assert response.headers["x-total-count"] == "2"
+    assert len(queries) == 1
+
+def test_facets_performance_counts_match_filter(client, db_session, test_data):
+    """Test that the performance facet counts the ideas the has_performance filter selects."""
+    # A performance row without any returns counts as no performance
+    db_session.add(Performance(idea_id=test_data["ideas"][1].id, nextDayOpen=1.0, nextDayClose=1.0))
+    db_session.commit()
+    facets = client.get("/ideas/facets").json()
+    without = client.get("/ideas/?has_performance=false&include_total=true").headers["x-total-count"]
+    assert facets["without_performance_count"] == int(without) == 2
+    assert facets["with_performance_count"] == facets["total"] - facets["without_performance_count"]
+
 def test_get_idea_detail(client, test_data):
     """Test retrieving detailed idea information."""
     idea_id = test_data["ideas"][0].id
@@ -382,6 +481,22 @@ def test_get_idea_performance(client, test_data):
     }
     assert performance["performance_periods"] == expected_periods
 
+def test_performance_response_shared():
+    """Rows with the same values share one response, a changed row gets its own."""
+    row = Performance(idea_id="a", nextDayOpen=1.0, nextDayClose=1.0, oneMonthPerf=1.2, oneYearPerf=1.5)
+    same = Performance(idea_id="b", nextDayOpen=1.0, nextDayClose=1.0, oneMonthPerf=1.2, oneYearPerf=1.5)
+    first = PerformanceResponse.model_validate(row)
+    assert PerformanceResponse.model_validate(same) is first
+    assert first.timeline_labels == ["1M", "1Y"]
+    assert first.performance_periods == {"1M": 1.2, "1Y": 1.5}
+
+    row.oneYearPerf = 1.6
+    changed = PerformanceResponse.model_validate(row)
+    assert changed is not first
+    assert changed.timeline_values == [1.2, 1.6]
+    assert PerformanceResponse.model_validate(Performance(idea_id="c", nextDayOpen=1.0, nextDayClose=1.0)).timeline_labels is None
+
+
 def test_get_companies(client, test_data):
     """Test retrieving companies."""
     response = client.get("/companies/")
@@ -0,0 +1,141 @@
+"""
+Tests for the author_stats job and the users leaderboard endpoint.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from api.jobs.author_stats import refresh_author_stats, stale_authors
+from ValueInvestorsClub.ValueInvestorsClub.models.AuthorStats import AuthorStats
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+USERS = ["alice", "bob", "carol", "dave"]
+# One year price ratios per author, every idea is a long unless noted
+ONE_YEAR = {
+    "alice": [1.5, 1.3],
+    "bob": [1.1, 0.9, 1.2],
+    "carol": [0.8],
+    "dave": [1.0, 1.4],
+}
+
+
+def link(name):
+    return f"https://valueinvestorsclub.com/users/{name}"
+
+
+def add_idea(db_session, idea_id, user, one_year, is_short=False, is_contest_winner=False):
+    db_session.add(Idea(
+        id=idea_id, link="", company_id="ABC US", user_id=link(user), date=datetime(2020, 1, 1),
+        is_short=is_short, is_contest_winner=is_contest_winner,
+    ))
+    db_session.add(Performance(idea_id=idea_id, nextDayOpen=10.0, nextDayClose=10.0, oneYearPerf=one_year))
+
+
+@pytest.fixture
+def leaderboard_data(db_session):
+    db_session.add(Company(ticker="ABC US", company_name="ABC Corp"))
+    db_session.add_all([User(username=name, user_link=link(name)) for name in USERS])
+    db_session.commit()
+    for user, ratios in ONE_YEAR.items():
+        for i, ratio in enumerate(ratios):
+            add_idea(db_session, f"{user}-{i}", user, ratio, is_contest_winner=(user == "bob" and i == 0))
+    # A short that paid off: the price fell 30%
+    add_idea(db_session, "carol-short", "carol", 0.7, is_short=True)
+    db_session.commit()
+    assert refresh_author_stats(db_session, full=True) == 4
+
+
+def test_compute_stats(db_session, leaderboard_data):
+    alice = db_session.get(AuthorStats, (link("alice"), "1Y"))
+    assert alice.idea_count == 2
+    assert alice.hit_rate == 1.0
+    assert alice.mean_return == pytest.approx(0.4)
+
+    carol = db_session.get(AuthorStats, (link("carol"), "1Y"))
+    assert (carol.long_count, carol.short_count) == (1, 1)
+    # -20% on the long and +30% on the short
+    assert carol.mean_return == pytest.approx(0.05)
+    assert carol.hit_rate == 0.5
+
+    bob = db_session.get(AuthorStats, (link("bob"), "1W"))
+    assert bob.contest_wins == 1
+    assert bob.ideas_with_returns == 0
+    assert bob.median_return is None
+
+
+def test_leaderboard_sorting(client, leaderboard_data):
+    response = client.get("/users/leaderboard", params={"sort_by": "mean_return"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [item["username"] for item in data["items"]] == ["alice", "dave", "bob", "carol"]
+    assert data["next_cursor"] is None
+
+    response = client.get("/users/leaderboard", params={"sort_by": "mean_return", "sort_order": "asc"})
+    assert [item["username"] for item in response.json()["items"]] == ["carol", "bob", "dave", "alice"]
+
+    response = client.get("/users/leaderboard", params={"min_ideas": 3})
+    assert [item["username"] for item in response.json()["items"]] == ["bob"]
+
+    # No author has a one week return, so nobody can be ranked on it
+    response = client.get("/users/leaderboard", params={"horizon": "1W", "min_ideas": 0})
+    assert response.json()["items"] == []
+
+
+def test_leaderboard_cursor(client, leaderboard_data):
+    seen = []
+    cursor = None
+    while True:
+        params = {"sort_by": "idea_count", "limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/users/leaderboard", params=params).json()
+        seen.extend(item["username"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    # Ties on idea_count are broken by user_link
+    assert seen == ["bob", "alice", "carol", "dave"]
+
+
+def test_leaderboard_validation(client, leaderboard_data):
+    assert client.get("/users/leaderboard", params={"sort_by": "username"}).status_code == 422
+    assert client.get("/users/leaderboard", params={"horizon": "4Y"}).status_code == 422
+    response = client.get("/users/leaderboard", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_incremental_refresh(db_session, leaderboard_data):
+    assert stale_authors(db_session) == set()
+    assert refresh_author_stats(db_session) == 0
+
+    # No returns yet, so the medians stay put and only dave is recomputed
+    db_session.add(Idea(
+        id="dave-2", link="", company_id="ABC US", user_id=link("dave"), date=datetime(2021, 1, 1),
+        is_short=False, is_contest_winner=False,
+    ))
+    db_session.commit()
+    assert stale_authors(db_session) == {link("dave")}
+    assert refresh_author_stats(db_session) == 1
+
+    dave = db_session.get(AuthorStats, (link("dave"), "1Y"))
+    db_session.refresh(dave)
+    assert dave.idea_count == 3
+    assert stale_authors(db_session) == set()
+
+
+def test_refresh_after_price_rewrite(db_session, leaderboard_data):
+    # Prices reloaded in place: same row counts, different values
+    db_session.get(Performance, "carol-0").oneYearPerf = 1.8
+    db_session.commit()
+    assert stale_authors(db_session) == {link("carol")}
+
+    # The 1Y median moved, so every author's excess return is recomputed
+    assert refresh_author_stats(db_session) == 4
+    rows = db_session.query(AuthorStats).filter(AuthorStats.horizon == "1Y").all()
+    assert len({row.universe_median for row in rows}) == 1
+    carol = next(row for row in rows if row.user_link == link("carol"))
+    assert carol.median_excess_return == pytest.approx(carol.median_return - carol.universe_median)
@@ -0,0 +1,67 @@
+"""
+Tests for request metrics and profiling.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from api import metrics
+from api.metrics import DB_SECONDS, QUERIES, REQUESTS, Histogram
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+
+@pytest.fixture
+def metrics_data(db_session):
+    db_session.add_all([Company(ticker="ABC US", company_name="ABC Corp"), User(username="u", user_link="link")])
+    db_session.commit()
+    db_session.add(Idea(id="i1", link="", company_id="ABC US", user_id="link", date=datetime(2020, 1, 1),
+                        is_short=False, is_contest_winner=False))
+    db_session.commit()
+
+
+def test_histogram_render():
+    histogram = Histogram("test_seconds", "Test.", (0.1, 1.0), ("route",))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_seconds_bucket{route="/a",le="1"} 2',
+        'test_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_seconds_sum{route="/a"} 5.55',
+        'test_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_request_metrics(client, metrics_data):
+    requests = REQUESTS.value("/ideas/{idea_id}", "GET", "200")
+    queries = QUERIES.sum("/ideas/{idea_id}")
+
+    response = client.get("/ideas/i1")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+    assert REQUESTS.value("/ideas/{idea_id}", "GET", "200") == requests + 1
+    # Idea with company and user, description, catalysts and performance
+    assert QUERIES.sum("/ideas/{idea_id}") - queries >= 4
+    assert DB_SECONDS.count("/ideas/{idea_id}") >= 1
+
+    client.get("/nope")
+    text = client.get("/metrics").text
+    assert 'vic_api_requests_total{route="/ideas/{idea_id}",method="GET",status="200"}' in text
+    assert 'vic_api_requests_total{route="unmatched",method="GET",status="404"}' in text
+    assert "# TYPE vic_api_request_serialization_seconds histogram" in text
+
+
+def test_profile(client, metrics_data, monkeypatch):
+    # Off unless enabled
+    assert client.get("/ideas/i1", params={"profile": 1}).json()["id"] == "i1"
+
+    monkeypatch.setattr(metrics, "PROFILING", True)
+    response = client.get("/ideas/i1", headers={"X-Profile": "1"})
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text.startswith("GET /ideas/i1 -> 200 in ")
+    assert "get_idea_detail" in response.text
@@ -0,0 +1,153 @@
+"""
+Tests for link derived idea ids and the job moving ideas over to them.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from api.jobs.bulk_load import rekey_ideas, split_dump
+from api.jobs.migrate_idea_ids import migrate_idea_ids, plan_idea_ids
+from ValueInvestorsClub.ValueInvestorsClub.models.Catalysts import Catalysts
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.DataVersion import DataVersion
+from ValueInvestorsClub.ValueInvestorsClub.models.Description import Description
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.IdeaChange import IdeaChange
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+from ValueInvestorsClub.ValueInvestorsClub.models.links import idea_id_from_link, normalize_link
+
+LINK = "https://valueinvestorsclub.com/idea/InPost/5698302853"
+
+
+@pytest.mark.parametrize("link", [
+    LINK,
+    "http://www.valueinvestorsclub.com/idea/InPost/5698302853/",
+    "https://valueinvestorsclub.com/idea/InPost/5698302853?ref=search#description",
+    " https://www.ValueInvestorsClub.com/idea/InPost/5698302853 ",
+])
+def test_link_forms(link):
+    assert normalize_link(link) == LINK
+    assert idea_id_from_link(link) == "5698302853"
+
+
+def test_links_without_an_id():
+    assert idea_id_from_link("") is None
+    assert idea_id_from_link(None) is None
+    other = idea_id_from_link("https://valueinvestorsclub.com/idea/InPost")
+    assert other == idea_id_from_link("http://www.valueinvestorsclub.com/idea/InPost/")
+    assert len(other) == 36
+
+
+def test_plan_keeps_the_best_copy():
+    ideas = [
+        ("uuid-b", LINK, datetime(2020, 1, 2)),
+        ("uuid-a", LINK + "/", datetime(2020, 1, 1)),
+        ("uuid-c", "http://valueinvestorsclub.com/idea/InPost/5698302853", datetime(2019, 1, 1)),
+        ("7", "https://valueinvestorsclub.com/idea/Other/7", None),
+        ("unlinked", "", None),
+    ]
+    children = {"descriptions": {"uuid-a", "uuid-b"}, "catalyst": {"uuid-b"}, "performance": {"uuid-a"}}
+    plan = plan_idea_ids(ideas, children)
+    assert len(plan) == 1
+    merge = plan[0]
+    # Most child rows, then the earliest
+    assert merge.ids == ["uuid-a", "uuid-b", "uuid-c"]
+    assert merge.new_id == "5698302853" and merge.link == LINK
+    assert merge.children == {"descriptions": "uuid-a", "catalyst": "uuid-b", "performance": "uuid-a"}
+
+    # A row that already has the new id is kept, and nothing else needs doing
+    assert plan_idea_ids([("5698302853", LINK, None), ("x", LINK, None)], children)[0].kept == "5698302853"
+    assert plan_idea_ids([("5698302853", LINK, None)], children) == []
+
+
+@pytest.fixture
+def crawled_twice(db_session):
+    """Ideas stored under random ids by two crawls, before links were unique."""
+    db_session.execute(text("DROP INDEX uq_ideas_link"))
+    db_session.add_all([
+        Company(ticker="ABC US", company_name="ABC Corp"),
+        User(username="author", user_link="https://valueinvestorsclub.com/users/author"),
+    ])
+    db_session.commit()
+    for idea_id, link, day in [
+        ("first-1", "https://valueinvestorsclub.com/idea/ABC/101", 1),
+        ("second-1", "https://www.valueinvestorsclub.com/idea/ABC/101", 1),
+        ("first-2", "https://valueinvestorsclub.com/idea/ABC/202", 2),
+        ("second-2", "https://valueinvestorsclub.com/idea/ABC/202", 2),
+        ("only", "https://valueinvestorsclub.com/idea/ABC/303", 3),
+        ("unlinked", "", 4),
+    ]:
+        db_session.add(Idea(id=idea_id, link=link, company_id="ABC US",
+                            user_id="https://valueinvestorsclub.com/users/author",
+                            date=datetime(2020, 1, day), is_short=False, is_contest_winner=False))
+    db_session.commit()
+    db_session.add_all([
+        Description(idea_id="first-1", description="first"),
+        Description(idea_id="second-1", description="second"),
+        Catalysts(idea_id="second-1", catalysts="catalysts"),
+        Performance(idea_id="second-2", nextDayOpen=10.0, nextDayClose=10.5, oneYearPerf=1.5),
+        Description(idea_id="only", description="only"),
+    ])
+    db_session.commit()
+
+
+def test_migrate_idea_ids(engine, db_session, crawled_twice):
+    report = []
+    assert migrate_idea_ids(engine, dry_run=True, log=report.append) == {"groups": 3, "rekeyed": 3, "duplicates": 2}
+    assert len(report) == 2
+    assert db_session.query(Idea).count() == 6
+
+    assert migrate_idea_ids(engine, batch_size=2, log=lambda message: None)["duplicates"] == 2
+    ideas = {idea.id: idea.link for idea in db_session.query(Idea)}
+    assert ideas == {
+        "101": "https://valueinvestorsclub.com/idea/ABC/101",
+        "202": "https://valueinvestorsclub.com/idea/ABC/202",
+        "303": "https://valueinvestorsclub.com/idea/ABC/303",
+        "unlinked": "",
+    }
+    # The copy with the most child rows was kept, with all of them
+    assert {d.idea_id: d.description for d in db_session.query(Description)} == {"101": "second", "303": "only"}
+    assert [c.idea_id for c in db_session.query(Catalysts)] == ["101"]
+    assert [(p.idea_id, p.oneYearPerf) for p in db_session.query(Performance)] == [("202", 1.5)]
+    # Two batches, two ideas versions
+    assert db_session.get(DataVersion, "ideas").version == 2
+    assert {"101", "202", "303"} <= {c.idea_id for c in db_session.query(IdeaChange)}
+
+    assert "uq_ideas_link" in {index["name"] for index in inspect(engine).get_indexes("ideas")}
+    assert migrate_idea_ids(engine, log=lambda message: None)["groups"] == 0
+    db_session.add(Idea(id="x", link="https://valueinvestorsclub.com/idea/ABC/101", company_id="ABC US",
+                        user_id="https://valueinvestorsclub.com/users/author",
+                        date=datetime(2021, 1, 1), is_short=False, is_contest_winner=False))
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+
+
+def test_bulk_load_rekeys_ideas(tmp_path):
+    dump = [
+        "COPY public.ideas (id, link, company_id, user_id, date, is_short, is_contest_winner) FROM stdin;\n",
+        "a\thttps://valueinvestorsclub.com/idea/ABC/101\tABC US\tu\t2020-01-02 00:00:00\tf\tf\n",
+        "b\thttp://valueinvestorsclub.com/idea/ABC/101/\tABC US\tu\t2020-01-01 00:00:00\tf\tf\n",
+        "c\t\tABC US\tu\t\\N\tf\tf\n",
+        "\\.\n",
+        "COPY public.descriptions (idea_id, description) FROM stdin;\n",
+        "a\tfrom a\n",
+        "b\tfrom b\n",
+        "c\tfrom c\n",
+        "\\.\n",
+    ]
+    tables = split_dump(dump, str(tmp_path))
+    assert rekey_ideas(tables) == 1
+
+    def rows(name):
+        with open(tables[name].path) as handle:
+            return [line.rstrip("\n").split("\t") for line in handle]
+
+    # Both copies have a description, so the earlier one is kept
+    assert [row[:2] for row in rows("ideas")] == [
+        ["101", "https://valueinvestorsclub.com/idea/ABC/101"], ["c", ""],
+    ]
+    assert rows("descriptions") == [["101", "from b"], ["c", "from c"]]
+    assert tables["ideas"].rows == 2 and tables["descriptions"].rows == 2
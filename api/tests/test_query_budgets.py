@@ -0,0 +1,104 @@
+"""
+Query budgets: every endpoint declares with @query_budget how many SQL
+statements a request may run, and this checks it against a database with
+enough rows that loading related rows one at a time would blow the budget.
+On Postgres (TEST_DATABASE_URL) the statements' plans are also checked for
+sequential scans.
+"""
+import pytest
+from fastapi import status
+
+import api.routes
+from api.bench.data import seed
+from api.health import clear_readiness_cache
+from api.jobs.author_stats import refresh_author_stats
+from api.main import app
+from api.pricing import PriceStore, TickerIndex, get_price_store
+from ValueInvestorsClub.ValueInvestorsClub.models.Catalysts import Catalysts
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+
+IDEA = "00000000"
+
+# An example request per route template. {company} and {user} are filled in
+# with the company and author of IDEA.
+REQUESTS = {
+    "/health": "/health",
+    "/health/live": "/health/live",
+    "/health/ready": "/health/ready",
+    "/metrics": "/metrics",
+    "/ideas/": "/ideas/?company_id={company}&limit=5&include_total=true",
+    "/ideas/returns": f"/ideas/returns?idea_ids={IDEA}&idea_ids=00000001",
+    "/ideas/facets": "/ideas/facets?has_performance=true",
+    "/ideas/{idea_id}": f"/ideas/{IDEA}",
+    "/ideas/{idea_id}/performance": f"/ideas/{IDEA}/performance",
+    "/ideas/{idea_id}/returns": f"/ideas/{IDEA}/returns",
+    "/ideas/{idea_id}/description": f"/ideas/{IDEA}/description",
+    "/ideas/{idea_id}/description/stream": f"/ideas/{IDEA}/description/stream",
+    "/ideas/{idea_id}/catalysts": f"/ideas/{IDEA}/catalysts",
+    "/debug/ideas/{idea_id}": f"/debug/ideas/{IDEA}",
+    "/companies/": "/companies/",
+    "/companies/{ticker:path}/ideas": "/companies/{company}/ideas",
+    "/users/": "/users/",
+    "/users/leaderboard": "/users/leaderboard?min_ideas=0",
+    "/users/{user_link:path}": "/users/{user}?limit=50",
+    "/export/ideas": "/export/ideas?include_text=true",
+    "/changes": "/changes?since=0",
+}
+
+# Point lookups and pages whose plans must not scan a whole table
+INDEXED = [
+    "/ideas/{idea_id}",
+    "/ideas/{idea_id}/performance",
+    "/ideas/{idea_id}/description",
+    "/ideas/{idea_id}/catalysts",
+    "/companies/{ticker:path}/ideas",
+    "/users/{user_link:path}",
+]
+
+
+def api_routes():
+    return [route for name in api.routes.__all__ for route in getattr(api.routes, name).routes]
+
+
+ROUTES = {route.path: route for route in api_routes()}
+
+
+@pytest.fixture
+def budget_data(db_session, tmp_path):
+    seed(db_session, ideas=60, companies=3, users=3, description_words=20)
+    db_session.add(Catalysts(idea_id=IDEA, catalysts="Spin-off"))
+    db_session.commit()
+    refresh_author_stats(db_session, full=True)
+    idea = db_session.get(Idea, IDEA)
+    values = {"company": idea.company_id, "user": idea.user_id}
+    # Requests must load what they need themselves
+    db_session.expunge_all()
+
+    store = PriceStore(TickerIndex.from_stooq_dir(str(tmp_path)))
+    app.dependency_overrides[get_price_store] = lambda: store
+    yield values
+    app.dependency_overrides.pop(get_price_store, None)
+
+
+def test_every_route_has_a_budget():
+    missing = [path for path, route in ROUTES.items() if route.query_budget is None]
+    assert not missing, f"Add @query_budget to {missing}"
+    assert sorted(REQUESTS) == sorted(ROUTES), "Add an example request for every route"
+
+
+@pytest.mark.parametrize("path", sorted(REQUESTS))
+def test_query_budget(client, budget_data, count_queries, path):
+    clear_readiness_cache()
+    with count_queries() as queries:
+        response = client.get(REQUESTS[path].format(**budget_data))
+    assert response.status_code == status.HTTP_200_OK, response.text
+    budget = ROUTES[path].query_budget
+    assert len(queries) <= budget, f"{path} ran {len(queries)} queries, budget {budget}:\n{queries}"
+
+
+@pytest.mark.parametrize("path", INDEXED)
+def test_no_sequential_scans(explain, client, budget_data, count_queries, path):
+    with count_queries() as queries:
+        client.get(REQUESTS[path].format(**budget_data))
+    for statement, parameters in queries.selects():
+        assert explain(statement, parameters) == [], f"{path} scans a whole table:\n{statement}"
@@ -0,0 +1,87 @@
+"""
+Tests for read replica routing, with SQLite files standing in for the
+primary and its replicas.
+"""
+import time
+
+import pytest
+
+from api.database import connection, replicas
+from api.database.replicas import Replica, ReplicaSet, read_session
+
+
+@pytest.fixture
+def databases(monkeypatch, tmp_path):
+    """URLs of a primary and two replicas."""
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ("primary", "replica1", "replica2")}
+    monkeypatch.setattr(connection, "DATABASE_URL", urls["primary"])
+    monkeypatch.setattr(connection, "_engines", {})
+    monkeypatch.setattr(replicas, "REPLICA_CHECK_INTERVAL", 0)
+    yield urls
+    for engine in connection._engines.values():
+        engine.dispose()
+
+
+def use_replicas(monkeypatch, urls):
+    replica_set = ReplicaSet(urls)
+    monkeypatch.setattr(replicas, "_replicas", replica_set)
+    return replica_set
+
+
+def served_by(urls):
+    db = read_session()
+    try:
+        url = str(db.get_bind().url)
+        return next(name for name, candidate in urls.items() if candidate == url)
+    finally:
+        db.close()
+
+
+def test_without_replicas_reads_use_the_primary(monkeypatch, databases):
+    use_replicas(monkeypatch, [])
+    assert served_by(databases) == "primary"
+
+
+def test_replicas_take_turns(monkeypatch, databases):
+    use_replicas(monkeypatch, [databases["replica1"], databases["replica2"]])
+    assert sorted(served_by(databases) for _ in range(4)) == ["replica1", "replica1", "replica2", "replica2"]
+
+
+def test_lagging_replica_skipped(monkeypatch, databases):
+    use_replicas(monkeypatch, [databases["replica1"], databases["replica2"]])
+    monkeypatch.setattr(replicas, "replica_lag", lambda c: 60.0 if "replica1" in str(c.engine.url) else 0.5)
+    assert {served_by(databases) for _ in range(4)} == {"replica2"}
+
+    monkeypatch.setattr(replicas, "replica_lag", lambda c: 60.0)
+    assert served_by(databases) == "primary"
+
+
+def test_replica_not_streaming_skipped(monkeypatch, databases):
+    replica_set = use_replicas(monkeypatch, [databases["replica1"]])
+    # LAG_SQL is NULL without a streaming WAL receiver
+    monkeypatch.setattr(replicas, "replica_lag", lambda c: None)
+    assert served_by(databases) == "primary"
+    assert replica_set.replicas[0].error == "NotStreaming"
+
+def test_failed_replica_skipped_until_it_recovers(monkeypatch, databases, tmp_path):
+    broken = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    replica_set = use_replicas(monkeypatch, [broken])
+    assert served_by(databases) == "primary"
+    assert replica_set.replicas[0].error == "OperationalError"
+
+    (tmp_path / "missing").mkdir()
+    assert served_by({**databases, "recovered": broken}) == "recovered"
+    assert replica_set.replicas[0].healthy
+
+
+def test_failover_when_connecting_fails(monkeypatch, databases, tmp_path):
+    # Passed its last check, but is down by the time a request connects
+    down = Replica(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}", healthy=True, lag=0.0,
+                   checked_at=time.monotonic())
+    replica_set = use_replicas(monkeypatch, [databases["replica1"]])
+    replica_set.replicas.insert(0, down)
+    monkeypatch.setattr(replicas, "REPLICA_CHECK_INTERVAL", 3600)
+    replica_set.check(replica_set.replicas[1])
+
+    assert {served_by(databases) for _ in range(3)} == {"replica1"}
+    assert not down.healthy
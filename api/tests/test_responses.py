@@ -0,0 +1,126 @@
+"""
+Tests for JSON serialization and response compression.
+"""
+import gzip
+import json
+import zlib
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from api import responses
+from api.bench.data import seed
+from api.responses import CompressionMiddleware, FastJSONResponse, choose_encoding
+
+
+def make_app(**options):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **options)
+
+    @app.get("/text")
+    def text(size: int = 2000):
+        return PlainTextResponse("x" * size)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"row {i}\n" for i in range(500)), media_type="application/x-ndjson")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: " + "x" * 2000 + "\n\n"]), media_type="text/event-stream")
+
+    @app.get("/png")
+    def png():
+        return PlainTextResponse("x" * 2000, media_type="image/png")
+
+    return app
+
+
+def raw_get(client, path, encoding):
+    """Request path and return (response, undecoded body)."""
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert choose_encoding("gzip;q=0.5, br;q=0", ["br", "gzip"]) == "gzip"
+    assert choose_encoding("*", ["gzip"]) == "gzip"
+    assert choose_encoding("identity", ["br", "gzip"]) is None
+    assert choose_encoding("", ["gzip"]) is None
+
+
+def test_gzip_above_threshold():
+    client = TestClient(make_app(encodings=["gzip"], minimum_size=1000))
+
+    response, body = raw_get(client, "/text", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == b"x" * 2000
+
+    response, body = raw_get(client, "/text?size=999", "gzip")
+    assert "content-encoding" not in response.headers
+    assert body == b"x" * 999
+
+    response, body = raw_get(client, "/text", "identity")
+    assert "content-encoding" not in response.headers
+
+
+def test_brotli():
+    pytest.importorskip("brotli")
+    client = TestClient(make_app(encodings=["br", "gzip"], minimum_size=100))
+    response, body = raw_get(client, "/text", "gzip, br")
+    assert response.headers["content-encoding"] == "br"
+    assert responses.brotli.decompress(body) == b"x" * 2000
+
+
+def test_skipped_content():
+    client = TestClient(make_app(encodings=["gzip"], minimum_size=100))
+    for path in ("/events", "/png"):
+        response, _ = raw_get(client, path, "gzip")
+        assert "content-encoding" not in response.headers
+
+
+def test_streaming_compressed_incrementally():
+    # TestClient buffers the body, so collect the ASGI messages directly
+    app = CompressionMiddleware(make_app(), encodings=["gzip"], minimum_size=100)
+    scope = {"type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+             "headers": [(b"accept-encoding", b"gzip")], "scheme": "http", "server": ("test", 80), "root_path": ""}
+    messages = []
+
+    async def receive():
+        # Starlette listens for a disconnect while streaming, which never comes
+        await anyio.sleep_forever()
+
+    async def send(message):
+        messages.append(message)
+
+    anyio.run(app, scope, receive, send)
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    chunks = [m["body"] for m in messages[1:]]
+    assert len(chunks) > 100
+    # Every chunk is flushed, so what arrived so far decodes on its own
+    partial = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(chunks[0])
+    assert partial == b"row 0\n"
+    assert gzip.decompress(b"".join(chunks)).decode() == "".join(f"row {i}\n" for i in range(500))
+
+
+def test_fast_json_response(monkeypatch):
+    content = {"a": [1, 2.5, None], "b": "€"}
+    assert json.loads(FastJSONResponse(content).body) == content
+    monkeypatch.setattr(responses, "orjson", None)
+    assert FastJSONResponse(content).body == '{"a":[1,2.5,null],"b":"€"}'.encode()
+
+
+def test_api_list_compressed(client, db_session):
+    seed(db_session, ideas=50, description_words=20)
+    response, body = raw_get(client, "/ideas/?limit=50", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(body))) == 50
+    assert len(body) < len(client.get("/ideas/?limit=50", headers={"Accept-Encoding": "identity"}).content)
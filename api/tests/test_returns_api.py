@@ -0,0 +1,114 @@
+"""
+Tests for arbitrary horizon returns computed from local price files.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi import status
+
+from api.main import app
+from api.pricing import PriceStore, TickerIndex, get_price_store, parse_horizons
+from api.pricing.horizons import HorizonError
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+
+@pytest.fixture
+def price_store(tmp_path):
+    """Daily closes for ABC.US rising by 1 per calendar day from 100 on 2020-01-01."""
+    start = date(2020, 1, 1)
+    lines = ["Date,Open,High,Low,Close,Volume"]
+    for i in range(800):
+        day = start + timedelta(days=i)
+        # Skip weekends like a real exchange
+        if day.weekday() >= 5:
+            continue
+        close = 100 + i
+        lines.append(f"{day.isoformat()},{close},{close},{close},{close},1000")
+    (tmp_path / "abc.us.csv").write_text("\n".join(lines) + "\n")
+
+    store = PriceStore(TickerIndex.from_stooq_dir(str(tmp_path)), cache_size=4)
+    app.dependency_overrides[get_price_store] = lambda: store
+    yield store
+    app.dependency_overrides.pop(get_price_store, None)
+
+
+@pytest.fixture
+def returns_data(db_session):
+    db_session.add_all([
+        Company(ticker="ABC US", company_name="ABC Corp"),
+        Company(ticker="ZZZ LN", company_name="ZZZ plc"),
+        User(username="author", user_link="https://valueinvestorsclub.com/users/author"),
+    ])
+    db_session.commit()
+    db_session.add_all([
+        # Posted on a Friday evening, so the base close is Monday 2020-01-06
+        Idea(id="abc", link="", company_id="ABC US", user_id="https://valueinvestorsclub.com/users/author",
+             date=datetime(2020, 1, 3, 21, 30), is_short=False, is_contest_winner=False),
+        Idea(id="zzz", link="", company_id="ZZZ LN", user_id="https://valueinvestorsclub.com/users/author",
+             date=datetime(2020, 1, 3, 21, 30), is_short=True, is_contest_winner=False),
+    ])
+    db_session.commit()
+
+
+def test_parse_horizons():
+    assert [h.label for h in parse_horizons("3d, 10d,45D,18m,3d")] == ["3d", "10d", "45d", "18m"]
+    with pytest.raises(HorizonError):
+        parse_horizons("3x")
+    with pytest.raises(HorizonError):
+        parse_horizons("")
+
+
+def test_month_horizon_clips_to_month_end():
+    (horizon,) = parse_horizons("1m")
+    targets = horizon.targets(np.array(["2020-01-31", "2021-01-15"], dtype="datetime64[D]"))
+    assert list(targets.astype(str)) == ["2020-02-29", "2021-02-15"]
+
+
+def test_get_idea_returns(client, returns_data, price_store):
+    response = client.get("/ideas/abc/returns?horizons=3d,10d,18m,5y")
+    assert response.status_code == status.HTTP_200_OK
+
+    data = response.json()
+    assert data["price_symbol"] == "abc.us"
+    assert data["base_date"] == "2020-01-06"
+    assert data["base_close"] == 105
+    # 3d lands on Monday 2020-01-06 itself, 10d on Monday 2020-01-13
+    assert data["returns"]["3d"] == pytest.approx(1.0)
+    assert data["returns"]["10d"] == pytest.approx(112 / 105)
+    # 18 months out is 2021-07-03, a Saturday, so Friday's close is used
+    assert data["returns"]["18m"] == pytest.approx((100 + 548) / 105)
+    # Five years is past the end of the series
+    assert data["returns"]["5y"] is None
+
+
+def test_get_ideas_returns_batch(client, returns_data, price_store):
+    response = client.get("/ideas/returns?idea_ids=zzz&idea_ids=abc&idea_ids=missing&horizons=1w")
+    assert response.status_code == status.HTTP_200_OK
+
+    data = response.json()
+    assert [row["idea_id"] for row in data] == ["zzz", "abc"]
+    assert data[0]["unmatched_reason"] == "not_found"
+    assert data[0]["returns"] == {"1w": None}
+    assert data[1]["returns"]["1w"] == pytest.approx(109 / 105)
+
+
+def test_returns_reuse_cached_series(client, returns_data, price_store):
+    client.get("/ideas/abc/returns?horizons=1w")
+    client.get("/ideas/abc/returns?horizons=2w")
+    info = price_store.cache_info()
+    assert info["misses"] == 1
+    assert info["hits"] == 1
+
+
+def test_returns_errors(client, returns_data, price_store):
+    assert client.get("/ideas/abc/returns?horizons=soon").status_code == 422
+    assert client.get("/ideas/nope/returns?horizons=1w").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_returns_without_price_data(client, returns_data):
+    app.dependency_overrides[get_price_store] = lambda: None
+    response = client.get("/ideas/abc/returns?horizons=1w")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -0,0 +1,59 @@
+"""
+Tests for the production launcher's sizing and the per process engine.
+"""
+from api import run_server
+from api.database import connection
+
+
+def test_server_config():
+    # Two workers per CPU
+    assert run_server.server_config(4, None, connection_budget=60) == run_server.ServerConfig(8, 4, 3)
+    # Capped by memory: 1 GB fits four 256 MB workers
+    config = run_server.server_config(8, 1 << 30, worker_memory_mb=256, connection_budget=60)
+    assert (config.workers, config.pool_size + config.max_overflow) == (4, 15)
+    # An explicit count wins over the CPU and memory limits
+    assert run_server.server_config(0.5, 1 << 20, workers=6, connection_budget=20).workers == 6
+    # Workers are capped so that two connections each stay within the budget
+    config = run_server.server_config(0.5, None, workers=40, connection_budget=20)
+    assert (config.workers, config.pool_size, config.max_overflow) == (10, 1, 1)
+    config = run_server.server_config(16, None, connection_budget=21)
+    assert config.workers * (config.pool_size + config.max_overflow) <= 21
+
+
+def test_cgroup_limits(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    (tmp_path / "memory.max").write_text("536870912\n")
+    assert run_server.cpu_limit(str(tmp_path)) == 1.5
+    assert run_server.memory_limit(str(tmp_path)) == 512 * 1024 * 1024
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    (tmp_path / "memory.max").write_text("max\n")
+    assert run_server.cpu_limit(str(tmp_path)) >= 1
+    assert run_server.memory_limit(str(tmp_path)) is None
+
+    # cgroup v1
+    v1 = tmp_path / "v1"
+    (v1 / "cpu").mkdir(parents=True)
+    (v1 / "memory").mkdir()
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    (v1 / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    (v1 / "memory" / "memory.limit_in_bytes").write_text(str(1 << 62))
+    assert run_server.cpu_limit(str(v1)) == 2
+    assert run_server.memory_limit(str(v1)) is None
+
+
+def test_engine_created_per_process(monkeypatch, tmp_path):
+    monkeypatch.setattr(connection, "DATABASE_URL", f"sqlite:///{tmp_path / 'api.db'}")
+    monkeypatch.setattr(connection, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(connection, "_engines", {})
+    engine = connection.get_engine()
+    assert connection.get_engine() is engine
+    assert engine.pool.size() == 3
+
+    # After a fork the child builds its own
+    monkeypatch.setattr(connection.os, "getpid", lambda: -1)
+    child = connection.get_engine()
+    assert child is not engine
+    from api.database import engine as imported
+    assert imported is child
+    child.dispose()
@@ -0,0 +1,100 @@
+"""
+Tests for resolving raw VIC tickers to stooq price series.
+"""
+from datetime import date
+
+import pytest
+
+from api.pricing import TickerIndex, parse_vic_ticker, coverage_report
+
+
+def write_stooq_file(path, ticker, days):
+    """Write a minimal stooq bulk file with one row per (yyyymmdd, close)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = ["<TICKER>,<PER>,<DATE>,<TIME>,<OPEN>,<HIGH>,<LOW>,<CLOSE>,<VOL>,<OPENINT>"]
+    for day, close in days:
+        lines.append(f"{ticker},D,{day},000000,{close},{close},{close},{close},1000,0")
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def stooq_dir(tmp_path):
+    """A small stooq style download with US, UK and reused/delisted symbols."""
+    us = tmp_path / "daily" / "us" / "nyse stocks" / "1"
+    uk = tmp_path / "daily" / "uk" / "lse stocks"
+    write_stooq_file(us / "abc.us.txt", "ABC.US", [("20100104", 10), ("20201231", 20)])
+    write_stooq_file(us / "brk-b.us.txt", "BRK-B.US", [("19960509", 30), ("20221230", 300)])
+    write_stooq_file(uk / "xyz.uk.txt", "XYZ.UK", [("20050103", 5), ("20151231", 6)])
+    # "OLD" traded until 2008, was delisted, and the symbol was reused in 2015
+    write_stooq_file(us / "old.us.txt", "OLD.US", [("20000103", 1), ("20080630", 2)])
+    write_stooq_file(tmp_path / "delisted" / "old.us.txt", "OLD.US", [("20150105", 3), ("20201231", 4)])
+    return tmp_path
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("ABC US", ("abc", "US")),
+    ("XYZ LN", ("xyz", "LN")),
+    ("BRK/B US", ("brk-b", "US")),
+    ("BRK.B", ("brk-b", None)),
+    ("VOD.L", ("vod", "L")),
+    ("abc us equity", ("abc", "US")),
+    ("AAPL", ("aapl", None)),
+])
+def test_parse_vic_ticker(raw, expected):
+    assert parse_vic_ticker(raw) == expected
+
+
+def test_resolve_exchange_suffixes(stooq_dir):
+    index = TickerIndex.from_stooq_dir(str(stooq_dir))
+    assert index.resolve("ABC US").series.key == "abc.us"
+    assert index.resolve("XYZ LN").series.key == "xyz.uk"
+    assert index.resolve("BRK/B UN").series.key == "brk-b.us"
+    # No exchange falls back to the US market
+    assert index.resolve("ABC").method == "default_market"
+    # Unique foreign symbols resolve even without an exchange
+    assert index.resolve("XYZ").series.key == "xyz.uk"
+    assert index.resolve("ABC CN").reason == "unsupported_exchange"
+    assert index.resolve("NOPE US").reason == "not_found"
+
+
+def test_resolve_reused_symbol_by_date(stooq_dir):
+    index = TickerIndex.from_stooq_dir(str(stooq_dir))
+    early = index.resolve("OLD US", date(2005, 6, 1))
+    late = index.resolve("OLD US", date(2018, 6, 1))
+    assert early.series.start == date(2000, 1, 3)
+    assert late.series.start == date(2015, 1, 5)
+    gap = index.resolve("OLD US", date(2011, 6, 1))
+    assert not gap.matched
+    assert gap.reason == "out_of_range"
+
+
+def test_index_round_trip(stooq_dir, tmp_path):
+    index = TickerIndex.from_stooq_dir(str(stooq_dir))
+    path = tmp_path / "index.json"
+    index.save(str(path))
+    loaded = TickerIndex.load(str(path))
+    assert len(loaded) == len(index)
+    assert loaded.resolve("OLD US", date(2018, 1, 2)).series == index.resolve("OLD US", date(2018, 1, 2)).series
+
+
+def test_resolve_many_and_coverage_report(stooq_dir):
+    index = TickerIndex.from_stooq_dir(str(stooq_dir))
+    rows = [
+        ("1", "ABC US", date(2012, 1, 1)),
+        ("2", "ABC US", date(2013, 1, 1)),
+        ("3", "XYZ LN", date(2010, 1, 1)),
+        ("4", "FOO FP", date(2010, 1, 1)),
+        ("5", "NOPE US", date(2010, 1, 1)),
+        ("6", "NOPE US", date(2011, 1, 1)),
+    ]
+    resolutions = index.resolve_many(rows)
+    assert set(resolutions) == {"1", "2", "3", "4", "5", "6"}
+
+    report = coverage_report(resolutions)
+    assert report.total_ideas == 6
+    assert report.matched_ideas == 3
+    assert report.total_tickers == 4
+    assert report.matched_tickers == 2
+    assert report.unmatched_reasons == {"unsupported_exchange": 1, "not_found": 1}
+    # Most frequently pitched unmatched tickers come first
+    assert report.unmatched[0] == ("NOPE US", "not_found", 2)
@@ -0,0 +1,88 @@
+"""
+Tests for the user profile endpoint.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from api.jobs.author_stats import refresh_author_stats
+from ValueInvestorsClub.ValueInvestorsClub.models.Company import Company
+from ValueInvestorsClub.ValueInvestorsClub.models.Idea import Idea
+from ValueInvestorsClub.ValueInvestorsClub.models.Performance import Performance
+from ValueInvestorsClub.ValueInvestorsClub.models.User import User
+
+LINK = "https://valueinvestorsclub.com/users/author"
+
+
+@pytest.fixture
+def profile_data(db_session):
+    db_session.add_all([
+        Company(ticker="ABC US", company_name="ABC Corp"),
+        User(username="author", user_link=LINK),
+        User(username="lurker", user_link="https://valueinvestorsclub.com/users/lurker"),
+    ])
+    db_session.commit()
+    for i in range(5):
+        db_session.add(Idea(
+            id=f"i{i}", link="", company_id="ABC US", user_id=LINK, date=datetime(2015 + i, 1, 1),
+            is_short=(i == 4), is_contest_winner=(i == 0),
+        ))
+        db_session.add(Performance(idea_id=f"i{i}", nextDayOpen=10.0, nextDayClose=10.0, oneYearPerf=1.0 + i / 10))
+    db_session.commit()
+    refresh_author_stats(db_session, full=True)
+
+
+def test_profile_aggregates(client, profile_data):
+    response = client.get(f"/users/{LINK}")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+
+    assert data["username"] == "author"
+    assert (data["idea_count"], data["long_count"], data["short_count"]) == (5, 4, 1)
+    assert data["contest_wins"] == 1
+    assert data["first_post"].startswith("2015-01-01")
+    assert data["last_post"].startswith("2019-01-01")
+
+    one_year = {row["horizon"]: row for row in data["returns"]}["1Y"]
+    assert one_year["ideas_with_returns"] == 5
+    # Longs returned 0%, 10%, 20% and 30%, the short lost 40%
+    assert one_year["mean_return"] == pytest.approx(0.04)
+
+    assert [idea["id"] for idea in data["ideas"]] == ["i4", "i3", "i2", "i1", "i0"]
+    assert data["ideas"][0]["company"]["ticker"] == "ABC US"
+    assert data["ideas"][0]["performance"]["oneYearPerf"] == pytest.approx(1.4)
+
+
+def test_profile_by_username(client, profile_data):
+    response = client.get("/users/author")
+    assert response.json()["user_link"] == LINK
+
+
+def test_profile_idea_pages(client, profile_data):
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get(f"/users/{LINK}", params=params).json()
+        assert len(data["ideas"]) <= 2
+        seen.extend(idea["id"] for idea in data["ideas"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["i4", "i3", "i2", "i1", "i0"]
+
+
+def test_profile_without_stats(client, profile_data):
+    data = client.get("/users/lurker").json()
+    assert data["idea_count"] is None
+    assert data["returns"] == []
+    assert data["ideas"] == []
+
+
+def test_profile_not_found(client, profile_data):
+    assert client.get("/users/nobody").status_code == status.HTTP_404_NOT_FOUND
+    # The static routes still resolve
+    assert client.get("/users/leaderboard").status_code == status.HTTP_200_OK